@@ -0,0 +1,272 @@
+import logging
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _circular_distance(values: np.ndarray, cycle: float) -> np.ndarray:
+    """到0的环形距离（周期为 cycle）"""
+    values = np.mod(values, cycle)
+    return np.minimum(values, cycle - values)
+
+
+def band_width(green_starts: np.ndarray, green: np.ndarray, shifts: np.ndarray, cycle: float) -> np.ndarray:
+    """
+    单方向绿波带宽
+
+    把各路口的绿灯区间按行程时间平移到同一参考路口的时间轴上，带宽为
+    所有平移后绿灯区间（环形）的公共部分长度。
+
+    Args:
+        green_starts: (..., n) 各路口协调相位绿灯开始时刻（周期内，秒）
+        green: (n,) 各路口协调相位绿灯时长
+        shifts: (n,) 时间轴平移量（该方向车辆从参考路口到各路口的行程时间取负，
+            反方向取正）
+        cycle: 公共周期
+
+    Returns:
+        ndarray: (...,) 带宽（秒）
+    """
+    starts = np.asarray(green_starts, dtype=np.float64) + shifts
+    # 以绿灯最短的路口为基准，其余区间表示为相对基准起点的位置
+    ref = int(np.argmin(green))
+    rel = np.mod(starts - starts[..., ref:ref + 1] + green, cycle) - green
+    low = np.maximum(rel, 0.0).max(axis=-1)
+    high = np.minimum(rel + green, green[ref]).min(axis=-1)
+    return np.maximum(high - low, 0.0)
+
+
+def _scale_splits(splits: np.ndarray, cycle_length: float) -> np.ndarray:
+    """按比例把相位时长缩放到新周期（整数秒，总和等于新周期）"""
+    target = int(round(cycle_length))
+    if int(splits.sum()) == target:
+        return splits
+    scaled = splits * target / splits.sum()
+    result = np.floor(scaled).astype(np.int64)
+    order = np.argsort(-(scaled - result), kind='stable')
+    result[order[:target - int(result.sum())]] += 1
+    return result
+
+
+class Corridor:
+    """
+    干线协调模型
+
+    按顺序排列的路口、相邻路口间的路段长度和设计车速，以及各路口协调
+    相位（干线直行）在周期中的绿灯开始时刻和绿灯时长。正向为从第一个
+    路口驶向最后一个路口，反向相反。
+    """
+
+    def __init__(self, intersection_ids: Sequence[str], link_lengths: Sequence[float],
+                 design_speed, cycle_length: float, green_starts: Sequence[float],
+                 green_times: Sequence[float], reverse_speed=None, clearance=0.0):
+        """
+        Args:
+            intersection_ids: 沿干线顺序排列的路口ID（n个）
+            link_lengths: 相邻路口间距（米，n-1个）
+            design_speed: 正向设计车速（km/h），标量或每个路段一个
+            cycle_length: 公共周期（秒）
+            green_starts: 协调相位绿灯在各路口周期内的开始时刻（秒）
+            green_times: 协调相位绿灯时长（秒）
+            reverse_speed: 反向设计车速（km/h），默认与正向相同
+            clearance: 协调相位绿灯之后的黄灯+全红时间（秒），周期缩放时不随周期变化
+        """
+        self.intersection_ids = list(intersection_ids)
+        n = len(self.intersection_ids)
+        self.link_lengths = np.asarray(link_lengths, dtype=np.float64)
+        if len(self.link_lengths) != n - 1:
+            raise ValueError(f"Corridor with {n} intersections needs {n - 1} link lengths")
+        self.cycle_length = float(cycle_length)
+        self.green_starts = np.asarray(green_starts, dtype=np.float64)
+        self.green_times = np.asarray(green_times, dtype=np.float64)
+        self.clearance = np.broadcast_to(np.asarray(clearance, dtype=np.float64), (n,))
+
+        speed = np.broadcast_to(np.asarray(design_speed, dtype=np.float64), (n - 1,)) / 3.6
+        back = speed if reverse_speed is None else \
+            np.broadcast_to(np.asarray(reverse_speed, dtype=np.float64), (n - 1,)) / 3.6
+        # 从第一个路口到各路口的累计行程时间（秒）
+        self.forward_times = np.concatenate([[0.0], np.cumsum(self.link_lengths / speed)])
+        self.reverse_times = np.concatenate([[0.0], np.cumsum(self.link_lengths / back)])
+
+    @classmethod
+    def from_engine(cls, engine, intersection_ids: Sequence[str], link_lengths: Sequence[float],
+                    design_speed, plan_name: str, phase: int = 0, reverse_speed=None) -> 'Corridor':
+        """
+        用配时方案引擎中各路口的方案（含专用方案）构建干线模型
+
+        Args:
+            engine: TimingPlanEngine
+            plan_name: 要协调的方案名称（各路口该方案的周期必须相同）
+            phase: 协调相位（干线直行相位）
+        """
+        plans = [engine.get_plan(plan_name, intersection_id) for intersection_id in intersection_ids]
+        cycles = {plan.cycle_length for plan in plans}
+        if len(cycles) != 1:
+            raise ValueError(f"Plans named {plan_name} have different cycle lengths: {sorted(cycles)}")
+        starts = [plan.phase_start_times()[phase] for plan in plans]
+        clearance = [plan.yellow[phase] + plan.all_red[phase] for plan in plans]
+        greens = [plan.splits[phase] - c for plan, c in zip(plans, clearance)]
+        return cls(intersection_ids, link_lengths, design_speed, cycles.pop(), starts, greens,
+                   reverse_speed, clearance)
+
+
+class GreenWaveOptimizer:
+    """
+    双向绿波相位差优化（等带宽双向最大带宽）
+
+    取正向带宽的起点为时间原点，反向带宽起点与之的间隔记为 δ。对给定的 δ，
+    路口 i 的协调绿灯必须同时容纳正向和反向的绿波带，可行的最大双向带宽为
+
+        b(δ) = min_i ( g_i - dist(δ - T_i) )
+
+    其中 T_i 为两个方向到路口 i 的行程时间之和，dist 为环形距离。相位差
+    的搜索因此化为对 δ 的一维搜索：所有候选 δ 与所有路口组成一个数组一次
+    计算，再把每个路口的绿灯放在两条带的可行区间中央，得到相位差。
+    """
+
+    def __init__(self, resolution: float = 0.5):
+        """
+        Args:
+            resolution: δ 的搜索步长（秒）
+        """
+        self.resolution = resolution
+
+    def optimize(self, corridor: Corridor, cycle_lengths: Optional[Sequence[float]] = None) -> Dict:
+        """
+        计算使双向带宽最大的相位差
+
+        Args:
+            corridor: 干线模型
+            cycle_lengths: 候选公共周期（秒），给出时同时搜索周期，各路口的相位时长
+                按周期等比例缩放（黄灯和全红不变）；默认只用干线模型的周期
+
+        Returns:
+            dict: cycle_length 公共周期、green_times (n,) 协调绿灯时长、
+                offsets (n,) 各路口周期起点相位差（秒，[0, 周期)），
+                green_starts (n,) 协调绿灯开始时刻（同一参考时刻下），
+                forward_bandwidth / reverse_bandwidth（秒）、efficiency（双向带宽
+                之和 / 2倍周期）
+        """
+        total_times = corridor.forward_times + corridor.reverse_times
+        cycles = np.atleast_1d(np.asarray(
+            corridor.cycle_length if cycle_lengths is None else cycle_lengths, dtype=np.float64
+        ))
+        scale = cycles / corridor.cycle_length
+
+        # 向量化搜索 (周期, δ)：δ 按周期的比例取样，数组形状 (周期数, 候选数, 路口数)
+        fractions = np.arange(0.0, 1.0, self.resolution / cycles.max())
+        deltas = fractions[None, :] * cycles[:, None]
+        splits = corridor.green_times + corridor.clearance
+        greens = np.maximum(splits[None, :] * scale[:, None] - corridor.clearance[None, :], 0.0)
+        slack = greens[:, None, :] - _circular_distance(
+            deltas[:, :, None] - total_times[None, None, :], cycles[:, None, None]
+        )
+        bandwidths = np.maximum(slack.min(axis=2), 0.0)
+        # 比较不同周期时以带宽占周期的比例（效率）为准
+        best_cycle, best = np.unravel_index(np.argmax(bandwidths / cycles[:, None]), bandwidths.shape)
+        cycle = float(cycles[best_cycle])
+        green = greens[best_cycle]
+        base_starts = corridor.green_starts * scale[best_cycle]
+        delta, bandwidth = deltas[best_cycle, best], bandwidths[best_cycle, best]
+
+        # 每个路口的绿灯开始时刻 x_i 的可行区间：正向 [t_i + b - g_i, t_i]，
+        # 反向 [δ - r_i + b - g_i, δ - r_i]，取两区间交集的中点
+        forward_start = corridor.forward_times + bandwidth - green
+        reverse_start = delta - corridor.reverse_times + bandwidth - green
+        length = green - bandwidth
+        rel = np.mod(reverse_start - forward_start, cycle)
+        # 反向区间在正向区间坐标系中的两种环形表示，取重叠更长的一种
+        candidates = np.stack([rel, rel - cycle])
+        low = np.maximum(candidates, 0.0)
+        high = np.minimum(candidates + length, length)
+        choice = np.argmax(high - low, axis=0)
+        columns = np.arange(len(green))
+        middle = (low[choice, columns] + high[choice, columns]) / 2
+        green_starts = np.mod(forward_start + middle, cycle)
+        offsets = np.mod(green_starts - base_starts, cycle)
+
+        forward = band_width(green_starts, green, -corridor.forward_times, cycle)
+        reverse = band_width(green_starts, green, corridor.reverse_times, cycle)
+        logger.info(f"Green wave for {len(green)} intersections: bandwidth {forward:.1f}s / {reverse:.1f}s "
+                    f"(cycle {cycle:.0f}s)")
+        return {
+            'intersection_ids': corridor.intersection_ids,
+            'cycle_length': cycle,
+            'green_times': green,
+            'offsets': offsets,
+            'green_starts': green_starts,
+            'forward_bandwidth': float(forward),
+            'reverse_bandwidth': float(reverse),
+            'efficiency': float((forward + reverse) / (2 * cycle))
+        }
+
+    @staticmethod
+    def evaluate(corridor: Corridor, offsets) -> Dict[str, np.ndarray]:
+        """
+        计算给定相位差（可批量，形状 (..., n)）下的双向带宽
+        """
+        green_starts = np.asarray(offsets, dtype=np.float64) + corridor.green_starts
+        cycle = corridor.cycle_length
+        return {
+            'forward_bandwidth': band_width(green_starts, corridor.green_times, -corridor.forward_times, cycle),
+            'reverse_bandwidth': band_width(green_starts, corridor.green_times, corridor.reverse_times, cycle)
+        }
+
+    @staticmethod
+    def apply_to_engine(engine, result: Dict, plan_name: str):
+        """
+        把相位差写入配时方案引擎：为每个路口生成带新相位差的专用方案
+
+        引擎的周期以统一参考时刻对齐，写入后各路口的相位开始时刻即按绿波协调；
+        优化时改变了周期的，相位时长按比例缩放到新周期。
+        """
+        from controllers.timing_plans import TimingPlan
+
+        plans = []
+        for intersection_id, offset in zip(result['intersection_ids'], result['offsets']):
+            plan = engine.get_plan(plan_name, intersection_id)
+            plans.append(TimingPlan(f'{plan_name}@{intersection_id}',
+                                    _scale_splits(plan.splits, result['cycle_length']),
+                                    yellow=plan.yellow, all_red=plan.all_red, offset=float(offset)))
+        engine.override_plans(result['intersection_ids'], plan_name, plans)
+
+    @staticmethod
+    def apply_to_controllers(result: Dict, controllers: Dict, phase: int = 0):
+        """
+        把协调参数下发给自适应控制器（AdaptiveTrafficController.set_coordination）
+
+        Args:
+            result: optimize 的结果
+            controllers: {路口ID: 控制器}，没有控制器的路口跳过
+            phase: 协调相位
+        """
+        for i, intersection_id in enumerate(result['intersection_ids']):
+            controller = controllers.get(intersection_id)
+            if controller is not None:
+                controller.set_coordination(result['cycle_length'], float(result['green_starts'][i]),
+                                            float(result['green_times'][i]), phase)
+
+    @staticmethod
+    def next_green_starts(result: Dict, timestamp: float) -> Dict[str, float]:
+        """
+        各路口协调相位下一次绿灯开始的时刻（Unix时间）
+
+        相位差以Unix纪元为参考时刻，可直接作为控制器的相位开始时间。
+        """
+        cycle = result['cycle_length']
+        starts = timestamp + np.mod(result['green_starts'] - timestamp, cycle)
+        return {intersection_id: float(start) for intersection_id, start in zip(result['intersection_ids'], starts)}
+
+
+# 全局优化器实例
+green_wave_optimizer = None
+
+
+def get_green_wave_optimizer() -> GreenWaveOptimizer:
+    """获取全局绿波优化器"""
+    global green_wave_optimizer
+    if green_wave_optimizer is None:
+        green_wave_optimizer = GreenWaveOptimizer()
+    return green_wave_optimizer
@@ -0,0 +1,246 @@
+import logging
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 单车道饱和流率（辆/小时）
+DEFAULT_SATURATION_FLOW = 1800.0
+# 车辆计数（vehicle_count）对应的统计时长（秒），用于换算小时流率
+DEFAULT_COUNT_INTERVAL = 120.0
+
+# 两相位路口：南北直行、东西直行
+TWO_PHASE_DIRECTIONS = (('north', 'south'), ('east', 'west'))
+
+
+class WebsterTimingOptimizer:
+    """
+    Webster 最佳周期与绿信比优化
+
+    对每个路口，相位的流量比 y = 关键车道流量 / 饱和流率，路口流量比
+    Y = Σy，总损失时间 L = Σ相位损失时间。最佳周期
+
+        C0 = (1.5L + 5) / (1 - Y)
+
+    截断到 [min_cycle, max_cycle]；有效绿灯总时间 C - L 按 y 的比例分配给
+    各相位，并保证最短绿灯。所有计算都是 (路口数, 相位数) 数组上的向量化
+    运算，可一次优化整个路网。
+    """
+
+    def __init__(self, saturation_flow: float = DEFAULT_SATURATION_FLOW,
+                 yellow: int = 3, all_red: int = 2, lost_time: Optional[int] = None,
+                 min_green: int = 10, min_cycle: int = 40, max_cycle: int = 180,
+                 max_flow_ratio: float = 0.9):
+        """
+        Args:
+            saturation_flow: 单车道饱和流率（辆/小时）
+            yellow: 黄灯时间（秒）
+            all_red: 全红时间（秒）
+            lost_time: 每相位损失时间（秒），默认为黄灯+全红
+            min_green: 最短绿灯时间（秒）
+            min_cycle: 最短周期（秒）
+            max_cycle: 最长周期（秒）
+            max_flow_ratio: 计算周期时流量比 Y 的上限，过饱和路口按此值（即接近
+                最长周期）计算
+        """
+        self.saturation_flow = saturation_flow
+        self.yellow = yellow
+        self.all_red = all_red
+        self.lost_time = yellow + all_red if lost_time is None else lost_time
+        self.min_green = min_green
+        self.min_cycle = min_cycle
+        self.max_cycle = max_cycle
+        self.max_flow_ratio = max_flow_ratio
+
+    def optimize(self, flows, saturation_flow=None, phase_mask=None) -> Dict[str, np.ndarray]:
+        """
+        计算最佳周期与各相位绿灯时间
+
+        Args:
+            flows: 各相位关键车道流量（辆/小时），形状 (路口数, 相位数) 或 (相位数,)
+            saturation_flow: 饱和流率，标量或与 flows 同形状，默认使用构造参数
+            phase_mask: 相位是否存在 (路口数, 相位数)，用于相位数不同的路口，默认全部存在
+
+        Returns:
+            dict: cycle_length (N,)、green (N, K) 有效绿灯、splits (N, K) 相位时长
+                （含黄灯和全红）、flow_ratio (N, K)、critical_ratio (N,)、
+                degree_of_saturation (N, K)、delay (N, K) 与 average_delay (N,)
+                Webster 平均延误（秒/辆）。输入为一维时输出去掉路口维度
+        """
+        flows = np.asarray(flows, dtype=np.float64)
+        single = flows.ndim == 1
+        flows = np.atleast_2d(flows)
+        mask = np.ones(flows.shape, dtype=np.bool_) if phase_mask is None \
+            else np.atleast_2d(np.asarray(phase_mask, dtype=np.bool_))
+        saturation = np.broadcast_to(
+            np.asarray(self.saturation_flow if saturation_flow is None else saturation_flow, dtype=np.float64),
+            flows.shape
+        )
+
+        flow_ratio = np.where(mask, np.maximum(flows, 0.0) / saturation, 0.0)
+        critical_ratio = flow_ratio.sum(axis=1)
+        num_phases = mask.sum(axis=1)
+        total_lost = num_phases * self.lost_time
+
+        # 最佳周期，不小于满足全部最短绿灯所需的周期
+        ratio = np.minimum(critical_ratio, self.max_flow_ratio)
+        cycle = (1.5 * total_lost + 5.0) / (1.0 - ratio)
+        min_cycle = np.maximum(self.min_cycle, num_phases * (self.min_green + self.lost_time))
+        cycle = np.ceil(np.clip(cycle, min_cycle, np.maximum(self.max_cycle, min_cycle))).astype(np.int64)
+
+        green = self._split_green(cycle - total_lost, flow_ratio, mask)
+        splits = np.where(mask, green + self.lost_time, 0)
+
+        # 饱和度与 Webster 延误（前两项）
+        green_ratio = green / cycle[:, None]
+        capacity_ratio = np.divide(flow_ratio, green_ratio, out=np.zeros_like(flow_ratio), where=green_ratio > 0)
+        x = np.minimum(capacity_ratio, 0.99)
+        arrival_rate = np.maximum(flows, 1e-9) / 3600.0
+        delay = cycle[:, None] * (1 - green_ratio) ** 2 / (2 * (1 - green_ratio * x)) \
+            + x ** 2 / (2 * arrival_rate * (1 - x))
+        delay = np.where(mask, delay, 0.0)
+        weights = np.where(mask, np.maximum(flows, 0.0), 0.0)
+        total_flow = weights.sum(axis=1)
+        average_delay = np.divide((delay * weights).sum(axis=1), total_flow,
+                                  out=np.zeros_like(total_flow), where=total_flow > 0)
+
+        result = {
+            'cycle_length': cycle,
+            'green': green,
+            'splits': splits,
+            'flow_ratio': flow_ratio,
+            'critical_ratio': critical_ratio,
+            'degree_of_saturation': capacity_ratio,
+            'delay': delay,
+            'average_delay': average_delay
+        }
+        if single:
+            result = {key: value[0] for key, value in result.items()}
+        return result
+
+    def _split_green(self, available: np.ndarray, flow_ratio: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        """
+        按流量比分配有效绿灯（整数秒），不足最短绿灯的相位固定为最短绿灯，
+        其余时间在剩下的相位间重新按比例分配
+        """
+        num_rows, num_cols = flow_ratio.shape
+        # 全部相位流量为0时平均分配
+        weights = np.where(flow_ratio.sum(axis=1, keepdims=True) > 0, flow_ratio, mask.astype(np.float64))
+        fixed = np.zeros_like(mask)
+        share = np.zeros_like(flow_ratio)
+        for _ in range(num_cols):
+            free = mask & ~fixed
+            free_weight = np.where(free, weights, 0.0)
+            remaining = available - self.min_green * fixed.sum(axis=1)
+            total = free_weight.sum(axis=1, keepdims=True)
+            share = np.divide(free_weight * remaining[:, None], total,
+                              out=np.zeros_like(free_weight), where=total > 0)
+            short = free & (share < self.min_green)
+            if not short.any():
+                break
+            fixed |= short
+        green = np.where(fixed, float(self.min_green), np.where(mask, share, 0.0))
+
+        # 取整：向下取整后把剩余秒数分给小数部分最大的相位
+        floor = np.floor(green)
+        leftover = (available - floor.sum(axis=1)).astype(np.int64)
+        fraction = np.where(mask & ~fixed, green - floor, -1.0)
+        order = np.argsort(-fraction, axis=1, kind='stable')
+        rank = np.empty_like(order)
+        rank[np.arange(num_rows)[:, None], order] = np.arange(num_cols)
+        return (floor + (rank < leftover[:, None]) * (mask & ~fixed)).astype(np.int64)
+
+    def to_plans(self, result: Dict[str, np.ndarray], names: Sequence[str],
+                 offsets=None, phase_mask=None) -> List:
+        """
+        把 optimize 的结果转换为 TimingPlan 列表
+
+        Args:
+            result: optimize 的返回值（二维）
+            names: 每个路口的方案名称
+            offsets: 各路口相位差（秒），默认0
+            phase_mask: 与 optimize 相同的相位掩码
+        """
+        from controllers.timing_plans import TimingPlan
+
+        splits = result['splits']
+        mask = splits > 0 if phase_mask is None else np.asarray(phase_mask, dtype=np.bool_)
+        offsets = np.zeros(len(names)) if offsets is None else np.broadcast_to(offsets, (len(names),))
+        return [
+            TimingPlan(name, splits[i][mask[i]], yellow=self.yellow, all_red=self.all_red, offset=offsets[i])
+            for i, name in enumerate(names)
+        ]
+
+    def optimize_network(self, engine, intersection_ids: Sequence[str], flows,
+                         plan_name: Optional[str] = None, saturation_flow=None,
+                         phase_mask=None, timestamp: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """
+        批量重新优化整个路网的配时并写入配时方案引擎
+
+        每个路口得到一个专用方案，替换它在时段表中名为 plan_name 的方案
+        （默认替换该路口当前生效的方案），保留原方案的相位差。
+
+        Args:
+            engine: TimingPlanEngine
+            intersection_ids: 路口ID列表
+            flows: (路口数, 相位数) 关键车道流量（辆/小时）
+            plan_name: 要替换的方案名称，默认各路口当前生效的方案
+            saturation_flow: 饱和流率
+            phase_mask: 相位掩码
+            timestamp: 确定“当前生效方案”的时刻，默认当前时间
+
+        Returns:
+            dict: optimize 的结果
+        """
+        result = self.optimize(np.atleast_2d(flows), saturation_flow, phase_mask)
+
+        if plan_name is None:
+            status = engine.evaluate(timestamp, intersection_ids)
+            keys = [status['key_names'][k] for k in status['plan_key']]
+        else:
+            keys = [plan_name] * len(intersection_ids)
+        offsets = [engine.get_plan(key, intersection_id).offset
+                   for key, intersection_id in zip(keys, intersection_ids)]
+        plans = self.to_plans(result, [f'{key}@{iid}' for key, iid in zip(keys, intersection_ids)],
+                              offsets, phase_mask)
+
+        by_key: Dict[str, List] = {}
+        for intersection_id, key, plan in zip(intersection_ids, keys, plans):
+            by_key.setdefault(key, []).append((intersection_id, plan))
+        for key, items in by_key.items():
+            engine.override_plans([i for i, _ in items], key, [p for _, p in items])
+
+        logger.info(f"Webster timing re-optimized for {len(intersection_ids)} intersections")
+        return result
+
+
+def phase_flows_from_lanes(lanes, phase_directions=TWO_PHASE_DIRECTIONS,
+                           count_interval: float = DEFAULT_COUNT_INTERVAL) -> np.ndarray:
+    """
+    由车道车辆计数得到各相位关键车道流量（辆/小时）
+
+    Args:
+        lanes: Lane 列表（direction、vehicle_count）
+        phase_directions: 每个相位放行的方向
+        count_interval: vehicle_count 的统计时长（秒）
+    """
+    flows = np.zeros(len(phase_directions))
+    for lane in lanes:
+        rate = lane.vehicle_count * 3600.0 / count_interval
+        for phase, directions in enumerate(phase_directions):
+            if lane.direction in directions:
+                flows[phase] = max(flows[phase], rate)
+    return flows
+
+
+# 全局优化器实例
+webster_optimizer = None
+
+
+def get_webster_optimizer() -> WebsterTimingOptimizer:
+    """获取全局配时优化器"""
+    global webster_optimizer
+    if webster_optimizer is None:
+        webster_optimizer = WebsterTimingOptimizer()
+    return webster_optimizer
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""DRL控制器推理吞吐量基准：逐路口 predict 与批量推理对比"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+import numpy as np
+from controllers.drl_traffic_controller import DRLTrafficController
+
+
+def make_traffic_data() -> dict:
+    """生成随机交通数据"""
+    data = {}
+    for lane in DRLTrafficController.LANES:
+        data[lane] = random.randint(0, 30)
+        data[f'{lane}_wait'] = random.uniform(0, 60)
+    return data
+
+
+def build_controllers(count: int, model_path: str):
+    """构建共享同一策略网络的控制器"""
+    base = DRLTrafficController("bench_0", model_path=model_path)
+    base.epsilon = 0.0
+    controllers = [base]
+    for i in range(1, count):
+        controller = DRLTrafficController.__new__(DRLTrafficController)
+        controller.__dict__.update(base.__dict__)
+        controller.intersection_id = f"bench_{i}"
+        controllers.append(controller)
+    return controllers
+
+
+def run_benchmark(intersections: int, rounds: int, model_path: str):
+    controllers = build_controllers(intersections, model_path)
+    traffic = [make_traffic_data() for _ in controllers]
+    states = [c._get_state(d) for c, d in zip(controllers, traffic)]
+
+    # 预热
+    controllers[0]._choose_action(states[0])
+    DRLTrafficController.choose_actions_batch(controllers, states)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for controller, state in zip(controllers, states):
+            controller._choose_action(state)
+    per_call_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        DRLTrafficController.choose_actions_batch(controllers, states)
+    batch_elapsed = time.perf_counter() - start
+
+    decisions = intersections * rounds
+    per_call_rate = decisions / per_call_elapsed
+    batch_rate = decisions / batch_elapsed
+    print(f"路口数: {intersections}, 轮数: {rounds}")
+    print(f"  逐路口 predict: {per_call_rate:10.1f} 决策/秒")
+    print(f"  批量推理:       {batch_rate:10.1f} 决策/秒 (加速 {batch_rate / per_call_rate:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--intersections', type=int, nargs='+', default=[1, 10, 100, 300])
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--model-path', default=tempfile.mkdtemp(prefix='drl_bench_'))
+    args = parser.parse_args()
+
+    random.seed(0)
+    np.random.seed(0)
+    for n in args.intersections:
+        run_benchmark(n, args.rounds, args.model_path)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""int8量化策略基准：与浮点NumPy/Keras推理对比延迟、权重大小、动作一致率和Q值误差"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+import numpy as np
+from controllers.drl_traffic_controller import DRLTrafficController
+from controllers.drl_vec_env import VectorizedTrafficEnv
+from controllers.numpy_policy import NumpyPolicy, compare_policies
+
+
+def time_per_call(fn, states: np.ndarray, repeats: int) -> float:
+    """单次调用平均耗时（微秒）"""
+    fn(states)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(states)
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def print_accuracy(name: str, report: dict):
+    print(f"{name}: {report['samples']} 个状态，浮点策略选择了 {report['distinct_actions']} 种动作")
+    print(f"  动作不一致率: {report['action_mismatch_rate']:.4%}")
+    print(f"  Q值绝对误差: 最大 {report['max_abs_q_error']:.4f}, 平均 {report['mean_abs_q_error']:.4f} "
+          f"(平均相对误差 {report['relative_q_error']:.4%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--experience-steps', type=int, default=200, help='用向量化环境生成校准经验的步数')
+    parser.add_argument('--train-steps', type=int, default=200, help='量化前的训练步数')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 32, 256])
+    parser.add_argument('--repeats', type=int, default=500)
+    args = parser.parse_args()
+
+    np.random.seed(0)
+    with tempfile.TemporaryDirectory(prefix='drl_bench_') as model_path:
+        controller = DRLTrafficController("bench_int8", model_path=model_path, memory_size=50000)
+        env = VectorizedTrafficEnv(64, seed=0)
+        controller.gather_experience(env, args.experience_steps)
+        for _ in range(args.train_steps):
+            controller._replay()
+
+        float_policy = NumpyPolicy.from_keras(controller.q_network)
+        # 默认的精度检查：在校准范围内按状态布局随机生成的状态
+        report = controller.quantize_policy()
+        quantized = controller.numpy_policy
+
+        print(f"校准样本: {report['calibration_samples']}")
+        print_accuracy("随机状态", report)
+        # 另一组仿真路口（不同种子）产生的真实状态，均未参与校准
+        heldout_env = VectorizedTrafficEnv(64, seed=1)
+        heldout_states = np.concatenate([
+            heldout_env.step(np.random.randint(0, heldout_env.num_phases, heldout_env.num_envs))[0]
+            for _ in range(args.experience_steps)
+        ])
+        print_accuracy("新仿真状态", compare_policies(float_policy, quantized, heldout_states))
+
+        print(f"权重: 浮点NumPy {float_policy.parameter_bytes()} 字节, "
+              f"int8模型 {quantized.parameter_bytes()} 字节 "
+              f"({float_policy.parameter_bytes() / quantized.parameter_bytes():.1f}x)")
+
+        for batch in args.batch_sizes:
+            states = heldout_states[:batch]
+            keras_us = time_per_call(controller.q_network.predict_on_batch, states, max(1, args.repeats // 10))
+            float_us = time_per_call(float_policy.predict_on_batch, states, args.repeats)
+            int8_us = time_per_call(quantized.predict_on_batch, states, args.repeats)
+            print(f"批大小 {batch:4d}: Keras {keras_us:9.1f} us  NumPy浮点 {float_us:8.1f} us  "
+                  f"int8 {int8_us:8.1f} us ({float_us / int8_us:.1f}x)")
+        controller.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""DRL控制器启动耗时报告：模块导入、TensorFlow导入分解、模型构建与预热"""
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+IMPORTTIME_RE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def measure_subprocess_import(statement: str) -> float:
+    """在全新子进程中测量一条导入语句的耗时（秒）"""
+    code = f"import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)"
+    result = subprocess.run([sys.executable, '-c', code], cwd=BACKEND_DIR,
+                            capture_output=True, text=True, env=os.environ.copy())
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def tensorflow_import_breakdown(top: int):
+    """使用 -X importtime 统计 TensorFlow 导入时各顶层包的自身耗时"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import tensorflow'],
+                            capture_output=True, text=True, env=os.environ.copy())
+    by_package = defaultdict(int)
+    total = 0
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        self_us = int(match.group(1))
+        package = match.group(4).split('.')[0]
+        by_package[package] += self_us
+        total += self_us
+
+    print(f"\nTensorFlow 导入分解（合计 {total / 1e6:.2f}s，按顶层包统计自身耗时）:")
+    for package, self_us in sorted(by_package.items(), key=lambda x: -x[1])[:top]:
+        print(f"  {package:30s} {self_us / 1e6:8.3f}s  {self_us / total * 100:5.1f}%")
+
+
+def controller_startup():
+    """测量控制器构建、预热和首次决策耗时"""
+    from controllers.drl_traffic_controller import DRLTrafficController, get_tensorflow_import_timings
+
+    model_path = tempfile.mkdtemp(prefix='drl_startup_')
+    traffic = {lane: 10 for lane in DRLTrafficController.LANES}
+
+    start = time.perf_counter()
+    warm = DRLTrafficController("warm", model_path=model_path)
+    build_time = time.perf_counter() - start
+    print("\n控制器启动:")
+    for name, seconds in get_tensorflow_import_timings().items():
+        print(f"  导入 {name:34s} {seconds:8.3f}s")
+    print(f"  首个控制器构建（含导入）            {build_time:8.3f}s")
+
+    for name, seconds in warm.warm_up().items():
+        print(f"  预热 {name:34s} {seconds:8.3f}s")
+
+    cold = DRLTrafficController("cold", model_path=model_path)
+    for controller in (warm, cold):
+        controller.epsilon = 0.0
+        start = time.perf_counter()
+        controller.get_next_phase(traffic)
+        label = '已预热' if controller is warm else '未预热'
+        print(f"  首次决策（{label}）                  {(time.perf_counter() - start) * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--top', type=int, default=10, help='导入分解中显示的包数量')
+    args = parser.parse_args()
+
+    print("模块导入（全新进程）:")
+    print(f"  controllers.drl_traffic_controller {measure_subprocess_import('import controllers.drl_traffic_controller'):8.3f}s")
+    print(f"  tensorflow                         {measure_subprocess_import('import tensorflow'):8.3f}s")
+    tensorflow_import_breakdown(args.top)
+    controller_startup()
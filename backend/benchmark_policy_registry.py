@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""共享策略注册表内存基准：每增加一个路口的内存增量（独立模型 vs 共享策略）"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import resource
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+MODES = {
+    'independent': '每个路口独立构建Keras模型',
+    'shared': '共享Keras策略',
+    'shared_numpy': '共享NumPy策略（仅推理）',
+}
+
+
+def current_rss_mb() -> float:
+    """当前进程常驻内存（MB）"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    # 非Linux平台退化为峰值常驻内存
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def run_mode(mode: str, count: int, memory_size: int):
+    """在当前进程中创建 count 个控制器并输出内存增量"""
+    from controllers.drl_traffic_controller import DRLTrafficController, _import_tensorflow
+    from controllers.policy_registry import get_policy_registry
+
+    model_path = tempfile.mkdtemp(prefix='drl_registry_')
+    kwargs = {'model_path': model_path, 'memory_size': memory_size}
+    if mode == 'shared':
+        kwargs['policy_name'] = 'city'
+    elif mode == 'shared_numpy':
+        seed = DRLTrafficController('seed', model_path=model_path)
+        seed.policy_name = 'city'
+        seed.export_policy()
+        kwargs.update(policy_name='city', inference_only=True)
+    else:
+        _import_tensorflow()
+
+    controllers = [DRLTrafficController('i0', **kwargs)]
+    baseline = current_rss_mb()
+    start = time.perf_counter()
+    for i in range(1, count):
+        controllers.append(DRLTrafficController(f'i{i}', **kwargs))
+    elapsed = time.perf_counter() - start
+    growth = current_rss_mb() - baseline
+
+    print(f"{MODES[mode]}:")
+    print(f"  每增加一个路口: {growth / (count - 1):8.3f} MB, {elapsed / (count - 1) * 1000:8.1f} ms")
+    print(f"  注册表: {get_policy_registry().get_stats()['loaded_policies']} 个已加载策略")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--intersections', type=int, default=50)
+    parser.add_argument('--memory-size', type=int, default=10000, help='每个路口的经验回放容量（共享策略的路口不分配）')
+    parser.add_argument('--mode', choices=list(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.intersections, args.memory_size)
+    else:
+        # 每种模式在独立进程中运行，互不影响
+        for mode in MODES:
+            subprocess.run([sys.executable, os.path.abspath(__file__), '--mode', mode,
+                            '--intersections', str(args.intersections),
+                            '--memory-size', str(args.memory_size)], cwd=BACKEND_DIR)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""经验回放基准：均匀采样与优先经验回放（求和树）的采样+更新吞吐量"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from controllers.replay_buffer import ReplayBuffer, PrioritizedReplayBuffer
+
+STATE_SIZE = 21
+
+
+def fill_buffer(buffer: ReplayBuffer, count: int):
+    """填充随机经验"""
+    n = min(count, buffer.capacity)
+    buffer.states[:n] = np.random.random((n, STATE_SIZE))
+    buffer.actions[:n] = np.random.randint(0, 4, n)
+    buffer.rewards[:n] = np.random.random(n)
+    buffer.next_states[:n] = np.random.random((n, STATE_SIZE))
+    buffer._meta[:] = (n % buffer.capacity, n)
+    if isinstance(buffer, PrioritizedReplayBuffer):
+        buffer.tree.update(np.arange(n), np.random.random(n) + 0.01)
+
+
+def run_benchmark(size: int, batch_size: int, iterations: int):
+    uniform = ReplayBuffer(size, STATE_SIZE)
+    prioritized = PrioritizedReplayBuffer(size, STATE_SIZE)
+    fill_buffer(uniform, size)
+    fill_buffer(prioritized, size)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        uniform.sample(batch_size)
+    uniform_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        batch = prioritized.sample_with_weights(batch_size)
+        prioritized.update_priorities(batch[5], np.random.random(batch_size))
+    prioritized_elapsed = time.perf_counter() - start
+
+    print(f"经验条数: {size}, 批大小: {batch_size}")
+    print(f"  均匀采样:           {iterations / uniform_elapsed:10.1f} 批/秒")
+    print(f"  优先回放采样+更新:  {iterations / prioritized_elapsed:10.1f} 批/秒 "
+          f"({iterations * batch_size / prioritized_elapsed:.0f} 条/秒)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[32, 256])
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    np.random.seed(0)
+    for size in args.sizes:
+        for batch_size in args.batch_sizes:
+            run_benchmark(size, batch_size, args.iterations)
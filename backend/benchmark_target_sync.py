@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""目标网络同步开销基准：get_weights/set_weights 与原地硬同步、Polyak软更新对比"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+from controllers.drl_traffic_controller import _import_tensorflow
+from controllers.target_sync import TargetNetworkSync
+
+
+def build_network(keras, input_size: int, hidden_units, outputs: int):
+    """构建与DQN结构相同的多层感知机（Dense + BatchNormalization）"""
+    inputs = keras.layers.Input(shape=(input_size,))
+    x = inputs
+    for units in hidden_units:
+        x = keras.layers.Dense(units, activation='relu')(x)
+        x = keras.layers.BatchNormalization()(x)
+    return keras.Model(inputs=inputs, outputs=keras.layers.Dense(outputs)(x))
+
+
+def time_per_call(fn, repeats: int) -> float:
+    """单次调用平均耗时（微秒）"""
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def run_benchmark(keras, hidden_units, repeats: int):
+    online = build_network(keras, 21, hidden_units, 4)
+    target = build_network(keras, 21, hidden_units, 4)
+    sync = TargetNetworkSync(online, target)
+    parameters = online.count_params()
+
+    copy_us = time_per_call(lambda: target.set_weights(online.get_weights()), repeats)
+    hard_us = time_per_call(sync.hard_update, repeats)
+    soft_us = time_per_call(lambda: sync.soft_update(0.005), repeats)
+
+    label = 'x'.join(str(u) for u in hidden_units)
+    print(f"隐藏层 {label:>16s} ({parameters:>9d} 参数): "
+          f"get/set_weights {copy_us:10.1f} us  原地硬同步 {hard_us:8.1f} us  软更新 {soft_us:8.1f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', nargs='+', default=['128,64,32', '256,256', '512,512,256', '1024,1024,512'],
+                        help='隐藏层宽度，逗号分隔')
+    parser.add_argument('--repeats', type=int, default=200)
+    args = parser.parse_args()
+
+    if not _import_tensorflow():
+        sys.exit("TensorFlow is required for this benchmark")
+    from controllers.drl_traffic_controller import keras
+
+    for size in args.sizes:
+        run_benchmark(keras, [int(u) for u in size.split(',')], args.repeats)
@@ -1,15 +1,30 @@
 ﻿import numpy as np
 import random
 import time
-from collections import defaultdict
+import threading
 import logging
-from typing import Dict, List, Tuple
-import json
+from typing import Dict, List, Tuple, Union
 import os
 
+from .q_table import DenseQTable
+from .q_table_store import QTableStore
+from .control_history import ControlHistory
+from .timing_plans import TimingPlan, TimingPlanEngine, get_timing_plan_engine
+from algorithms.signal_timing import get_webster_optimizer
+
 logger = logging.getLogger(__name__)
 
 class AdaptiveTrafficController:
+    # 相位定义（十字路口）
+    PHASES = {
+        0: {'name': 'North-South', 'directions': ['north', 'south']},
+        1: {'name': 'East-West', 'directions': ['east', 'west']},
+        2: {'name': 'North-Left', 'directions': ['north_left']},
+        3: {'name': 'East-Left', 'directions': ['east_left']},
+        4: {'name': 'South-Left', 'directions': ['south_left']},
+        5: {'name': 'West-Left', 'directions': ['west_left']}
+    }
+    
     def __init__(self, intersection_id: str, model_path: str = None):
         self.intersection_id = intersection_id
         self.model_path = model_path or os.path.join(os.path.dirname(__file__), 'models')
@@ -29,37 +44,48 @@ class AdaptiveTrafficController:
         self.all_red_time = 2  # 全红时间（秒）
         
         # 相位定义（十字路口）
-        self.phases = {
-            0: {'name': 'North-South', 'directions': ['north', 'south']},
-            1: {'name': 'East-West', 'directions': ['east', 'west']},
-            2: {'name': 'North-Left', 'directions': ['north_left']},
-            3: {'name': 'East-Left', 'directions': ['east_left']},
-            4: {'name': 'South-Left', 'directions': ['south_left']},
-            5: {'name': 'West-Left', 'directions': ['west_left']}
-        }
+        self.phases = dict(self.PHASES)
         
         # 当前状态
         self.current_phase = 0
         self.phase_timer = 0
         self.phase_start_time = time.time()
         
-        # Q表
-        self.q_table = defaultdict(lambda: defaultdict(float))
+        # 干线协调参数（见 set_coordination），None 表示独立运行
+        self.coordination = None
         
         # 状态和动作空间
+        self.congestion_levels = ['low', 'medium', 'high']
         self.state_space = self._define_state_space()
         self.action_space = self._define_action_space()
         
-        # 历史数据
-        self.control_history = []
+        # Q表：状态/动作编码为下标（即在 state_space / action_space 中的位置）
+        self.q_table = DenseQTable(self.state_space, self.action_space)
+        
+        # 每个状态四个方向的平均拥堵程度（用于奖励计算）
+        congestion_map = np.array([0.2, 0.5, 0.8])
+        levels = np.indices((3, 3, 3, 3, len(self.phases)))[:4].reshape(4, -1)
+        self._state_congestion = congestion_map[levels].mean(axis=0)
+        
+        # 历史数据：内存中保留最近的动作，更早的记录分批写入磁盘日志
+        self.control_history = ControlHistory(self.model_path, f'control_history_{intersection_id}')
+        
+        # act 之后等待 observe 完成Q更新的转移: (状态下标, 动作下标, 执行时间)
+        self._pending_transition = None
+        self._step_lock = threading.Lock()
+        self.completed_updates = 0
+        
+        # Q表持久化：二进制快照 + 追加式更新日志，由后台线程写入
+        self.q_store = QTableStore(self.model_path, f'q_table_{intersection_id}')
         
         # 加载模型
         self._load_model()
+        self.q_store.start()
     
     def _define_state_space(self) -> List[str]:
         """定义状态空间"""
         # 状态基于各方向的拥堵等级和当前相位
-        congestion_levels = ['low', 'medium', 'high']
+        congestion_levels = self.congestion_levels
         phases = list(self.phases.keys())
         
         states = []
@@ -90,82 +116,107 @@ class AdaptiveTrafficController:
         
         return actions
     
+    def _json_model_file(self) -> str:
+        """原JSON格式Q表的路径"""
+        return os.path.join(self.model_path, f'q_table_{self.intersection_id}.json')
+    
     def _load_model(self):
-        """加载Q表"""
+        """加载Q表（优先二进制快照和更新日志，其次原JSON文件）"""
         try:
-            model_file = os.path.join(self.model_path, f'q_table_{self.intersection_id}.json')
-            if os.path.exists(model_file):
-                with open(model_file, 'r') as f:
-                    self.q_table = defaultdict(lambda: defaultdict(float), json.load(f))
+            model_file = self._json_model_file()
+            if self.q_store.exists():
+                self.q_store.load(self.q_table)
                 logger.info("加载Q-Learning模型成功")
+            elif os.path.exists(model_file):
+                # 从JSON迁移：读入后立即写一次二进制快照
+                self.q_table.load_json(model_file)
+                self.q_store.attach(self.q_table)
+                self.q_store.request_snapshot()
+                logger.info("加载Q-Learning模型成功（JSON格式）")
             else:
+                self.q_store.attach(self.q_table)
                 logger.info("未找到现有模型，将从零开始学习")
         except Exception as e:
+            self.q_store.attach(self.q_table)
             logger.error(f"加载模型失败: {e}")
     
     def _save_model(self):
-        """保存Q表"""
-        try:
-            model_file = os.path.join(self.model_path, f'q_table_{self.intersection_id}.json')
-            # 转换为普通字典以便JSON序列化
-            q_table_dict = {state: dict(actions) for state, actions in self.q_table.items()}
-            
-            with open(model_file, 'w') as f:
-                json.dump(q_table_dict, f, indent=2)
-            
-            logger.info("Q-Learning模型保存成功")
-        except Exception as e:
-            logger.error(f"保存模型失败: {e}")
+        """请求保存Q表快照（由后台线程原子写入，不阻塞控制线程）"""
+        self.q_store.request_snapshot()
     
-    def get_current_state(self, traffic_data: Dict) -> str:
-        """根据交通数据获取当前状态"""
+    def export_json(self, filepath: str = None) -> str:
+        """以原JSON格式导出Q表"""
+        filepath = filepath or self._json_model_file()
+        self.q_table.save_json(filepath)
+        logger.info(f"Q表已导出: {filepath}")
+        return filepath
+    
+    def close(self):
+        """写出剩余更新和最终快照，停止持久化线程，控制历史全部落盘"""
+        self.q_store.close()
+        self.control_history.flush()
+    
+    def encode_state(self, north: int, south: int, east: int, west: int, phase: int) -> int:
+        """将四个方向的拥堵等级（0/1/2）和当前相位编码为状态下标"""
+        return (((north * 3 + south) * 3 + east) * 3 + west) * len(self.phases) + phase
+    
+    def get_state_index(self, traffic_data: Dict) -> int:
+        """根据交通数据获取当前状态下标"""
         try:
             lanes = traffic_data.get('lanes', {})
             
-            # 计算各方向的拥堵等级
-            direction_congestion = {}
-            for direction in ['north', 'south', 'east', 'west']:
-                dir_lanes = [lane for lane in lanes.values() if lane.get('direction') == direction]
-                if dir_lanes:
-                    avg_congestion = np.mean([lane.get('congestion_level', 0.5) for lane in dir_lanes])
-                    
-                    if avg_congestion < 0.3:
-                        congestion_level = 'low'
-                    elif avg_congestion < 0.7:
-                        congestion_level = 'medium'
-                    else:
-                        congestion_level = 'high'
+            # 一次遍历累计各方向的拥堵程度
+            totals = {'north': 0.0, 'south': 0.0, 'east': 0.0, 'west': 0.0}
+            counts = {'north': 0, 'south': 0, 'east': 0, 'west': 0}
+            for lane in lanes.values():
+                direction = lane.get('direction')
+                if direction in totals:
+                    totals[direction] += lane.get('congestion_level', 0.5)
+                    counts[direction] += 1
+            
+            # 拥堵等级: <0.3 low, <0.7 medium, 其余 high；没有车道数据的方向记为 low
+            levels = []
+            for direction in ('north', 'south', 'east', 'west'):
+                if counts[direction]:
+                    avg_congestion = totals[direction] / counts[direction]
+                    levels.append(0 if avg_congestion < 0.3 else (1 if avg_congestion < 0.7 else 2))
                 else:
-                    congestion_level = 'low'
-                
-                direction_congestion[direction] = congestion_level
-            
-            # 构建状态字符串
-            state = f"{direction_congestion['north']}_{direction_congestion['south']}_" \
-                   f"{direction_congestion['east']}_{direction_congestion['west']}_" \
-                   f"{self.current_phase}"
+                    levels.append(0)
             
-            return state
+            return self.encode_state(*levels, self.current_phase)
             
         except Exception as e:
             logger.error(f"获取当前状态失败: {e}")
-            return f"low_low_low_low_{self.current_phase}"
+            return self.encode_state(0, 0, 0, 0, self.current_phase)
     
-    def choose_action(self, state: str) -> str:
-        """选择动作（ε-贪婪策略）"""
+    def get_current_state(self, traffic_data: Dict) -> str:
+        """根据交通数据获取当前状态"""
+        return self.state_space[self.get_state_index(traffic_data)]
+    
+    def _state_id(self, state: Union[str, int]) -> int:
+        """状态名称或下标统一为下标"""
+        return self.q_table.state_index[state] if isinstance(state, str) else int(state)
+    
+    def _action_id(self, action: Union[str, int]) -> int:
+        """动作名称或下标统一为下标"""
+        return self.q_table.action_index[action] if isinstance(action, str) else int(action)
+    
+    def choose_action_index(self, state: int) -> int:
+        """选择动作下标（ε-贪婪策略）"""
         if random.random() < self.epsilon:
             # 探索：随机选择动作
-            action = random.choice(self.action_space)
-        else:
-            # 利用：选择Q值最大的动作
-            state_actions = self.q_table[state]
-            if state_actions:
-                action = max(state_actions, key=state_actions.get)
-            else:
-                action = random.choice(self.action_space)
+            return random.randrange(len(self.action_space))
         
+        # 利用：选择Q值最大的动作，状态未访问过时随机选择
+        action = self.q_table.best_action(state)
+        if action < 0:
+            action = random.randrange(len(self.action_space))
         return action
     
+    def choose_action(self, state: Union[str, int]) -> str:
+        """选择动作（ε-贪婪策略）"""
+        return self.action_space[self.choose_action_index(self._state_id(state))]
+    
     def execute_action(self, action: str) -> Dict:
         """执行动作"""
         try:
@@ -243,16 +294,55 @@ class AdaptiveTrafficController:
         """切换到新相位"""
         # 这里应该包含黄灯和全红过渡逻辑
         logger.info(f"切换相位: {self.current_phase} -> {new_phase}")
-        self.phase_start_time = time.time()
+        now = time.time()
+        self.phase_start_time = now
         self.phase_timer = self.min_green_time  # 重置定时器
+        
+        # 在绿波的协调绿灯窗口内切换到协调相位时，相位开始时间对齐到绿波
+        if self.coordination is not None and new_phase == self.coordination['phase']:
+            start = self.coordinated_phase_start(now)
+            if now - start < self.coordination['green_time']:
+                self.phase_start_time = start
+                self.phase_timer = self.coordination['green_time']
     
-    def calculate_reward(self, old_state: str, action: str, new_state: str, 
-                        traffic_data: Dict) -> float:
+    def set_coordination(self, cycle_length: float, green_start: float, green_time: float, phase: int = 0):
+        """
+        设置干线协调：协调相位的绿灯在 green_start + k × cycle_length（Unix时间）开始
+        
+        Args:
+            cycle_length: 公共周期（秒）
+            green_start: 协调绿灯开始时刻（周期内位置，以Unix纪元为参考），即
+                GreenWaveOptimizer 结果中的 green_starts
+            green_time: 协调绿灯时长（秒）
+            phase: 协调相位
+        """
+        self.coordination = {
+            'cycle_length': float(cycle_length),
+            'green_start': float(green_start) % cycle_length,
+            'green_time': float(green_time),
+            'phase': phase
+        }
+        logger.info(f"路口 {self.intersection_id} 加入干线协调: 周期 {cycle_length} 秒, 绿灯开始 {green_start:.1f} 秒")
+    
+    def clear_coordination(self):
+        """退出干线协调"""
+        self.coordination = None
+    
+    def coordinated_phase_start(self, timestamp: float = None) -> float:
+        """协调相位最近一次（不晚于 timestamp）的绿灯开始时刻"""
+        timestamp = time.time() if timestamp is None else timestamp
+        cycle = self.coordination['cycle_length']
+        return timestamp - (timestamp - self.coordination['green_start']) % cycle
+    
+    def calculate_reward(self, old_state: Union[str, int], action: Union[str, int],
+                        new_state: Union[str, int], traffic_data: Dict) -> float:
         """计算奖励函数"""
         try:
             # 解析状态
             old_congestion = self._parse_state_congestion(old_state)
             new_congestion = self._parse_state_congestion(new_state)
+            if not isinstance(action, str):
+                action = self.action_space[action]
             
             # 奖励基于拥堵减少和等待时间减少
             congestion_improvement = old_congestion - new_congestion
@@ -294,30 +384,31 @@ class AdaptiveTrafficController:
             logger.error(f"计算奖励失败: {e}")
             return 0.0
     
-    def _parse_state_congestion(self, state: str) -> float:
+    def _parse_state_congestion(self, state: Union[str, int]) -> float:
         """解析状态中的拥堵等级"""
-        parts = state.split('_')
-        if len(parts) < 5:
-            return 0.5
-        
-        congestion_map = {'low': 0.2, 'medium': 0.5, 'high': 0.8}
-        direction_congestion = [congestion_map.get(parts[i], 0.5) for i in range(4)]
-        
-        return np.mean(direction_congestion)
+        if isinstance(state, str):
+            if state not in self.q_table.state_index:
+                return 0.5
+            state = self.q_table.state_index[state]
+        return float(self._state_congestion[state])
     
-    def update_q_table(self, old_state: str, action: str, reward: float, new_state: str):
+    def update_q_table(self, old_state: Union[str, int], action: Union[str, int],
+                       reward: float, new_state: Union[str, int]):
         """更新Q表"""
         try:
+            old_state = self._state_id(old_state)
+            action = self._action_id(action)
+            
             # Q-Learning更新公式
-            old_q = self.q_table[old_state][action]
+            old_q = self.q_table.get(old_state, action)
             
             # 获取新状态的最大Q值
-            new_state_actions = self.q_table[new_state]
-            max_new_q = max(new_state_actions.values()) if new_state_actions else 0
+            max_new_q = self.q_table.max_value(self._state_id(new_state))
             
             # 更新Q值
             new_q = old_q + self.alpha * (reward + self.gamma * max_new_q - old_q)
-            self.q_table[old_state][action] = new_q
+            self.q_table.set(old_state, action, new_q)
+            self.q_store.record(old_state, action, new_q)
             
             # 衰减探索率
             self.epsilon = max(self.epsilon_min, self.epsilon * self.epsilon_decay)
@@ -325,47 +416,123 @@ class AdaptiveTrafficController:
         except Exception as e:
             logger.error(f"更新Q表失败: {e}")
     
-    def control_step(self, traffic_data: Dict) -> Dict:
-        """执行一个控制步骤"""
-        try:
-            # 获取当前状态
-            current_state = self.get_current_state(traffic_data)
-            
-            # 选择动作
-            action = self.choose_action(current_state)
-            
-            # 执行动作
-            action_result = self.execute_action(action)
-            
-            # 等待一小段时间模拟交通变化
-            time.sleep(0.1)
-            
-            # 获取新状态（这里简化，实际应该等待传感器数据更新）
-            new_state = self.get_current_state(traffic_data)
-            
-            # 计算奖励
-            reward = self.calculate_reward(current_state, action, new_state, traffic_data)
-            
-            # 更新Q表
-            self.update_q_table(current_state, action, reward, new_state)
+    def act(self, observation: Dict) -> Dict:
+        """
+        根据当前观测选择并执行动作，立即返回
+        
+        Q值更新推迟到 observe 收到下一次融合数据时完成；如果上一次动作还
+        没有被 observe，当前观测即作为它的结果先完成更新。
+        
+        Args:
+            observation: 传感器融合数据
             
-            # 定期保存模型
-            if len(self.control_history) % 100 == 0:
-                self._save_model()
+        Returns:
+            dict: 状态、动作和执行结果
+        """
+        try:
+            with self._step_lock:
+                if self._pending_transition is not None:
+                    self._complete_transition(observation)
+                
+                # 获取当前状态
+                current_state = self.get_state_index(observation)
+                
+                # 选择动作
+                action_index = self.choose_action_index(current_state)
+                action = self.action_space[action_index]
+                
+                # 执行动作
+                action_result = self.execute_action(action)
+                timestamp = time.time()
+                self._pending_transition = (current_state, action_index, timestamp)
             
             return {
-                'state': current_state,
+                'state': self.state_space[current_state],
                 'action': action,
-                'reward': reward,
-                'new_state': new_state,
                 'action_result': action_result,
-                'timestamp': time.time()
+                'timestamp': timestamp
             }
             
+        except Exception as e:
+            logger.error(f"控制动作执行失败: {e}")
+            return {'error': str(e)}
+    
+    def observe(self, next_observation: Dict) -> Dict:
+        """
+        用动作之后到达的下一次融合数据完成Q更新
+        
+        Args:
+            next_observation: 动作执行后的传感器融合数据
+            
+        Returns:
+            dict: 本次更新的状态、动作、奖励和新状态；没有待更新的动作时为空字典
+        """
+        try:
+            with self._step_lock:
+                if self._pending_transition is None:
+                    return {}
+                return self._complete_transition(next_observation)
+        except Exception as e:
+            logger.error(f"Q值更新失败: {e}")
+            return {'error': str(e)}
+    
+    def has_pending_transition(self) -> bool:
+        """是否有已执行、尚未收到反馈的动作"""
+        return self._pending_transition is not None
+    
+    def _complete_transition(self, next_observation: Dict) -> Dict:
+        """计算真实奖励并更新Q表（调用方持有 _step_lock）"""
+        current_state, action_index, action_time = self._pending_transition
+        self._pending_transition = None
+        
+        # 获取新状态
+        new_state = self.get_state_index(next_observation)
+        
+        # 计算奖励
+        reward = self.calculate_reward(current_state, action_index, new_state, next_observation)
+        
+        # 更新Q表
+        self.update_q_table(current_state, action_index, reward, new_state)
+        self.completed_updates += 1
+        
+        return {
+            'state': self.state_space[current_state],
+            'action': self.action_space[action_index],
+            'reward': reward,
+            'new_state': self.state_space[new_state],
+            'action_time': action_time,
+            'timestamp': time.time()
+        }
+    
+    def control_step(self, traffic_data: Dict) -> Dict:
+        """
+        执行一个控制步骤（不阻塞）
+        
+        先用本次数据完成上一次动作的Q更新，再选择并执行新的动作。
+        上一次动作的反馈在返回值的 'feedback' 中。
+        """
+        try:
+            feedback = self.observe(traffic_data)
+            result = self.act(traffic_data)
+            result['feedback'] = feedback
+            return result
+            
         except Exception as e:
             logger.error(f"控制步骤执行失败: {e}")
             return {'error': str(e)}
     
+    def get_control_history(self, start: float = None, end: float = None,
+                            limit: int = None) -> List[Dict]:
+        """
+        按时间范围查询控制历史（覆盖内存和磁盘）
+        
+        Args:
+            start: 起始时间戳
+            end: 结束时间戳
+            limit: 最多返回最近的多少条
+        """
+        return self.control_history.query(start, end, limit)
+    
     def get_control_status(self) -> Dict:
         """获取控制状态"""
         return {
@@ -374,7 +541,10 @@ class AdaptiveTrafficController:
             'remaining_time': self._get_current_green_time(),
             'total_actions': len(self.control_history),
             'epsilon': self.epsilon,
-            'q_table_size': len(self.q_table)
+            'q_table_size': len(self.q_table),
+            'persistence': dict(self.q_store.stats),
+            'coordination': dict(self.coordination, next_green_start=self.coordinated_phase_start()
+                                 + self.coordination['cycle_length']) if self.coordination else None
         }
     
     def reset_controller(self):
@@ -383,14 +553,18 @@ class AdaptiveTrafficController:
         self.phase_timer = self.min_green_time
         self.phase_start_time = time.time()
         self.control_history.clear()
+        self._pending_transition = None
         logger.info("交通灯控制器已重置")
 
 # 基于规则的交通灯控制器（作为备选）
 class RuleBasedTrafficController:
-    def __init__(self, intersection_id: str):
+    # 没有时段表的路口共用的默认配时方案
+    DEFAULT_PLAN_NAME = 'rule_based_default'
+    
+    def __init__(self, intersection_id: str, plan_engine: TimingPlanEngine = None):
         self.intersection_id = intersection_id
         
-        # 固定配时方案
+        # 固定配时方案（各相位时长，含黄灯和全红），路口没有时段表时使用
         self.phase_timings = {
             0: 30,  # North-South
             1: 25,  # East-West
@@ -404,41 +578,79 @@ class RuleBasedTrafficController:
         self.phase_start_time = time.time()
         self.yellow_time = 3
         self.all_red_time = 2
+        
+        # 分时段配时方案引擎：已设置时段表的路口按时段表运行，否则使用所有路口
+        # 共享的默认方案（单个路口的调整通过专用方案覆盖）
+        self.plan_engine = plan_engine or get_timing_plan_engine()
+        if not self.plan_engine.has_schedule(intersection_id):
+            if not self.plan_engine.has_plan(self.DEFAULT_PLAN_NAME):
+                self.plan_engine.add_plan(TimingPlan(
+                    self.DEFAULT_PLAN_NAME,
+                    [self.phase_timings[p] for p in sorted(self.phase_timings)],
+                    yellow=self.yellow_time, all_red=self.all_red_time
+                ))
+            self.plan_engine.set_plan(intersection_id, self.DEFAULT_PLAN_NAME)
+    
+    def optimize_timings(self, phase_flows: Dict[int, float]) -> TimingPlan:
+        """
+        按各相位关键车道流量用 Webster 方法重新计算本路口的配时
+        
+        Args:
+            phase_flows: {相位: 关键车道流量（辆/小时）}，缺少的相位按0处理
+            
+        Returns:
+            TimingPlan: 替换当前生效方案的本路口专用方案
+        """
+        optimizer = get_webster_optimizer()
+        optimizer_flows = [phase_flows.get(p, 0.0) for p in sorted(self.phase_timings)]
+        result = optimizer.optimize(optimizer_flows)
+        
+        current = self.plan_engine.status(self.intersection_id)['plan_key']
+        plan = TimingPlan(
+            f'{current}@{self.intersection_id}', result['splits'],
+            yellow=optimizer.yellow, all_red=optimizer.all_red,
+            offset=self.plan_engine.get_plan(current, self.intersection_id).offset
+        )
+        self.plan_engine.override_plan(self.intersection_id, current, plan)
+        self.phase_timings = {p: int(split) for p, split in enumerate(result['splits'])}
+        logger.info(f"路口 {self.intersection_id} 配时已更新: 周期 {plan.cycle_length} 秒")
+        return plan
     
     def control_step(self, traffic_data: Dict) -> Dict:
         """基于规则的控制步骤"""
         current_time = time.time()
-        elapsed = current_time - self.phase_start_time
-        
-        # 检查是否需要切换相位
-        current_timing = self.phase_timings[self.current_phase]
+        status = self.plan_engine.status(self.intersection_id, current_time)
         
-        if elapsed >= current_timing:
-            # 切换到下一个相位
+        # 检查当前生效方案的相位是否已切换
+        if status['phase'] != self.current_phase:
             old_phase = self.current_phase
-            self.current_phase = (self.current_phase + 1) % len(self.phase_timings)
+            self.current_phase = status['phase']
             self.phase_start_time = current_time
             
             return {
                 'action': f'switch_to_{self.current_phase}',
                 'old_phase': old_phase,
                 'new_phase': self.current_phase,
+                'plan': status['plan'],
                 'reason': 'timing_cycle'
             }
         
         return {
             'action': 'maintain_current',
             'current_phase': self.current_phase,
-            'remaining_time': current_timing - elapsed
+            'plan': status['plan'],
+            'signal_state': status['state'],
+            'remaining_time': status['remaining_time']
         }
     
     def get_control_status(self) -> Dict:
         """获取控制状态"""
-        elapsed = time.time() - self.phase_start_time
-        remaining = max(0, self.phase_timings[self.current_phase] - elapsed)
+        status = self.plan_engine.status(self.intersection_id)
         
         return {
-            'current_phase': self.current_phase,
-            'remaining_time': remaining,
+            'current_phase': status['phase'],
+            'remaining_time': status['remaining_time'],
+            'plan': status['plan'],
+            'signal_state': status['state'],
             'control_type': 'rule_based'
         }
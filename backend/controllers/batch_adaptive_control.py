@@ -0,0 +1,302 @@
+import os
+import logging
+import tempfile
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .adaptive_control import AdaptiveTrafficController
+
+logger = logging.getLogger(__name__)
+
+# 方向顺序与 AdaptiveTrafficController 的状态编码一致
+DIRECTIONS = ('north', 'south', 'east', 'west')
+
+
+def congestion_from_fused(observations: Sequence[Dict],
+                          lane_ids: Optional[List[str]] = None) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """
+    将多个路口的传感器融合数据转换为批量控制器的输入数组
+
+    Args:
+        observations: 各路口的融合数据（含 'lanes'）
+        lane_ids: 车道顺序，默认取第一个路口的车道
+
+    Returns:
+        tuple: (congestion (N, L)，缺失车道为NaN; lane_directions (L,)，方向下标，
+            不属于四个方向的车道为 -1; lane_ids)
+    """
+    if lane_ids is None:
+        lane_ids = list(observations[0].get('lanes', {}).keys()) if observations else []
+    congestion = np.full((len(observations), len(lane_ids)), np.nan, dtype=np.float64)
+    lane_directions = np.full(len(lane_ids), -1, dtype=np.int64)
+    for i, observation in enumerate(observations):
+        lanes = observation.get('lanes', {})
+        for j, lane_id in enumerate(lane_ids):
+            lane = lanes.get(lane_id)
+            if lane is None:
+                continue
+            congestion[i, j] = lane.get('congestion_level', 0.5)
+            if lane_directions[j] < 0 and lane.get('direction') in DIRECTIONS:
+                lane_directions[j] = DIRECTIONS.index(lane['direction'])
+    return congestion, lane_directions, lane_ids
+
+
+class BatchAdaptiveTrafficController:
+    """
+    批量Q-Learning交通控制器
+
+    与 AdaptiveTrafficController 使用相同的状态编码（4个方向的拥堵等级 × 当前相位）、
+    动作空间和奖励函数，但所有路口的状态离散化、ε-贪婪选择和Q更新都以
+    NumPy数组整体计算，一个进程即可驱动整个片区的路口。
+
+    输入是 (路口数, 车道数) 的拥堵程度数组和每条车道所属方向，不再逐个路口
+    遍历车道字典。Q表可以每个路口一张（默认），也可以所有路口共享一张。
+    """
+
+    def __init__(self, intersection_ids: List[str], lane_directions: Sequence[int],
+                 shared_q_table: bool = False, seed: Optional[int] = None):
+        """
+        Args:
+            intersection_ids: 路口ID列表，顺序即输入数组的行顺序
+            lane_directions: 每条车道所属方向下标（0北 1南 2东 3西，-1表示不参与统计）
+            shared_q_table: 所有路口共享一张Q表
+            seed: 随机种子
+        """
+        self.intersection_ids = list(intersection_ids)
+        self.num_intersections = len(self.intersection_ids)
+        self.rng = np.random.default_rng(seed)
+
+        # 与单路口控制器相同的相位、状态和动作空间
+        self.phases = dict(AdaptiveTrafficController.PHASES)
+        self.congestion_levels = ['low', 'medium', 'high']
+        self.state_space = AdaptiveTrafficController._define_state_space(self)
+        self.action_space = AdaptiveTrafficController._define_action_space(self)
+        self.num_phases = len(self.phases)
+        self.num_states = len(self.state_space)
+        self.num_actions = len(self.action_space)
+
+        self.alpha = 0.1
+        self.gamma = 0.9
+        self.epsilon_min = 0.01
+        self.epsilon_decay = 0.995
+        self.min_green_time = 10
+        self.max_green_time = 120
+        self.epsilon = np.full(self.num_intersections, 0.1)
+
+        # 车道 -> 方向的 one-hot 矩阵 (L, 4)，按方向求均值只需一次矩阵乘法
+        lane_directions = np.asarray(lane_directions, dtype=np.int64)
+        self.lane_direction_matrix = np.zeros((len(lane_directions), len(DIRECTIONS)))
+        valid = lane_directions >= 0
+        self.lane_direction_matrix[np.flatnonzero(valid), lane_directions[valid]] = 1.0
+
+        # 动作编码：extend_* 为 0..4，switch_to_p 为 5+p，之后是 emergency_stop / night_mode
+        self.extend_changes = np.array([-10, -5, 0, 5, 10])
+        self.switch_offset = len(self.extend_changes)
+        self.emergency_action = self.action_space.index('emergency_stop')
+
+        # 每个状态四个方向的平均拥堵程度
+        congestion_map = np.array([0.2, 0.5, 0.8])
+        levels = np.indices((3, 3, 3, 3, self.num_phases))[:4].reshape(4, -1)
+        self.state_congestion = congestion_map[levels].mean(axis=0)
+
+        # Q表 (表数, 状态数, 动作数)，-inf 表示未访问（与 DenseQTable 一致）
+        num_tables = 1 if shared_q_table else self.num_intersections
+        self.q_values = np.full((num_tables, self.num_states, self.num_actions), -np.inf)
+        self.table_index = (np.zeros(self.num_intersections, dtype=np.int64) if shared_q_table
+                            else np.arange(self.num_intersections))
+
+        # 路口状态
+        self.current_phase = np.zeros(self.num_intersections, dtype=np.int64)
+        self.green_time = np.full(self.num_intersections, self.min_green_time, dtype=np.int64)
+
+        # 待 observe 的转移
+        self._pending_states: Optional[np.ndarray] = None
+        self._pending_actions: Optional[np.ndarray] = None
+        self.total_steps = 0
+
+    def get_states(self, congestion: np.ndarray) -> np.ndarray:
+        """
+        批量离散化状态
+
+        Args:
+            congestion: (N, L) 各车道拥堵程度，NaN表示该路口没有这条车道
+
+        Returns:
+            np.ndarray: (N,) 状态下标
+        """
+        congestion = np.asarray(congestion, dtype=np.float64)
+        present = ~np.isnan(congestion)
+        sums = np.where(present, congestion, 0.0) @ self.lane_direction_matrix
+        counts = present.astype(np.float64) @ self.lane_direction_matrix
+        averages = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+
+        # <0.3 low, <0.7 medium, 其余 high；没有车道的方向平均为0，即 low
+        levels = np.digitize(averages, (0.3, 0.7))
+        codes = ((levels[:, 0] * 3 + levels[:, 1]) * 3 + levels[:, 2]) * 3 + levels[:, 3]
+        return codes * self.num_phases + self.current_phase
+
+    def _q_rows(self, states: np.ndarray) -> np.ndarray:
+        """各路口当前状态对应的Q值行 (N, 动作数)"""
+        return self.q_values[self.table_index, states]
+
+    def choose_actions(self, states: np.ndarray) -> np.ndarray:
+        """批量ε-贪婪选择动作，未访问过的状态随机选择"""
+        rows = self._q_rows(states)
+        greedy = rows.argmax(axis=1)
+        visited = np.isfinite(rows[np.arange(len(states)), greedy])
+        explore = (self.rng.random(len(states)) < self.epsilon) | ~visited
+        random_actions = self.rng.integers(0, self.num_actions, size=len(states))
+        return np.where(explore, random_actions, greedy)
+
+    def execute_actions(self, actions: np.ndarray) -> Dict[str, np.ndarray]:
+        """批量执行动作：调整绿灯时间或切换相位"""
+        is_extend = actions < self.switch_offset
+        changes = self.extend_changes[np.minimum(actions, self.switch_offset - 1)]
+        self.green_time = np.where(
+            is_extend, np.clip(self.green_time + changes, self.min_green_time, self.max_green_time),
+            self.green_time
+        )
+
+        is_switch = (actions >= self.switch_offset) & (actions < self.switch_offset + self.num_phases)
+        new_phase = actions - self.switch_offset
+        switched = is_switch & (new_phase != self.current_phase)
+        self.current_phase = np.where(switched, new_phase, self.current_phase)
+        self.green_time = np.where(switched, self.min_green_time, self.green_time)
+
+        return {
+            'actions': actions,
+            'phases': self.current_phase.copy(),
+            'green_time': self.green_time.copy(),
+            'switched': switched
+        }
+
+    def calculate_rewards(self, old_states: np.ndarray, actions: np.ndarray, new_states: np.ndarray,
+                          average_speed: Optional[np.ndarray] = None,
+                          total_vehicles: Optional[np.ndarray] = None) -> np.ndarray:
+        """与 AdaptiveTrafficController.calculate_reward 相同的批量奖励"""
+        n = len(actions)
+        speed = np.full(n, 30.0) if average_speed is None else np.asarray(average_speed, dtype=np.float64)
+        vehicles = np.zeros(n) if total_vehicles is None else np.asarray(total_vehicles, dtype=np.float64)
+
+        # 拥堵改善奖励
+        rewards = (self.state_congestion[old_states] - self.state_congestion[new_states]) * 10
+        # 速度奖励
+        rewards += np.where(speed > 40, 5.0, np.where(speed < 20, -5.0, 0.0))
+        # 车辆通行奖励
+        rewards += np.where(vehicles < 10, 2.0, np.where(vehicles > 30, -10.0, 0.0))
+        # 切换相位与紧急动作惩罚
+        is_switch = (actions >= self.switch_offset) & (actions < self.switch_offset + self.num_phases)
+        rewards -= np.where(is_switch, 2.0, 0.0)
+        rewards -= np.where(actions == self.emergency_action, 20.0, 0.0)
+        return rewards
+
+    def update_q_tables(self, old_states: np.ndarray, actions: np.ndarray,
+                        rewards: np.ndarray, new_states: np.ndarray):
+        """批量Q-Learning更新"""
+        tables = self.table_index
+        old_q = self.q_values[tables, old_states, actions]
+        old_q = np.where(np.isfinite(old_q), old_q, 0.0)
+
+        max_new_q = self._q_rows(new_states).max(axis=1)
+        max_new_q = np.where(np.isfinite(max_new_q), max_new_q, 0.0)
+
+        delta = self.alpha * (rewards + self.gamma * max_new_q - old_q)
+        # 共享Q表时多个路口可能在同一步更新同一 (状态, 动作)，取这些更新的平均值，
+        # 否则等效学习率会变成 路口数 × alpha
+        keys = (tables * self.num_states + old_states) * self.num_actions + actions
+        unique_keys, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        mean_delta = np.bincount(inverse, weights=delta, minlength=len(unique_keys)) / counts
+
+        # 未访问的位置从0开始
+        flat_q = self.q_values.reshape(-1)
+        current = flat_q[unique_keys]
+        flat_q[unique_keys] = np.where(np.isfinite(current), current, 0.0) + mean_delta
+
+        self.epsilon = np.maximum(self.epsilon_min, self.epsilon * self.epsilon_decay)
+
+    def act(self, congestion: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        所有路口选择并执行动作，Q更新推迟到 observe
+
+        Args:
+            congestion: (N, L) 各车道拥堵程度
+        """
+        states = self.get_states(congestion)
+        actions = self.choose_actions(states)
+        result = self.execute_actions(actions)
+        self._pending_states = states
+        self._pending_actions = actions
+        result['states'] = states
+        return result
+
+    def observe(self, next_congestion: np.ndarray, average_speed: Optional[np.ndarray] = None,
+                total_vehicles: Optional[np.ndarray] = None) -> Optional[Dict[str, np.ndarray]]:
+        """
+        用动作之后的下一次观测完成所有路口的Q更新
+
+        Args:
+            next_congestion: (N, L) 各车道拥堵程度
+            average_speed: (N,) 平均车速
+            total_vehicles: (N,) 车辆总数
+        """
+        if self._pending_states is None:
+            return None
+        old_states, actions = self._pending_states, self._pending_actions
+        self._pending_states = self._pending_actions = None
+
+        new_states = self.get_states(next_congestion)
+        rewards = self.calculate_rewards(old_states, actions, new_states, average_speed, total_vehicles)
+        self.update_q_tables(old_states, actions, rewards, new_states)
+        self.total_steps += 1
+        return {'states': old_states, 'actions': actions, 'rewards': rewards, 'new_states': new_states}
+
+    def control_step(self, congestion: np.ndarray, average_speed: Optional[np.ndarray] = None,
+                     total_vehicles: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """完成上一步的Q更新并为所有路口选择新动作"""
+        feedback = self.observe(congestion, average_speed, total_vehicles)
+        result = self.act(congestion)
+        result['feedback'] = feedback
+        return result
+
+    def action_names(self, actions: np.ndarray) -> List[str]:
+        """动作下标转换为动作名称"""
+        return [self.action_space[a] for a in actions]
+
+    def get_control_status(self) -> Dict:
+        """批量控制器状态"""
+        visited = np.isfinite(self.q_values).any(axis=2).sum(axis=1)
+        return {
+            'intersections': self.num_intersections,
+            'q_tables': len(self.q_values),
+            'total_steps': self.total_steps,
+            'mean_epsilon': float(self.epsilon.mean()),
+            'mean_q_table_size': float(visited.mean()),
+            'phase_counts': np.bincount(self.current_phase, minlength=self.num_phases).tolist()
+        }
+
+    def save(self, filepath: str) -> str:
+        """原子地保存全部Q表（临时文件 + rename）"""
+        directory = os.path.dirname(os.path.abspath(filepath))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.npy.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, self.q_values)
+            os.replace(tmp_path, filepath)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return filepath
+
+    def load(self, filepath: str):
+        """
+        将Q表完整读入内存
+
+        不使用内存映射：映射会一直占用文件，之后 save 用 os.replace 覆盖
+        同一路径在 Windows 上会失败。
+        """
+        values = np.load(filepath, allow_pickle=False)
+        if values.shape != self.q_values.shape:
+            raise ValueError(f"Q-table shape {values.shape} does not match {self.q_values.shape}")
+        self.q_values = values.astype(self.q_values.dtype, copy=False)
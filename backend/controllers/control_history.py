@@ -0,0 +1,198 @@
+import os
+import json
+import threading
+import logging
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 索引记录: 时间戳, 记录在数据文件中的起始偏移
+INDEX_RECORD_DTYPE = np.dtype([('timestamp', '<f8'), ('offset', '<u8')])
+
+
+class ControlHistory:
+    """
+    有界的控制历史
+
+    最近 capacity 条记录保存在内存环形队列中；被挤出的旧记录先进入溢出缓冲，
+    攒够 spill_batch 条后一次性追加到磁盘日志：
+    - <name>.jsonl: 每条记录一行紧凑JSON
+    - <name>.idx: 定长二进制索引（时间戳, 行偏移），按时间范围查询时
+      二分查找索引，只读取命中的那一段数据
+    内存占用与运行时长无关：磁盘写入失败时溢出缓冲保留下来，每再攒
+    spill_batch 条重试一次，连续失败 max_write_failures 次后丢弃缓冲中的记录。
+    """
+
+    def __init__(self, directory: str, name: str, capacity: int = 1000, spill_batch: int = 256,
+                 max_write_failures: int = 3):
+        """
+        Args:
+            directory: 日志目录
+            name: 文件名主干
+            capacity: 内存中保留的最近记录数
+            spill_batch: 每次写入磁盘的记录数
+            max_write_failures: 连续写入失败多少次后丢弃溢出缓冲
+        """
+        self.data_path = os.path.join(directory, f'{name}.jsonl')
+        self.index_path = os.path.join(directory, f'{name}.idx')
+        self.capacity = capacity
+        self.spill_batch = spill_batch
+        self.max_write_failures = max_write_failures
+
+        self._recent: deque = deque()
+        self._spill: List[Dict] = []
+        self._write_failures = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._disk_count = self._load_disk_count()
+
+    def _load_disk_count(self) -> int:
+        """已落盘的记录数（丢弃写入中断留下的不完整索引记录）"""
+        if not os.path.exists(self.index_path):
+            return 0
+        size = os.path.getsize(self.index_path)
+        count = size // INDEX_RECORD_DTYPE.itemsize
+        if size % INDEX_RECORD_DTYPE.itemsize:
+            with open(self.index_path, 'r+b') as f:
+                f.truncate(count * INDEX_RECORD_DTYPE.itemsize)
+        return count
+
+    def __len__(self) -> int:
+        """全部记录数（磁盘 + 内存）"""
+        return self._disk_count + len(self._spill) + len(self._recent)
+
+    def append(self, entry: Dict):
+        """追加一条记录（需含 'timestamp'）"""
+        with self._lock:
+            self._recent.append(entry)
+            if len(self._recent) > self.capacity:
+                self._spill.append(self._recent.popleft())
+                # 写入失败后不在每次追加时重试，而是再攒够一批
+                if len(self._spill) >= self.spill_batch * (self._write_failures + 1):
+                    self._spill_to_disk()
+
+    def _spill_to_disk(self):
+        """写入溢出缓冲；连续失败达到上限时丢弃缓冲，保证内存有界（调用方持有锁）"""
+        if self._write_spill():
+            self._write_failures = 0
+            return
+        self._write_failures += 1
+        if self._write_failures >= self.max_write_failures:
+            self.dropped += len(self._spill)
+            logger.error(f"控制历史连续 {self._write_failures} 次写入失败，丢弃 {len(self._spill)} 条记录")
+            self._spill = []
+            self._write_failures = 0
+
+    def _write_spill(self, entries: Optional[List[Dict]] = None) -> bool:
+        """
+        把一批记录追加到磁盘日志（调用方持有锁）
+
+        Returns:
+            bool: 是否写入成功（没有记录时也返回 True）
+        """
+        entries = self._spill if entries is None else entries
+        if not entries:
+            return True
+        try:
+            lines = [json.dumps(entry, separators=(',', ':'), default=str).encode('utf-8') + b'\n'
+                     for entry in entries]
+            index = np.empty(len(lines), dtype=INDEX_RECORD_DTYPE)
+            with open(self.data_path, 'ab') as f:
+                offset = f.tell()
+                for i, line in enumerate(lines):
+                    index[i] = (entries[i].get('timestamp', 0.0), offset)
+                    offset += len(line)
+                f.write(b''.join(lines))
+            # 先写数据再写索引，索引中的记录总是指向完整的行
+            with open(self.index_path, 'ab') as f:
+                f.write(index.tobytes())
+            self._disk_count += len(lines)
+            if entries is self._spill:
+                self._spill = []
+            return True
+        except Exception as e:
+            logger.error(f"控制历史写入磁盘失败: {e}")
+            return False
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict]:
+        """内存中最近的记录（按时间顺序）"""
+        with self._lock:
+            entries = list(self._recent)
+        return entries if limit is None else entries[-limit:]
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None,
+              limit: Optional[int] = None) -> List[Dict]:
+        """
+        按时间范围查询记录（start <= timestamp < end），同时覆盖磁盘和内存
+
+        Args:
+            start: 起始时间戳，None表示不限
+            end: 结束时间戳，None表示不限
+            limit: 最多返回的条数（取时间上最新的 limit 条）
+
+        Returns:
+            list: 按时间顺序排列的记录
+        """
+        lo = -np.inf if start is None else start
+        hi = np.inf if end is None else end
+
+        with self._lock:
+            memory_entries = [e for e in list(self._spill) + list(self._recent)
+                              if lo <= e.get('timestamp', 0.0) < hi]
+            disk_count = self._disk_count
+
+        if limit is not None and len(memory_entries) >= limit:
+            return memory_entries[-limit:]
+
+        disk_entries = []
+        if disk_count:
+            index = np.memmap(self.index_path, dtype=INDEX_RECORD_DTYPE, mode='r', shape=(disk_count,))
+            first = int(np.searchsorted(index['timestamp'], lo, side='left'))
+            last = int(np.searchsorted(index['timestamp'], hi, side='left'))
+            if limit is not None:
+                first = max(first, last - (limit - len(memory_entries)))
+            if first < last:
+                offsets = index['offset'][first:last].astype(np.int64)
+                begin = int(offsets[0])
+                stop = int(index['offset'][last]) if last < disk_count else None
+                with open(self.data_path, 'rb') as f:
+                    f.seek(begin)
+                    data = f.read() if stop is None else f.read(stop - begin)
+                # 每条记录从索引中的偏移读到换行为止：写入失败留下的残缺行不在索引中，不影响相邻记录
+                disk_entries = [json.loads(data[offset:data.index(b'\n', offset)])
+                                for offset in offsets - begin]
+            del index
+
+        return disk_entries + memory_entries
+
+    def flush(self) -> bool:
+        """
+        把溢出缓冲和内存中的记录全部写入磁盘（例如关闭时）
+
+        只有写入成功的记录才从内存中移除，失败时仍可查询并在下次 flush 时重试。
+
+        Returns:
+            bool: 是否全部写入成功
+        """
+        with self._lock:
+            if not self._write_spill():
+                return False
+            self._write_failures = 0
+            if not self._write_spill(list(self._recent)):
+                return False
+            self._recent.clear()
+            return True
+
+    def clear(self):
+        """清空内存和磁盘中的全部记录"""
+        with self._lock:
+            self._recent.clear()
+            self._spill = []
+            self._write_failures = 0
+            for path in (self.data_path, self.index_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._disk_count = 0
@@ -0,0 +1,111 @@
+import threading
+import time
+import logging
+from typing import Dict, Any, Optional
+
+from .numpy_policy import NumpyPolicy
+from .quantized_policy import QuantizedPolicy
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundLearner:
+    """
+    DRL控制器的后台学习线程
+
+    决策路径只读取控制器上发布的只读权重快照（NumpyPolicy），学习线程
+    持续从经验回放中训练Q网络，并按设定的节奏生成新的权重快照，通过一次
+    引用赋值原子地替换控制器上的快照。控制器已切换到int8量化策略时，
+    每次发布都用最新的经验重新校准并量化，决策引擎的类型保持不变。
+    """
+
+    def __init__(self, controller: Any, publish_interval: float = 5.0,
+                 idle_sleep: float = 0.05, max_steps_per_second: float = 0.0,
+                 quantize: Optional[bool] = None):
+        """
+        Args:
+            controller: DRLTrafficController 实例
+            publish_interval: 发布新权重快照的间隔（秒）
+            idle_sleep: 经验不足一个批次时的等待时间（秒）
+            max_steps_per_second: 学习步频上限，0表示不限制
+            quantize: 是否发布int8量化快照，默认沿用控制器当前策略的类型
+        """
+        self.controller = controller
+        self.publish_interval = publish_interval
+        self.idle_sleep = idle_sleep
+        self.max_steps_per_second = max_steps_per_second
+        self.quantize = isinstance(controller.numpy_policy, QuantizedPolicy) if quantize is None else quantize
+
+        self.is_running = False
+        self.thread = None
+        self.policy_version = 0
+        self.last_publish_time = 0.0
+        self.publish_time_total = 0.0
+
+    def start(self):
+        """启动学习线程（启动前先发布一次初始快照）"""
+        if self.is_running:
+            return
+        self.publish()
+        self.is_running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        logger.info(f"Background learner started for intersection {self.controller.intersection_id}")
+
+    def stop(self, timeout: float = 5.0):
+        """停止学习线程"""
+        self.is_running = False
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+        logger.info(f"Background learner stopped for intersection {self.controller.intersection_id}")
+
+    def publish(self):
+        """从当前Q网络生成权重快照并原子地发布给决策路径"""
+        if self.quantize and len(self.controller.memory) == 0:
+            # 还没有校准用的经验，保留控制器当前的量化策略
+            return
+        start = time.perf_counter()
+        with self.controller.train_lock:
+            snapshot = NumpyPolicy.from_keras(self.controller.q_network, version=self.policy_version + 1)
+        if self.quantize:
+            # 量化转换在锁外进行，不阻塞学习步
+            snapshot = QuantizedPolicy.quantize(snapshot, self.controller._default_calibration_states())
+        self.policy_version = snapshot.version
+        # 引用赋值是原子的，决策线程要么看到旧快照，要么看到完整的新快照
+        self.controller.numpy_policy = snapshot
+        self.last_publish_time = time.time()
+        self.publish_time_total += time.perf_counter() - start
+
+    def _run(self):
+        """学习循环"""
+        min_step_time = 1.0 / self.max_steps_per_second if self.max_steps_per_second > 0 else 0.0
+
+        while self.is_running:
+            try:
+                step_start = time.perf_counter()
+                if not self.controller._replay():
+                    time.sleep(self.idle_sleep)
+                    continue
+
+                if time.time() - self.last_publish_time >= self.publish_interval:
+                    self.publish()
+
+                remaining = min_step_time - (time.perf_counter() - step_start)
+                if remaining > 0:
+                    time.sleep(remaining)
+
+            except Exception as e:
+                logger.error(f"Background learner error: {e}")
+                time.sleep(1)
+
+    def get_status(self) -> Dict:
+        """学习线程状态"""
+        return {
+            'running': self.is_running,
+            'quantized': self.quantize,
+            'policy_version': self.policy_version,
+            'last_publish_time': self.last_publish_time,
+            'publish_interval': self.publish_interval,
+            'publish_time_total': self.publish_time_total
+        }
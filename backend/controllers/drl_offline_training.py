@@ -0,0 +1,489 @@
+import csv
+import json
+import os
+import tempfile
+import time
+import logging
+import multiprocessing
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .drl_traffic_controller import DRLTrafficController
+from .replay_buffer import ReplayBuffer, PrioritizedReplayBuffer
+
+logger = logging.getLogger(__name__)
+
+# 饱和车头时距（秒/辆），用排队长度估算等待时间
+SATURATION_HEADWAY = 2.0
+# 相邻快照的最大时间间隔（秒），超过时视为新的轨迹
+MAX_SNAPSHOT_GAP = 600.0
+# 同一快照内各车道记录的最大时间差（秒），各车道的写入时间不完全相同
+SNAPSHOT_TOLERANCE = 5.0
+
+
+def _parse_timestamp(value) -> float:
+    """将数据库/文件中的时间戳统一转换为Unix时间"""
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(str(value)).timestamp()
+
+
+def _lane_key(lane_id: str) -> Optional[str]:
+    """
+    将车道ID映射为控制器状态中的车道键
+
+    例如 'lane_north_1' -> 'north_straight'，'lane_east_left_1' -> 'east_left'
+    """
+    parts = lane_id.lower().split('_')
+    direction = next((p for p in parts if p in ('north', 'south', 'east', 'west')), None)
+    if direction is None:
+        return None
+    lane_type = 'left' if 'left' in parts else 'straight'
+    return f'{direction}_{lane_type}'
+
+
+def rows_to_snapshot(rows: Iterable[Dict]) -> Dict:
+    """
+    将同一时刻的 TrafficData 车道记录合并为控制器使用的交通数据字典
+
+    车流量取 vehicle_count，等待时间按 queue_length × 饱和车头时距估算，
+    快照时间取各车道记录中最早的时间戳。导出文件带 current_phase 列时一并保留。
+    """
+    snapshot: Dict = {}
+    for row in rows:
+        timestamp = _parse_timestamp(row['timestamp'])
+        snapshot['timestamp'] = min(snapshot.get('timestamp', timestamp), timestamp)
+        if row.get('current_phase') not in (None, ''):
+            snapshot['current_phase'] = int(row['current_phase'])
+        key = _lane_key(str(row['lane_id']))
+        if key is None:
+            continue
+        snapshot[key] = snapshot.get(key, 0) + float(row.get('vehicle_count') or 0)
+        wait = float(row.get('queue_length') or 0) * SATURATION_HEADWAY
+        snapshot[f'{key}_wait'] = snapshot.get(f'{key}_wait', 0) + wait
+    return snapshot
+
+
+def _group_rows(rows: Iterable[Dict], tolerance: float = SNAPSHOT_TOLERANCE) -> Iterator[Dict]:
+    """
+    将按时间排序的车道记录分组为快照
+
+    各车道记录的写入时间相差几毫秒到几秒，不能按时间戳严格相等分组：与本组
+    第一条记录的时间差不超过 tolerance 的记录归入同一快照；同一车道再次出现
+    说明已经是下一个采样周期，也开始新的快照。
+    """
+    group: List[Dict] = []
+    group_start = None
+    lanes = set()
+    for row in rows:
+        timestamp = _parse_timestamp(row['timestamp'])
+        if group and (timestamp - group_start > tolerance or row['lane_id'] in lanes):
+            yield rows_to_snapshot(group)
+            group = []
+            lanes.clear()
+        if not group:
+            group_start = timestamp
+        group.append(row)
+        lanes.add(row['lane_id'])
+    if group:
+        yield rows_to_snapshot(group)
+
+
+def _phase_index(phase_id) -> int:
+    """
+    将信号灯记录的相位ID映射为控制器的动作编号
+
+    相位ID为 'phase_1'、'phase_2' … （从1开始，与信号灯状态接口一致），
+    对应 PHASES 中的 0、1 …；纯数字按动作编号处理。
+    """
+    phase_id = str(phase_id).strip()
+    if phase_id.isdigit():
+        return int(phase_id)
+    prefix, _, number = phase_id.rpartition('_')
+    if prefix and number.isdigit() and int(number) >= 1:
+        return int(number) - 1
+    raise ValueError(f"Unrecognized phase id in phase log: {phase_id!r}")
+
+
+def _iter_phase_changes(rows: Iterable[Dict]) -> Iterator[Tuple[float, int]]:
+    """从按时间排序的信号灯记录中提取 (时间, 绿灯相位) 序列"""
+    for row in rows:
+        if str(row.get('state', 'green')).lower() != 'green':
+            continue
+        yield _parse_timestamp(row['timestamp']), _phase_index(row['phase_id'])
+
+
+def join_phase_log(snapshots: Iterable[Dict], phases: Iterable[Tuple[float, int]]) -> Iterator[Dict]:
+    """
+    将快照流与相位日志按时间合并，为每个快照补上当时的绿灯相位（current_phase）
+
+    两个流都须按时间排序；快照取时间不晚于它的最后一条绿灯记录。第一条相位
+    记录之前的快照不知道实际执行的相位，直接丢弃。
+    """
+    phases = iter(phases)
+    current = None
+    pending = next(phases, None)
+    skipped = 0
+    for snapshot in snapshots:
+        while pending is not None and pending[0] <= snapshot['timestamp']:
+            current = pending[1]
+            pending = next(phases, None)
+        if current is None:
+            skipped += 1
+            continue
+        snapshot['current_phase'] = current
+        yield snapshot
+    if skipped:
+        logger.warning(f"Dropped {skipped} snapshots recorded before the first phase log entry")
+
+
+def iter_database_phases(intersection_id: str, chunk_size: int = 5000,
+                         start: Optional[datetime] = None,
+                         end: Optional[datetime] = None) -> Iterator[Tuple[float, int]]:
+    """
+    从 TrafficLight 表流式读取相位日志
+
+    为了知道 start 时刻正在执行的相位，从 start 之前最后一条绿灯记录开始读取。
+    """
+    from database import SessionLocal, TrafficLight
+
+    session = SessionLocal()
+    try:
+        query = session.query(TrafficLight).filter(TrafficLight.intersection_id == intersection_id)
+        if start is not None:
+            previous = (query.filter(TrafficLight.timestamp < start, TrafficLight.state == 'green')
+                        .order_by(TrafficLight.timestamp.desc()).first())
+            if previous is not None:
+                start = previous.timestamp
+            query = query.filter(TrafficLight.timestamp >= start)
+        if end is not None:
+            query = query.filter(TrafficLight.timestamp < end)
+        query = query.order_by(TrafficLight.timestamp).yield_per(chunk_size)
+
+        rows = ({
+            'phase_id': record.phase_id,
+            'state': record.state,
+            'timestamp': record.timestamp
+        } for record in query)
+        yield from _iter_phase_changes(rows)
+    finally:
+        session.close()
+
+
+def iter_file_phases(filepath: str, intersection_id: Optional[str] = None) -> Iterator[Tuple[float, int]]:
+    """从 TrafficLight 表导出的 .csv 文件（intersection_id, phase_id, state, timestamp）读取相位日志"""
+    with open(filepath, 'r', encoding='utf-8', newline='') as f:
+        rows = (row for row in csv.DictReader(f)
+                if not intersection_id or row.get('intersection_id', intersection_id) == intersection_id)
+        yield from _iter_phase_changes(rows)
+
+
+def iter_database_snapshots(intersection_id: str, chunk_size: int = 5000,
+                            start: Optional[datetime] = None,
+                            end: Optional[datetime] = None) -> Iterator[Dict]:
+    """
+    以流式分块方式从 TrafficData 表读取历史快照
+
+    TrafficData 表不记录相位，快照与 TrafficLight 表的相位日志合并后得到
+    实际执行的相位（见 join_phase_log）。
+
+    Args:
+        intersection_id: 路口ID
+        chunk_size: 每次从数据库拉取的行数
+        start: 起始时间（含）
+        end: 结束时间（不含）
+    """
+    from database import SessionLocal, TrafficData
+
+    session = SessionLocal()
+    try:
+        query = session.query(TrafficData).filter(TrafficData.intersection_id == intersection_id)
+        if start is not None:
+            query = query.filter(TrafficData.timestamp >= start)
+        if end is not None:
+            query = query.filter(TrafficData.timestamp < end)
+        query = query.order_by(TrafficData.timestamp).yield_per(chunk_size)
+
+        rows = ({
+            'lane_id': record.lane_id,
+            'vehicle_count': record.vehicle_count,
+            'queue_length': record.queue_length,
+            'timestamp': record.timestamp
+        } for record in query)
+        phases = iter_database_phases(intersection_id, chunk_size, start=start, end=end)
+        yield from join_phase_log(_group_rows(rows), phases)
+    finally:
+        session.close()
+
+
+def iter_file_snapshots(filepath: str, intersection_id: Optional[str] = None,
+                        phase_log: Optional[str] = None) -> Iterator[Dict]:
+    """
+    从导出文件流式读取历史快照
+
+    支持两种格式：
+    - .csv: TrafficData 表导出（intersection_id, lane_id, vehicle_count, queue_length, timestamp），按时间排序，
+      可选 current_phase 列
+    - .jsonl: 每行一个控制器格式的交通数据字典，需包含 timestamp，
+      以及 current_phase / action 字段（记录的实际相位）
+
+    文件中没有相位时，用 phase_log 指定 TrafficLight 表导出的相位日志（见 iter_file_phases）。
+    """
+    if phase_log is not None:
+        snapshots = iter_file_snapshots(filepath, intersection_id)
+        yield from join_phase_log(snapshots, iter_file_phases(phase_log, intersection_id))
+        return
+
+    if filepath.endswith('.jsonl'):
+        with open(filepath, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                snapshot = json.loads(line)
+                if intersection_id and snapshot.get('intersection_id', intersection_id) != intersection_id:
+                    continue
+                snapshot['timestamp'] = _parse_timestamp(snapshot['timestamp'])
+                yield snapshot
+    elif filepath.endswith('.csv'):
+        with open(filepath, 'r', encoding='utf-8', newline='') as f:
+            rows = (row for row in csv.DictReader(f)
+                    if not intersection_id or row.get('intersection_id', intersection_id) == intersection_id)
+            yield from _group_rows(rows)
+    else:
+        raise ValueError(f"Unsupported history file format: {filepath}")
+
+
+def chunk_snapshots(snapshots: Iterable[Dict], chunk_size: int) -> Iterator[List[Dict]]:
+    """将快照流切分为固定大小的块"""
+    chunk: List[Dict] = []
+    for snapshot in snapshots:
+        chunk.append(snapshot)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def chunk_with_lookahead(snapshots: Iterable[Dict], chunk_size: int) -> Iterator[Tuple[List[Dict], Optional[Dict]]]:
+    """
+    将快照流切分为块，并附带下一块的第一个快照
+
+    块内最后一个快照的下一状态来自下一块；整个流的最后一个快照附带 None。
+    """
+    previous: Optional[List[Dict]] = None
+    for chunk in chunk_snapshots(snapshots, chunk_size):
+        if previous is not None:
+            yield previous, chunk[0]
+        previous = chunk
+    if previous is not None:
+        yield previous, None
+
+
+def _same_trajectory(snapshot: Dict, next_snapshot: Optional[Dict], max_gap: float) -> bool:
+    """两个相邻快照是否属于同一条连续轨迹（同一路口且时间间隔不超过 max_gap）"""
+    if next_snapshot is None:
+        return False
+    if snapshot.get('intersection_id') != next_snapshot.get('intersection_id'):
+        return False
+    return 0 < next_snapshot['timestamp'] - snapshot['timestamp'] <= max_gap
+
+
+# 工作进程内的控制器（仅用于状态/奖励计算，不构建神经网络）
+_worker_controller: Optional[DRLTrafficController] = None
+
+
+def _init_worker(intersection_id: str):
+    """进程池初始化：每个工作进程创建一个仅推理模式的控制器"""
+    global _worker_controller
+    # 控制器只在初始化时使用模型目录（不加载策略、不保存），用完即删除
+    with tempfile.TemporaryDirectory(prefix='drl_offline_') as model_path:
+        _worker_controller = DRLTrafficController(intersection_id, model_path=model_path, inference_only=True)
+
+
+def build_transitions(task: Tuple[List[Dict], Optional[Dict], float]) -> Tuple[np.ndarray, ...]:
+    """
+    用与在线控制相同的 _get_state / calculate_reward 逻辑将一块历史快照转换为经验
+
+    下一状态取同一轨迹中记录的下一个快照；轨迹结束（换路口或时间间隔超过
+    max_gap）时 done 为 True。动作只取记录值：优先使用快照的 action 字段，
+    其次是下一个快照记录的 current_phase。轨迹结束处没有 action 字段时不知道
+    实际执行的动作，不生成经验；整个流的最后一个快照也不生成经验。
+
+    Args:
+        task: (snapshots, lookahead, max_gap)，lookahead 为下一块的第一个快照
+
+    Returns:
+        tuple: (states, actions, rewards, next_states, dones)
+
+    Raises:
+        ValueError: 快照既没有 action 也没有 current_phase（需先用 join_phase_log 合并相位日志）
+    """
+    snapshots, lookahead, max_gap = task
+    controller = _worker_controller
+    n = len(snapshots) if lookahead is not None else max(len(snapshots) - 1, 0)
+    state_size = controller._get_state_size()
+
+    states = np.empty((n, state_size), dtype=np.float32)
+    actions = np.empty(n, dtype=np.int64)
+    rewards = np.empty(n, dtype=np.float32)
+    next_states = np.empty((n, state_size), dtype=np.float32)
+    dones = np.zeros(n, dtype=np.bool_)
+
+    count = 0
+    for i in range(n):
+        snapshot = snapshots[i]
+        if 'action' not in snapshot and 'current_phase' not in snapshot:
+            raise ValueError(
+                f"Snapshot at {snapshot['timestamp']} has no recorded action or current_phase; "
+                "join the source with a phase log before offline training"
+            )
+        next_snapshot = snapshots[i + 1] if i + 1 < len(snapshots) else lookahead
+        continues = _same_trajectory(snapshot, next_snapshot, max_gap)
+
+        if 'action' in snapshot:
+            action = int(snapshot['action'])
+        elif continues and 'current_phase' in next_snapshot:
+            action = int(next_snapshot['current_phase'])
+        else:
+            continue
+
+        controller.current_phase = int(snapshot.get('current_phase', action))
+        state = controller._get_state(snapshot, timestamp=snapshot['timestamp'])
+        states[count] = state
+        actions[count] = action
+        rewards[count] = controller.calculate_reward(snapshot)
+        if continues:
+            controller.current_phase = int(next_snapshot.get('current_phase', action))
+            next_states[count] = controller._get_state(next_snapshot, timestamp=next_snapshot['timestamp'])
+        else:
+            # 轨迹结束，下一状态不参与目标值计算
+            next_states[count] = state
+            dones[count] = True
+        count += 1
+
+    return states[:count], actions[:count], rewards[:count], next_states[:count], dones[:count]
+
+
+class OfflineDRLTrainer:
+    """
+    基于历史交通数据的离线DRL训练器
+
+    主进程持有完整的Keras控制器并执行学习步骤，进程池并行地把历史快照块
+    转换为经验。训练结果保存为 drl_model_<intersection_id>.h5，在线控制器
+    的 _load_model 可直接加载；同时导出 NumPy 推理用的策略文件。
+    """
+
+    def __init__(self, intersection_id: str, model_path: Optional[str] = None,
+                 workers: Optional[int] = None, chunk_size: int = 2048,
+                 updates_per_chunk: Optional[int] = None, target_update_interval: Optional[int] = None,
+                 target_update_mode: str = 'hard', target_tau: float = 0.005,
+                 replay_capacity: int = 200000, prioritized_replay: bool = False,
+                 seed: int = 0, max_gap: float = MAX_SNAPSHOT_GAP):
+        """
+        Args:
+            intersection_id: 路口ID（决定输出模型文件名）
+            model_path: 模型目录，默认与在线控制器相同
+            workers: 经验生成进程数，0表示在主进程内生成，默认CPU核数
+            chunk_size: 每个任务包含的快照数
+            updates_per_chunk: 每块经验对应的学习步数，默认 chunk_size / batch_size
+            target_update_interval: 目标网络更新间隔（学习步），默认 hard 为500、soft 为1
+            target_update_mode: 'hard' 完整复制或 'soft' Polyak软更新
+            target_tau: 软更新系数
+            replay_capacity: 离线经验回放容量
+            prioritized_replay: 是否使用优先经验回放
+            seed: 经验回放采样的随机种子
+            max_gap: 相邻快照的最大时间间隔（秒），超过时视为轨迹结束
+        """
+        self.intersection_id = intersection_id
+        self.workers = os.cpu_count() if workers is None else workers
+        self.chunk_size = chunk_size
+        self.seed = seed
+        self.max_gap = max_gap
+
+        self.controller = DRLTrafficController(
+            intersection_id, model_path=model_path, prioritized_replay=prioritized_replay
+        )
+        if target_update_interval is None and target_update_mode == 'hard':
+            target_update_interval = 500
+        self.controller.set_target_update(target_update_mode, target_update_interval, target_tau)
+        buffer_class = PrioritizedReplayBuffer if prioritized_replay else ReplayBuffer
+        self.controller.memory_size = replay_capacity
+        self.controller.memory = buffer_class(replay_capacity, self.controller._get_state_size())
+        self.updates_per_chunk = updates_per_chunk or max(1, chunk_size // self.controller.batch_size)
+
+        self.stats = {
+            'transitions': 0,
+            'learner_steps': 0,
+            'elapsed': 0.0
+        }
+
+    def _iter_experience(self, snapshots: Iterable[Dict]) -> Iterator[Tuple[np.ndarray, ...]]:
+        """并行生成经验，同时在途的任务数有上限以保证内存有界"""
+        tasks = ((chunk, lookahead, self.max_gap)
+                 for chunk, lookahead in chunk_with_lookahead(snapshots, self.chunk_size))
+
+        if self.workers == 0:
+            _init_worker(self.intersection_id)
+            for task in tasks:
+                yield build_transitions(task)
+            return
+
+        # TensorFlow 不支持 fork 后继续使用，工作进程使用 spawn 启动
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(self.workers, initializer=_init_worker, initargs=(self.intersection_id,)) as pool:
+            pending = deque()
+            max_pending = self.workers * 2
+            for task in tasks:
+                pending.append(pool.apply_async(build_transitions, (task,)))
+                if len(pending) >= max_pending:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+
+    def train(self, snapshots: Iterable[Dict], save: bool = True) -> Dict:
+        """
+        在历史快照流上训练
+
+        Args:
+            snapshots: 快照迭代器（见 iter_database_snapshots / iter_file_snapshots）
+            save: 训练结束后是否保存模型
+
+        Returns:
+            dict: 训练统计
+        """
+        controller = self.controller
+        np.random.seed(self.seed)
+        start = time.perf_counter()
+
+        for states, actions, rewards, next_states, dones in self._iter_experience(snapshots):
+            with controller.memory_lock:
+                controller.memory.add_batch(states, actions, rewards, next_states, dones)
+            self.stats['transitions'] += len(actions)
+
+            for _ in range(self.updates_per_chunk):
+                if not controller._replay():
+                    break
+                self.stats['learner_steps'] += 1
+
+            logger.info(
+                f"Offline training: {self.stats['transitions']} transitions, "
+                f"{self.stats['learner_steps']} learner steps, loss={controller.last_loss}"
+            )
+
+        controller._update_target_network()
+        self.stats['elapsed'] = time.perf_counter() - start
+        self.stats['learner_steps_per_sec'] = controller.get_performance_metrics()['learner_steps_per_sec']
+        self.stats['last_loss'] = controller.last_loss
+
+        if save:
+            controller.save_model()
+            controller.export_policy()
+
+        return self.stats
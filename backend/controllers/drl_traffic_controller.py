@@ -1,50 +1,93 @@
 import numpy as np
-try:
-    import tensorflow as tf
-    # 尝试多种方式导入keras
-    try:
-        # TensorFlow 2.x 的推荐导入方式
-        import tensorflow.keras as keras
-    except ImportError:
-        try:
-            # 备用导入方式
-            from tensorflow import keras
-        except ImportError:
-            try:
-                # 独立的 Keras 包
-                import keras
-            except ImportError:
-                raise ImportError("Cannot import Keras. Please install TensorFlow: pip install tensorflow")
-    TENSORFLOW_AVAILABLE = True
-except ImportError as e:
-    print(f"Warning: TensorFlow not available: {e}")
-    print("Please install TensorFlow: pip install tensorflow")
-    TENSORFLOW_AVAILABLE = False
-    # 创建假的模块以避免导入错误
-    class FakeModule:
-        def __getattr__(self, name):
-            raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'. TensorFlow is not installed.")
-    tf = FakeModule()
-    keras = FakeModule()
-
+import importlib.util
 import random
 import time
 import logging
-from collections import deque
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from typing import Dict, List, Tuple, Optional, Union, Any
 import json
 import os
 
+from .numpy_policy import NumpyPolicy, export_policy_weights, load_policy, compare_policies
+from .quantized_policy import QuantizedPolicy
+from .replay_buffer import ReplayBuffer, PrioritizedReplayBuffer
+from .drl_learner import BackgroundLearner
+from .traffic_stats import RollingTrafficStats
+from .target_sync import TargetNetworkSync
+from .policy_registry import SharedPolicy, get_policy_registry
+
 logger = logging.getLogger(__name__)
 
+# TensorFlow/Keras 延迟到真正构建DRL控制器时才导入，导入本模块本身不加载TensorFlow
+tf: Any = None
+keras: Any = None
+# 仅检查是否已安装（不导入）
+TENSORFLOW_AVAILABLE = importlib.util.find_spec('tensorflow') is not None
+# 各阶段导入耗时（秒）
+_import_timings: Dict[str, float] = {}
+
+
+def _import_tensorflow() -> bool:
+    """
+    导入 TensorFlow 和 Keras（只在第一次调用时真正导入）
+    
+    Returns:
+        bool: 导入是否成功
+    """
+    global tf, keras, TENSORFLOW_AVAILABLE
+    if keras is not None:
+        return True
+    if not TENSORFLOW_AVAILABLE:
+        return False
+    
+    try:
+        start = time.perf_counter()
+        import tensorflow as _tf
+        _import_timings['tensorflow'] = time.perf_counter() - start
+        
+        # 尝试多种方式导入keras
+        start = time.perf_counter()
+        try:
+            # TensorFlow 2.x 的推荐导入方式
+            import tensorflow.keras as _keras
+        except ImportError:
+            try:
+                # 备用导入方式
+                from tensorflow import keras as _keras
+            except ImportError:
+                try:
+                    # 独立的 Keras 包
+                    import keras as _keras
+                except ImportError:
+                    raise ImportError("Cannot import Keras. Please install TensorFlow: pip install tensorflow")
+        _import_timings['keras'] = time.perf_counter() - start
+        
+        tf, keras = _tf, _keras
+        logger.info(
+            f"TensorFlow imported in {_import_timings['tensorflow']:.2f}s, "
+            f"Keras in {_import_timings['keras']:.2f}s"
+        )
+        return True
+    except ImportError as e:
+        logger.warning(f"TensorFlow not available: {e}")
+        TENSORFLOW_AVAILABLE = False
+        return False
+
+
+def get_tensorflow_import_timings() -> Dict[str, float]:
+    """返回 TensorFlow/Keras 的导入耗时（秒），尚未导入时为空"""
+    return dict(_import_timings)
+
+
 def check_tensorflow_availability() -> bool:
     """
-    检查 TensorFlow 是否可用
+    检查 TensorFlow 是否可用（会触发 TensorFlow 导入）
     
     Returns:
         bool: TensorFlow 是否可用
     """
-    if TENSORFLOW_AVAILABLE:
+    if _import_tensorflow():
         try:
             # 测试基本功能
             _ = tf.constant([1.0])
@@ -68,14 +111,54 @@ def install_tensorflow_instructions() -> str:
         "3. For GPU support: pip install tensorflow[and-cuda]"
     )
 
+# 决策延迟直方图的桶上界（毫秒）
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
 class DRLTrafficController:
     """
     基于深度强化学习的交通信号控制器
     使用Deep Q-Network (DQN)算法进行交通信号优化控制
     """
     
-    def __init__(self, intersection_id: str, model_path: Optional[str] = None):
-        if not TENSORFLOW_AVAILABLE:
+    # 状态向量中的车道顺序（与 _get_state 一致）
+    LANES = [
+        'north_straight', 'north_left', 'south_straight', 'south_left',
+        'east_straight', 'east_left', 'west_straight', 'west_left'
+    ]
+    
+    # 相位定义
+    PHASES = {
+        0: {'name': 'North-South Straight', 'directions': ['north_straight', 'south_straight']},
+        1: {'name': 'East-West Straight', 'directions': ['east_straight', 'west_straight']},
+        2: {'name': 'North-South Left', 'directions': ['north_left', 'south_left']},
+        3: {'name': 'East-West Left', 'directions': ['east_left', 'west_left']}
+    }
+    
+    def __init__(self, intersection_id: str, model_path: Optional[str] = None,
+                 inference_only: bool = False, replay_path: Optional[str] = None,
+                 prioritized_replay: bool = False, policy_name: Optional[str] = None,
+                 policy_version: Optional[str] = None, memory_size: int = 10000,
+                 quantized: bool = False):
+        """
+        Args:
+            intersection_id: 路口ID
+            model_path: 模型目录
+            inference_only: 仅推理模式。加载 export_policy 导出的
+                drl_policy_<id>.npz，用纯NumPy决策，不需要TensorFlow，也不训练
+            replay_path: 经验回放的内存映射存储目录，为None时仅保存在内存中
+            prioritized_replay: 使用基于求和树的优先经验回放代替均匀采样
+            policy_name: 共享策略名称。设置后Q网络通过策略注册表加载，同名同版本
+                的所有路口共享同一份只读权重（drl_model_<name>[_v<version>].h5），
+                本控制器不再在线训练
+            policy_version: 共享策略版本
+            memory_size: 经验回放容量
+            quantized: 仅推理模式下加载 quantize_policy 保存的int8策略
+                drl_policy_<id>_int8.npz（由LiteRT运行时推理，需要安装 ai-edge-litert）
+        """
+        self.inference_only = inference_only
+        self.quantized = quantized and inference_only
+        if not inference_only and not _import_tensorflow():
             raise RuntimeError(
                 "TensorFlow is required for DRLTrafficController. "
                 "Please install it with: pip install tensorflow\n"
@@ -83,6 +166,9 @@ class DRLTrafficController:
             )
         
         self.intersection_id = intersection_id
+        self.policy_name = policy_name
+        self.policy_version = policy_version
+        self.shared_policy: Optional[SharedPolicy] = None
         self.model_path = model_path or os.path.join(os.path.dirname(__file__), 'models')
         os.makedirs(self.model_path, exist_ok=True)
         
@@ -93,10 +179,7 @@ class DRLTrafficController:
         self.epsilon_min = 0.01
         self.epsilon_decay = 0.995
         self.batch_size = 32
-        self.memory_size = 10000
-        
-        # 经验回放缓冲区
-        self.memory = deque(maxlen=self.memory_size)
+        self.memory_size = memory_size
         
         # 交通控制参数
         self.min_green_time = 15  # 最小绿灯时间（秒）
@@ -105,61 +188,122 @@ class DRLTrafficController:
         self.all_red_time = 2  # 全红时间（秒）
         
         # 相位定义
-        self.phases = {
-            0: {'name': 'North-South Straight', 'directions': ['north_straight', 'south_straight']},
-            1: {'name': 'East-West Straight', 'directions': ['east_straight', 'west_straight']},
-            2: {'name': 'North-South Left', 'directions': ['north_left', 'south_left']},
-            3: {'name': 'East-West Left', 'directions': ['east_left', 'west_left']}
-        }
+        self.phases = dict(self.PHASES)
+        
+        # 经验回放缓冲区（仅推理和共享策略的控制器不在线训练，不分配）
+        self.prioritized_replay = prioritized_replay
+        buffer_class = PrioritizedReplayBuffer if prioritized_replay else ReplayBuffer
+        self.memory: Optional[ReplayBuffer] = None
+        if not inference_only and policy_name is None:
+            self.memory = buffer_class(self.memory_size, self._get_state_size(), filepath=replay_path)
+        # 后台学习时，决策线程写入经验、学习线程采样和训练，需要加锁
+        self.memory_lock = threading.Lock()
+        self.train_lock = threading.Lock()
+        self.learner: Optional[BackgroundLearner] = None
         
         # 当前状态
         self.current_phase = 0
         self.phase_timer = 0
         self.phase_start_time = time.time()
         self.total_wait_time = 0
-        self.vehicle_count_history = []
+        
+        # 交通统计：最近 stats_capacity 条记录的环形缓冲，metrics_window 为指标的滑动窗口
+        self.stats_capacity = 100
+        self.metrics_window = 20
+        self.traffic_stats = RollingTrafficStats(
+            len(self.LANES), capacity=self.stats_capacity, windows=(self.metrics_window,)
+        )
+        self._stats_counts = np.zeros(len(self.LANES), dtype=np.float64)
+        self._stats_waits = np.zeros(len(self.LANES), dtype=np.float64)
+        
+        # 学习器统计
+        self.learner_steps = 0
+        self.learner_time = 0.0
+        self.last_loss: Optional[float] = None
+        
+        # 目标网络更新：'hard' 每 target_update_interval 步完整复制，'soft' 按 τ 做Polyak更新
+        self.target_update_mode = 'hard'
+        self.target_update_interval = 100
+        self.target_tau = 0.005
+        self.target_sync: Optional[TargetNetworkSync] = None
+        self.target_updates = 0
+        
+        # 决策延迟（最近 latency_window 次，环形存储）
+        self.latency_window = 1000
+        self._decision_latencies = np.zeros(self.latency_window, dtype=np.float64)
+        self._latency_count = 0
+        # 决策延迟直方图（累计），桶上界单位为毫秒，最后一个桶为 +Inf
+        self._latency_bucket_edges = np.array(LATENCY_BUCKETS_MS, dtype=np.float64) / 1000.0
+        self._latency_histogram = np.zeros(len(LATENCY_BUCKETS_MS) + 1, dtype=np.int64)
+        
+        # 决策延迟预算（秒），None表示不限制；超时时使用缓存动作或规则方案
+        self.latency_budget: Optional[float] = None
+        self.fallback_mode = 'cached'
+        self._decision_executor: Optional[ThreadPoolExecutor] = None
+        self._pending_decision = None
+        self._cached_action: Optional[int] = None
+        self.deadline_misses = 0
+        self.fallback_counts = {'cached': 0, 'rule': 0}
         
         # 神经网络模型
         self.q_network: Optional[Any] = None
         self.target_network: Optional[Any] = None
-        self._build_model()
+        self.numpy_policy: Optional[Any] = None
         
-        # 加载预训练模型（如果存在）
-        self._load_model()
+        if inference_only:
+            # 仅推理：不探索
+            self.epsilon = 0.0
+        elif policy_name is not None:
+            # 共享策略不在线训练，探索率不会再衰减，直接使用最低探索率
+            self.epsilon = self.epsilon_min
+        
+        if policy_name is not None:
+            self._acquire_shared_policy()
+        elif inference_only:
+            # 仅推理：加载导出的NumPy策略
+            self._load_numpy_policy()
+        else:
+            self._build_model()
+            
+            # 加载预训练模型（如果存在）
+            self._load_model()
         
         logger.info(f"DRLTrafficController initialized for intersection {intersection_id}")
     
+    def _create_network(self):
+        """创建一个未编译的深度Q网络"""
+        # 输入层：状态特征 [车流量, 等待时间, 当前相位, 时间信息]
+        input_layer = keras.layers.Input(shape=(self._get_state_size(),))
+        
+        # 隐藏层
+        x = keras.layers.Dense(128, activation='relu')(input_layer)  # type: ignore
+        x = keras.layers.BatchNormalization()(x)  # type: ignore
+        x = keras.layers.Dropout(0.2)(x)  # type: ignore
+        
+        x = keras.layers.Dense(64, activation='relu')(x)  # type: ignore
+        x = keras.layers.BatchNormalization()(x)  # type: ignore
+        x = keras.layers.Dropout(0.2)(x)  # type: ignore
+        
+        x = keras.layers.Dense(32, activation='relu')(x)  # type: ignore
+        
+        # 输出层：每个动作的Q值
+        output_layer = keras.layers.Dense(len(self.phases), activation='linear')(x)  # type: ignore
+        
+        return keras.Model(inputs=input_layer, outputs=output_layer)
+    
     def _build_model(self):
-        """构建深度Q网络"""
+        """构建深度Q网络和独立的目标网络"""
         try:
-            # 输入层：状态特征 [车流量, 等待时间, 当前相位, 时间信息]
-            input_layer = keras.layers.Input(shape=(self._get_state_size(),))
-            
-            # 隐藏层
-            x = keras.layers.Dense(128, activation='relu')(input_layer)  # type: ignore
-            x = keras.layers.BatchNormalization()(x)  # type: ignore
-            x = keras.layers.Dropout(0.2)(x)  # type: ignore
-            
-            x = keras.layers.Dense(64, activation='relu')(x)  # type: ignore
-            x = keras.layers.BatchNormalization()(x)  # type: ignore
-            x = keras.layers.Dropout(0.2)(x)  # type: ignore
-            
-            x = keras.layers.Dense(32, activation='relu')(x)  # type: ignore
-            
-            # 输出层：每个动作的Q值
-            output_layer = keras.layers.Dense(len(self.phases), activation='linear')(x)  # type: ignore
-            
-            self.q_network = keras.Model(inputs=input_layer, outputs=output_layer)
-            self.target_network = keras.Model(inputs=input_layer, outputs=output_layer)
+            self.q_network = self._create_network()
+            # 目标网络使用独立的层和变量，只通过 _update_target_network 同步
+            self.target_network = self._create_network()
             
             # 编译模型
-            if self.q_network is not None:
-                optimizer = keras.optimizers.Adam(learning_rate=self.learning_rate)
-                self.q_network.compile(optimizer=optimizer, loss='mse')
+            optimizer = keras.optimizers.Adam(learning_rate=self.learning_rate)
+            self.q_network.compile(optimizer=optimizer, loss='mse')
             
             # 同步目标网络
-            if self.q_network is not None and self.target_network is not None:
-                self.target_network.set_weights(self.q_network.get_weights())
+            self._init_target_sync()
             
             logger.info("DQN model built successfully")
             
@@ -167,13 +311,100 @@ class DRLTrafficController:
             logger.error(f"Failed to build DQN model: {e}")
             raise
     
+    def _init_target_sync(self):
+        """配对Q网络与目标网络的变量并做一次硬同步"""
+        self.target_sync = TargetNetworkSync(self.q_network, self.target_network)
+        self.target_sync.hard_update()
+        self.target_updates = 0
+    
+    def _acquire_shared_policy(self):
+        """从策略注册表获取共享策略（同名同版本只加载一次）"""
+        def loader():
+            if self.inference_only:
+                self._load_numpy_policy()
+                return None, None, self.numpy_policy
+            self._build_model()
+            self._load_model()
+            return self.q_network, self.target_network, None
+        
+        self.shared_policy = get_policy_registry().acquire(
+            self.policy_name, self.policy_version, self.model_path, self.inference_only, loader,
+            quantized=self.quantized
+        )
+        self.q_network = self.shared_policy.q_network
+        self.target_network = self.shared_policy.target_network
+        self.numpy_policy = self.shared_policy.numpy_policy
+    
+    def close(self):
+        """释放控制器持有的资源（共享策略引用、后台学习线程、映射的经验文件）"""
+        self.stop_background_learner()
+        if self._decision_executor is not None:
+            self._decision_executor.shutdown(wait=False)
+            self._decision_executor = None
+        if self.shared_policy is not None:
+            get_policy_registry().release(
+                self.shared_policy, self.model_path, self.inference_only, quantized=self.quantized
+            )
+            self.shared_policy = None
+        if self.memory is not None:
+            self.memory.flush()
+    
+    def warm_up(self) -> Dict[str, float]:
+        """
+        预热推理路径：提前追踪/编译推理计算图，使第一次在线决策不再承担编译开销
+        
+        Returns:
+            dict: 各推理路径的预热耗时（秒）
+        """
+        timings = {}
+        dummy = np.zeros((1, self._get_state_size()), dtype=np.float32)
+        
+        if self.numpy_policy is not None:
+            start = time.perf_counter()
+            self.numpy_policy.predict_on_batch(dummy)
+            timings['numpy_policy'] = time.perf_counter() - start
+        
+        if self.q_network is not None:
+            # 决策与学习步骤都使用 predict_on_batch
+            start = time.perf_counter()
+            self.q_network.predict_on_batch(dummy)
+            timings['q_network_predict_on_batch'] = time.perf_counter() - start
+        
+        if self.target_network is not None and self.target_network is not self.q_network:
+            start = time.perf_counter()
+            self.target_network.predict_on_batch(dummy)
+            timings['target_network_predict_on_batch'] = time.perf_counter() - start
+        
+        if self.target_sync is not None:
+            # 追踪原地同步的计算图
+            start = time.perf_counter()
+            with self.train_lock:
+                self.target_sync.hard_update()
+                self.target_sync.soft_update(self.target_tau)
+                self.target_sync.hard_update()
+            timings['target_sync'] = time.perf_counter() - start
+        
+        logger.info(f"DRL controller warmed up: {timings}")
+        return timings
+    
     def _get_state_size(self) -> int:
-        """返回状态向量的维度"""
-        # [各方向车流量, 各方向平均等待时间, 当前相位, 时间信息]
-        return len(self.phases) * 2 + 2
+        """返回状态向量的维度（与 _get_state 的布局保持一致）"""
+        # [8个车道车流量, 8个车道平均等待时间, 当前相位one-hot, 时间信息]
+        return self._phase_slice().stop + 1
+    
+    def _phase_slice(self) -> slice:
+        """当前相位one-hot在状态向量中的位置（与 _get_state 的布局保持一致）"""
+        start = len(self.LANES) * 2
+        return slice(start, start + len(self.phases))
     
-    def _get_state(self, traffic_data: Dict) -> np.ndarray:
-        """将交通数据转换为状态向量"""
+    def _get_state(self, traffic_data: Dict, timestamp: Optional[float] = None) -> np.ndarray:
+        """
+        将交通数据转换为状态向量
+        
+        Args:
+            traffic_data: 交通数据
+            timestamp: 数据时间戳（离线回放历史数据时使用），默认为当前时间
+        """
         state = []
         
         # 各方向车流量
@@ -195,7 +426,9 @@ class DRLTrafficController:
         state.extend(phase_one_hot)
         
         # 时间信息（归一化到[0,1]）
-        time_normalized = (time.time() % 3600) / 3600  # 小时内的相对时间
+        if timestamp is None:
+            timestamp = time.time()
+        time_normalized = (timestamp % 3600) / 3600  # 小时内的相对时间
         state.append(time_normalized)
         
         return np.array(state, dtype=np.float32)
@@ -207,8 +440,11 @@ class DRLTrafficController:
             return random.randint(0, len(self.phases) - 1)
         else:
             # 利用：选择Q值最大的动作
-            if self.q_network is not None:
-                q_values = self.q_network.predict(state.reshape(1, -1), verbose='0')
+            if self.numpy_policy is not None:
+                return self.numpy_policy.act(state)
+            elif self.q_network is not None:
+                # predict_on_batch 不经过 predict 的数据管道，单样本延迟低两个数量级
+                q_values = self.q_network.predict_on_batch(state.reshape(1, -1))
                 return int(np.argmax(q_values[0]))
             else:
                 return 0
@@ -216,47 +452,99 @@ class DRLTrafficController:
     def _remember(self, state: np.ndarray, action: int, reward: float, 
                   next_state: np.ndarray, done: bool):
         """存储经验到回放缓冲区"""
-        self.memory.append((state, action, reward, next_state, done))
+        with self.memory_lock:
+            self.memory.add(state, action, reward, next_state, done)
     
-    def _replay(self):
-        """从经验回放中学习"""
-        if len(self.memory) < self.batch_size or self.q_network is None or self.target_network is not None:
-            return
+    def _replay(self) -> bool:
+        """
+        从经验回放中学习（整批向量化计算Bellman目标）
         
-        # 随机采样一批经验
-        batch = random.sample(self.memory, self.batch_size)
-        states = np.array([e[0] for e in batch])
-        actions = np.array([e[1] for e in batch])
-        rewards = np.array([e[2] for e in batch])
-        next_states = np.array([e[3] for e in batch])
-        dones = np.array([e[4] for e in batch])
-        
-        # 计算目标Q值
-        if self.q_network is not None and self.target_network is not None:
-            current_q_values = self.q_network.predict(states, verbose='0')
-            next_q_values = self.target_network.predict(next_states, verbose='0')
-        else:
-            return
+        Returns:
+            bool: 是否执行了一次学习步骤
+        """
+        if self.memory is None or len(self.memory) < self.batch_size \
+                or self.q_network is None or self.target_network is None:
+            return False
+        if self.shared_policy is not None:
+            # 共享策略的权重对各路口只读
+            return False
+        
+        step_start = time.perf_counter()
         
-        # 更新Q值
-        for i in range(self.batch_size):
-            if dones[i]:
-                current_q_values[i][actions[i]] = rewards[i]
+        # 采样一批经验（优先回放时附带重要性采样权重）
+        with self.memory_lock:
+            if self.prioritized_replay:
+                states, actions, rewards, next_states, dones, indices, weights = \
+                    self.memory.sample_with_weights(self.batch_size)
             else:
-                current_q_values[i][actions[i]] = rewards[i] + self.gamma * np.max(next_q_values[i])
+                states, actions, rewards, next_states, dones = self.memory.sample(self.batch_size)
+                weights = None
         
-        # 训练网络
-        if self.q_network is not None:
-            self.q_network.fit(states, current_q_values, epochs=1, verbose='0')
+        with self.train_lock:
+            # 计算目标Q值: r + γ·max_a' Q_target(s', a')·(1 - done)
+            current_q_values = np.array(self.q_network.predict_on_batch(states))
+            next_q_values = np.asarray(self.target_network.predict_on_batch(next_states))
+            targets = rewards + self.gamma * np.max(next_q_values, axis=1) * (~dones)
+            batch_rows = np.arange(self.batch_size)
+            td_errors = targets - current_q_values[batch_rows, actions]
+            current_q_values[batch_rows, actions] = targets
+            
+            # 训练网络
+            loss = self.q_network.train_on_batch(states, current_q_values, sample_weight=weights)
+            
+            self.learner_steps += 1
+            self._maybe_update_target_network()
+        
+        if self.prioritized_replay:
+            with self.memory_lock:
+                self.memory.update_priorities(indices, td_errors)
+        
+        self.learner_time += time.perf_counter() - step_start
+        self.last_loss = float(np.ravel(loss)[0])
         
         # 降低探索率
         if self.epsilon > self.epsilon_min:
             self.epsilon *= self.epsilon_decay
+        
+        return True
+    
+    def set_target_update(self, mode: str = 'hard', interval: Optional[int] = None, tau: float = 0.005):
+        """
+        配置目标网络的更新方式
+        
+        Args:
+            mode: 'hard' 每隔 interval 个学习步完整复制一次；
+                'soft' 每隔 interval 个学习步做一次Polyak软更新
+            interval: 更新间隔（学习步），默认 hard 为100、soft 为1（每步更新，τ 决定跟随速度）
+            tau: 软更新系数，θ' ← (1-τ)·θ' + τ·θ
+        """
+        if mode not in ('hard', 'soft'):
+            raise ValueError(f"Unknown target update mode: {mode}")
+        if interval is None:
+            interval = 1 if mode == 'soft' else 100
+        if interval < 1 or not 0.0 < tau <= 1.0:
+            raise ValueError("interval must be >= 1 and tau must be in (0, 1]")
+        self.target_update_mode = mode
+        self.target_update_interval = interval
+        self.target_tau = tau
+    
+    def _maybe_update_target_network(self):
+        """学习步之后按计划更新目标网络（调用方持有 train_lock）"""
+        if self.target_sync is None or self.learner_steps % self.target_update_interval != 0:
+            return
+        if self.target_update_mode == 'soft':
+            self.target_sync.soft_update(self.target_tau)
+        else:
+            self.target_sync.hard_update()
+        self.target_updates += 1
     
     def _update_target_network(self):
-        """更新目标网络权重"""
-        if self.q_network is not None and self.target_network is not None:
-            self.target_network.set_weights(self.q_network.get_weights())
+        """把Q网络权重完整同步到目标网络（原地赋值，不经过 get_weights/set_weights）"""
+        if self.target_sync is not None:
+            # 与后台学习线程的 _maybe_update_target_network 一样在锁内计数
+            with self.train_lock:
+                self.target_sync.hard_update()
+                self.target_updates += 1
     
     def calculate_reward(self, traffic_data: Dict) -> float:
         """计算奖励函数"""
@@ -301,36 +589,309 @@ class DRLTrafficController:
             tuple: (next_phase, duration_seconds)
         """
         try:
+            decision_start = time.perf_counter()
+            
             # 获取当前状态
             current_state = self._get_state(traffic_data)
             
-            # 选择动作
-            action = self._choose_action(current_state)
-            
-            # 执行动作并获得奖励
-            reward = self.calculate_reward(traffic_data)
+            if self.latency_budget is not None:
+                result = self._decide_within_budget(current_state, traffic_data, decision_start)
+            else:
+                # 选择动作
+                action = self._choose_action(current_state)
+                result = self._complete_decision(current_state, action, traffic_data)
+                self._cached_action = action
             
-            # 获取下一个状态（模拟）
-            next_state = self._simulate_next_state(current_state, action, traffic_data)
+            self._record_decision_latency(time.perf_counter() - decision_start)
+            return result
             
+        except Exception as e:
+            logger.error(f"Error in DRL controller decision: {e}")
+            # 回退到默认策略
+            return self.current_phase, self.min_green_time
+    
+    def _complete_decision(self, current_state: np.ndarray, action: int,
+                           traffic_data: Dict) -> Tuple[int, int]:
+        """动作选定后的处理：计算奖励、存储经验、学习并决定相位持续时间"""
+        # 执行动作并获得奖励
+        reward = self.calculate_reward(traffic_data)
+        
+        # 获取下一个状态（模拟）
+        next_state = self._simulate_next_state(current_state, action, traffic_data)
+        
+        # 共享策略的权重只读，不在线训练，也不需要存储经验
+        if not self.inference_only and self.shared_policy is None:
             # 存储经验
             done = False  # 交通控制是连续过程
             self._remember(current_state, action, reward, next_state, done)
             
-            # 学习
-            self._replay()
+            # 学习（启用后台学习线程时由学习线程负责）
+            if self.learner is None:
+                self._replay()
+        
+        # 决定相位持续时间
+        duration = self._calculate_phase_duration(action, traffic_data)
+        
+        logger.debug(f"DRL Controller - Phase: {action}, Duration: {duration}s, Reward: {reward:.2f}")
+        
+        return action, duration
+    
+    def set_latency_budget(self, budget_ms: Optional[float], fallback: str = 'cached'):
+        """
+        设置单次决策的延迟预算
+        
+        启用后，策略推理在独立的工作线程中执行，决策线程最多等待 budget_ms；
+        奖励计算、经验存储和在线训练也移到工作线程，不再占用决策预算。
+        
+        Args:
+            budget_ms: 延迟预算（毫秒），None表示不限制
+            fallback: 超时后的回退方案。'cached' 使用上一次策略给出的动作
+                （没有缓存时使用规则方案），'rule' 总是使用规则方案
+        """
+        if fallback not in ('cached', 'rule'):
+            raise ValueError(f"Unknown fallback mode: {fallback}")
+        self.fallback_mode = fallback
+        self.latency_budget = budget_ms / 1000.0 if budget_ms is not None else None
+        if self.latency_budget is not None and self._decision_executor is None:
+            self._decision_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix=f'drl-decision-{self.intersection_id}'
+            )
+    
+    def _decide_within_budget(self, current_state: np.ndarray, traffic_data: Dict,
+                              decision_start: float) -> Tuple[int, int]:
+        """在延迟预算内决策，超时则回退"""
+        pending = self._pending_decision
+        if pending is not None and not pending.done():
+            # 上一次的推理或在线训练仍未结束（例如TF卡住），不再排队等待
+            return self._fallback_decision(traffic_data)
+        
+        future = self._decision_executor.submit(self._choose_action, current_state)
+        remaining = self.latency_budget - (time.perf_counter() - decision_start)
+        try:
+            action = future.result(timeout=max(remaining, 0.0))
+        except FutureTimeoutError:
+            # 迟到的结果仍然更新缓存动作，供之后的回退使用
+            future.add_done_callback(self._cache_late_action)
+            self._pending_decision = future
+            return self._fallback_decision(traffic_data)
+        
+        self._cached_action = action
+        self._pending_decision = self._decision_executor.submit(
+            self._complete_decision, current_state, action, traffic_data
+        )
+        self._pending_decision.add_done_callback(self._log_background_error)
+        return action, self._calculate_phase_duration(action, traffic_data)
+    
+    @staticmethod
+    def _log_background_error(future):
+        """记录工作线程中经验存储/在线训练的异常"""
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Error in DRL controller background update: {future.exception()}")
+    
+    def _cache_late_action(self, future):
+        """超时后才完成的推理结果写入缓存"""
+        if not future.cancelled() and future.exception() is None:
+            self._cached_action = future.result()
+    
+    def _fallback_decision(self, traffic_data: Dict) -> Tuple[int, int]:
+        """错过决策期限时的回退：缓存动作或规则方案"""
+        self.deadline_misses += 1
+        if self.fallback_mode == 'cached' and self._cached_action is not None:
+            self.fallback_counts['cached'] += 1
+            action = self._cached_action
+        else:
+            self.fallback_counts['rule'] += 1
+            action = self._rule_based_action(traffic_data)
+        logger.debug(f"DRL Controller deadline miss for intersection {self.intersection_id}, fallback phase {action}")
+        return action, self._calculate_phase_duration(action, traffic_data)
+    
+    def _rule_based_action(self, traffic_data: Dict) -> int:
+        """规则方案：选择放行车道排队车辆与等待时间压力最大的相位"""
+        best_phase, best_pressure = self.current_phase, -1.0
+        for phase, info in self.phases.items():
+            pressure = sum(
+                traffic_data.get(lane, 0) + 0.1 * traffic_data.get(f'{lane}_wait', 0)
+                for lane in info['directions']
+            )
+            if pressure > best_pressure:
+                best_phase, best_pressure = phase, pressure
+        return best_phase
+    
+    def _inference_policy(self) -> Optional[Any]:
+        """返回用于贪婪决策的策略（NumPy引擎优先，其次Keras网络）"""
+        return self.numpy_policy if self.numpy_policy is not None else self.q_network
+    
+    @staticmethod
+    def choose_actions_batch(controllers: List['DRLTrafficController'],
+                             states: List[np.ndarray]) -> List[int]:
+        """
+        批量ε-greedy动作选择
+        
+        共享同一个Q网络的控制器只做一次前向传播，避免每个路口单独调用
+        predict 带来的框架开销。各控制器仍使用各自的探索率。
+        
+        Args:
+            controllers: 控制器列表
+            states: 与控制器一一对应的状态向量
             
-            # 决定相位持续时间
-            duration = self._calculate_phase_duration(action, traffic_data)
+        Returns:
+            list: 与控制器一一对应的动作
+        """
+        actions = [0] * len(controllers)
+        # 按Q网络分组，需要利用（非探索）的控制器才参与前向传播
+        groups: Dict[int, List[int]] = {}
+        for i, controller in enumerate(controllers):
+            if random.random() <= controller.epsilon:
+                actions[i] = random.randint(0, len(controller.phases) - 1)
+            elif controller._inference_policy() is not None:
+                groups.setdefault(id(controller._inference_policy()), []).append(i)
+        
+        for indices in groups.values():
+            policy = controllers[indices[0]]._inference_policy()
+            batch = np.stack([states[i] for i in indices]).astype(np.float32, copy=False)
+            q_values = np.asarray(policy.predict_on_batch(batch))
+            best_actions = np.argmax(q_values, axis=1)
+            for i, best_action in zip(indices, best_actions):
+                actions[i] = int(best_action)
+        
+        return actions
+    
+    @classmethod
+    def get_next_phases_batch(cls, controllers: List['DRLTrafficController'],
+                              traffic_data_list: List[Dict]) -> List[Tuple[int, int]]:
+        """
+        批量决定多个路口的下一个相位和持续时间
+        
+        Args:
+            controllers: 控制器列表（共享策略网络的控制器会合并为一次推理）
+            traffic_data_list: 与控制器一一对应的交通数据
             
-            logger.debug(f"DRL Controller - Phase: {action}, Duration: {duration}s, Reward: {reward:.2f}")
+        Returns:
+            list: 每个路口的 (next_phase, duration_seconds)
+        """
+        if len(controllers) != len(traffic_data_list):
+            raise ValueError("controllers and traffic_data_list must have the same length")
+        
+        batch_start = time.perf_counter()
+        states = [controller._get_state(data) for controller, data in zip(controllers, traffic_data_list)]
+        
+        try:
+            actions = cls.choose_actions_batch(controllers, states)
+        except Exception as e:
+            logger.error(f"Error in batched DRL inference: {e}")
+            return [(c.current_phase, c.min_green_time) for c in controllers]
+        
+        results = []
+        for controller, state, action, data in zip(controllers, states, actions, traffic_data_list):
+            try:
+                results.append(controller._complete_decision(state, action, data))
+            except Exception as e:
+                logger.error(f"Error in DRL controller decision for {controller.intersection_id}: {e}")
+                results.append((controller.current_phase, controller.min_green_time))
+        
+        # 批内每个路口的决策延迟即整批耗时
+        batch_elapsed = time.perf_counter() - batch_start
+        for controller in controllers:
+            controller._record_decision_latency(batch_elapsed)
+        
+        return results
+    
+    def gather_experience(self, env: Any, num_steps: int,
+                          states: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        在向量化仿真环境中按当前ε-greedy策略批量采集经验
+        
+        Args:
+            env: VectorizedTrafficEnv 实例（状态布局与 _get_state 一致）
+            num_steps: 推进的步数，共采集 num_steps × env.num_envs 条经验
+            states: 环境当前状态，为None时先重置环境
             
-            return action, duration
+        Returns:
+            np.ndarray: 采集结束时的环境状态，可传入下一次调用继续采集
+        """
+        if self.memory is None:
+            raise RuntimeError("Inference-only and shared-policy controllers have no replay memory")
+        if states is None:
+            states = env.reset()
+        num_actions = len(self.phases)
+        policy = self._inference_policy()
+        # 仿真回合结束属于时间截断，与在线控制一样按连续过程处理（done=False）
+        not_done = np.zeros(env.num_envs, dtype=np.bool_)
+        
+        for _ in range(num_steps):
+            actions = np.random.randint(0, num_actions, size=env.num_envs)
+            greedy = np.random.random(env.num_envs) > self.epsilon
+            if policy is not None and greedy.any():
+                q_values = np.asarray(policy.predict_on_batch(states[greedy]))
+                actions[greedy] = np.argmax(q_values, axis=1)
             
-        except Exception as e:
-            logger.error(f"Error in DRL controller decision: {e}")
-            # 回退到默认策略
-            return self.current_phase, self.min_green_time
+            next_states, rewards, _, info = env.step(actions)
+            with self.memory_lock:
+                self.memory.add_batch(states, actions, rewards, info['final_states'], not_done)
+            states = next_states
+        
+        return states
+    
+    def start_background_learner(self, publish_interval: float = 5.0, **kwargs) -> BackgroundLearner:
+        """
+        启动后台学习线程，决策路径改为读取发布的只读权重快照
+        
+        Args:
+            publish_interval: 发布新权重快照的间隔（秒）
+            **kwargs: 传给 BackgroundLearner 的其他参数
+        """
+        if self.inference_only or self.q_network is None or self.shared_policy is not None:
+            raise RuntimeError("Background learning requires a trainable, non-shared Keras model")
+        if self.learner is None:
+            self.learner = BackgroundLearner(self, publish_interval=publish_interval, **kwargs)
+            self.learner.start()
+        return self.learner
+    
+    def stop_background_learner(self):
+        """
+        停止后台学习线程，恢复决策时内联学习
+        
+        停止前再发布一次快照，决策继续使用与学习期间相同类型的策略（浮点或int8），
+        权重为学习线程的最终结果。
+        """
+        if self.learner is not None:
+            self.learner.stop()
+            self.learner.publish()
+            self.learner = None
+    
+    def _record_decision_latency(self, seconds: float):
+        """记录一次决策延迟"""
+        self._decision_latencies[self._latency_count % self.latency_window] = seconds
+        self._latency_count += 1
+        self._latency_histogram[np.searchsorted(self._latency_bucket_edges, seconds)] += 1
+    
+    def get_decision_latency_stats(self) -> Dict:
+        """决策延迟百分位（毫秒），基于最近 latency_window 次决策"""
+        count = min(self._latency_count, self.latency_window)
+        stats = {
+            'count': self._latency_count,
+            'budget_ms': self.latency_budget * 1000.0 if self.latency_budget is not None else None,
+            'deadline_misses': self.deadline_misses,
+            'fallback_cached': self.fallback_counts['cached'],
+            'fallback_rule': self.fallback_counts['rule'],
+            'histogram': self.get_decision_latency_histogram()
+        }
+        if count == 0:
+            return stats
+        p50, p95, p99 = np.percentile(self._decision_latencies[:count], [50, 95, 99]) * 1000.0
+        stats.update({
+            'p50_ms': float(p50),
+            'p95_ms': float(p95),
+            'p99_ms': float(p99),
+            'max_ms': float(self._decision_latencies[:count].max() * 1000.0)
+        })
+        return stats
+    
+    def get_decision_latency_histogram(self) -> List[Dict]:
+        """决策延迟直方图（累计计数，按桶上界 le_ms 排列，最后一个桶为 +Inf）"""
+        cumulative = np.cumsum(self._latency_histogram)
+        edges = list(LATENCY_BUCKETS_MS) + ['+Inf']
+        return [{'le_ms': edge, 'count': int(c)} for edge, c in zip(edges, cumulative)]
     
     def _simulate_next_state(self, current_state: np.ndarray, action: int, 
                            traffic_data: Dict) -> np.ndarray:
@@ -339,14 +900,13 @@ class DRLTrafficController:
         next_state = current_state.copy()
         
         # 更新相位信息
-        phase_start_idx = len(self.phases) * 2  # 相位信息在状态向量中的起始位置
-        next_state[phase_start_idx:phase_start_idx + len(self.phases)] = 0
-        next_state[phase_start_idx + action] = 1
+        phase_slice = self._phase_slice()
+        next_state[phase_slice] = 0
+        next_state[phase_slice.start + action] = 1
         
         # 模拟车流量变化（简化）
         flow_change_factor = 0.9  # 假设相位切换后车流减少
-        for i in range(len(self.phases) * 2):
-            next_state[i] *= flow_change_factor
+        next_state[:len(self.LANES)] *= flow_change_factor
             
         return next_state
     
@@ -369,50 +929,42 @@ class DRLTrafficController:
         return duration
     
     def update_stats(self, traffic_data: Dict):
-        """更新统计信息"""
-        # 记录历史数据用于分析
-        timestamp = time.time()
-        stats = {
-            'timestamp': timestamp,
-            'current_phase': self.current_phase,
-            'vehicle_counts': {
-                'north_straight': traffic_data.get('north_straight', 0),
-                'south_straight': traffic_data.get('south_straight', 0),
-                'east_straight': traffic_data.get('east_straight', 0),
-                'west_straight': traffic_data.get('west_straight', 0),
-                'north_left': traffic_data.get('north_left', 0),
-                'south_left': traffic_data.get('south_left', 0),
-                'east_left': traffic_data.get('east_left', 0),
-                'west_left': traffic_data.get('west_left', 0)
-            },
-            'waiting_times': {
-                'north_straight_wait': traffic_data.get('north_straight_wait', 0),
-                'south_straight_wait': traffic_data.get('south_straight_wait', 0),
-                'east_straight_wait': traffic_data.get('east_straight_wait', 0),
-                'west_straight_wait': traffic_data.get('west_straight_wait', 0),
-                'north_left_wait': traffic_data.get('north_left_wait', 0),
-                'south_left_wait': traffic_data.get('south_left_wait', 0),
-                'east_left_wait': traffic_data.get('east_left_wait', 0),
-                'west_left_wait': traffic_data.get('west_left_wait', 0)
-            }
-        }
-        
-        self.vehicle_count_history.append(stats)
+        """更新统计信息（写入定长环形缓冲，滑动窗口和增量更新）"""
+        counts = self._stats_counts
+        waits = self._stats_waits
+        for i, lane in enumerate(self.LANES):
+            counts[i] = traffic_data.get(lane, 0)
+            waits[i] = traffic_data.get(f'{lane}_wait', 0)
+        self.traffic_stats.add(time.time(), self.current_phase, counts, waits)
+    
+    def set_metrics_windows(self, windows: List[int], capacity: Optional[int] = None):
+        """
+        重新配置交通统计的滑动窗口（会清空已有统计）
         
-        # 保持最近100条记录
-        if len(self.vehicle_count_history) > 100:
-            self.vehicle_count_history.pop(0)
+        Args:
+            windows: 窗口大小列表（条），第一个窗口用于 average_waiting_time 等指标
+            capacity: 环形缓冲容量，默认不小于最大窗口
+        """
+        self.stats_capacity = capacity or max(self.stats_capacity, max(windows))
+        self.metrics_window = windows[0]
+        self.traffic_stats = RollingTrafficStats(
+            len(self.LANES), capacity=self.stats_capacity, windows=windows
+        )
     
     def save_model(self, filepath: Optional[str] = None):
         """保存训练好的模型"""
         try:
             if filepath is None:
-                filepath = os.path.join(self.model_path, f'drl_model_{self.intersection_id}.h5')
+                filepath = os.path.join(self.model_path, f'drl_model_{self._model_stem()}.h5')
             
             if self.q_network is not None:
                 self.q_network.save(filepath)
                 logger.info(f"Model saved to {filepath}")
             
+            # 同步持久化的经验回放数据
+            if self.memory is not None:
+                self.memory.flush()
+            
         except Exception as e:
             logger.error(f"Failed to save model: {e}")
     
@@ -420,13 +972,16 @@ class DRLTrafficController:
         """加载预训练模型"""
         try:
             if filepath is None:
-                filepath = os.path.join(self.model_path, f'drl_model_{self.intersection_id}.h5')
+                filepath = os.path.join(self.model_path, f'drl_model_{self._model_stem()}.h5')
             
             if os.path.exists(filepath) and self.q_network is not None:
-                self.q_network = keras.models.load_model(filepath)
+                # 不反序列化训练配置（不同Keras版本的h5损失函数名不兼容），加载后重新编译
+                self.q_network = keras.models.load_model(filepath, compile=False)
+                self.q_network.compile(
+                    optimizer=keras.optimizers.Adam(learning_rate=self.learning_rate), loss='mse'
+                )
                 self.target_network = keras.models.clone_model(self.q_network)
-                if self.q_network is not None and self.target_network is not None:
-                    self.target_network.set_weights(self.q_network.get_weights())
+                self._init_target_sync()
                 logger.info(f"Model loaded from {filepath}")
             else:
                 logger.info("No pre-trained model found, using newly initialized model")
@@ -434,26 +989,178 @@ class DRLTrafficController:
         except Exception as e:
             logger.warning(f"Failed to load model: {e}, using default initialization")
     
-    def get_performance_metrics(self) -> Dict:
-        """获取控制器性能指标"""
-        if not self.vehicle_count_history:
-            return {}
+    def _model_stem(self) -> str:
+        """模型文件名主干：共享策略使用策略名和版本，否则使用路口ID"""
+        if self.policy_name is None:
+            return self.intersection_id
+        if self.policy_version is None:
+            return self.policy_name
+        return f'{self.policy_name}_v{self.policy_version}'
+    
+    def _policy_filepath(self, quantized: bool = False) -> str:
+        """NumPy策略文件的默认路径"""
+        suffix = '_int8' if quantized else ''
+        return os.path.join(self.model_path, f'drl_policy_{self._model_stem()}{suffix}.npz')
+    
+    def export_policy(self, filepath: Optional[str] = None) -> Optional[str]:
+        """
+        导出Q网络权重供纯NumPy推理引擎使用
         
-        recent_data = self.vehicle_count_history[-20:]  # 最近20个时间点
+        Args:
+            filepath: 输出路径，默认 drl_policy_<intersection_id>.npz
+            
+        Returns:
+            str: 导出文件路径，失败时返回None
+        """
+        try:
+            if self.q_network is None:
+                logger.warning("No Q-network to export")
+                return None
+            return export_policy_weights(self.q_network, filepath or self._policy_filepath())
+        except Exception as e:
+            logger.error(f"Failed to export policy: {e}")
+            return None
+    
+    def _sample_states(self, count: int, max_flow: float, max_wait: float,
+                       rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """
+        按 _get_state 的布局均匀随机生成状态
         
-        # 计算平均等待时间
-        avg_waiting_time = np.mean([
-            sum(item['waiting_times'].values()) for item in recent_data
-        ])
+        车流量和等待时间分别在 [0, max_flow]、[0, max_wait] 内均匀分布，相位为
+        随机的one-hot，时间特征在 [0, 1) 内。
+        """
+        rng = rng or np.random.default_rng()
+        num_lanes = len(self.LANES)
+        states = np.zeros((count, self._get_state_size()), dtype=np.float32)
+        states[:, :num_lanes] = rng.uniform(0, max_flow, size=(count, num_lanes))
+        states[:, num_lanes:2 * num_lanes] = rng.uniform(0, max_wait, size=(count, num_lanes))
+        phases = rng.integers(0, len(self.phases), size=count)
+        states[np.arange(count), self._phase_slice().start + phases] = 1.0
+        states[:, -1] = rng.random(count)
+        return states
+    
+    def _calibration_states(self, calibration_size: int) -> np.ndarray:
+        """经验回放中最近记录的状态"""
+        with self.memory_lock:
+            count = min(len(self.memory), calibration_size) if self.memory is not None else 0
+            if count == 0:
+                raise ValueError("Replay memory is empty, calibration states are required")
+            indices = np.arange(self.memory.position - count, self.memory.position) % self.memory.capacity
+            return self.memory.states[indices].copy()
+    
+    def _default_calibration_states(self, calibration_size: int = 2048) -> np.ndarray:
+        """默认的量化校准数据：经验回放中最近的状态，加上四分之一同一取值范围内的随机状态"""
+        num_lanes = len(self.LANES)
+        calibration_states = self._calibration_states(calibration_size)
+        # 经验回放中的状态集中在少数交通场景，补充整个取值范围内的随机状态，
+        # 避免其他场景下的激活超出量化范围被截断
+        return np.concatenate([calibration_states, self._sample_states(
+            len(calibration_states) // 4,
+            max_flow=float(calibration_states[:, :num_lanes].max()),
+            max_wait=float(calibration_states[:, num_lanes:2 * num_lanes].max())
+        )])
+    
+    def quantize_policy(self, calibration_states: Optional[np.ndarray] = None,
+                        calibration_size: int = 2048, validation_states: Optional[np.ndarray] = None,
+                        validation_size: int = 2048, activate: bool = True,
+                        filepath: Optional[str] = None) -> Dict:
+        """
+        对当前策略做训练后int8量化（需要TensorFlow完成转换）
         
-        # 计算总车流量
-        total_vehicles = sum([
-            sum(item['vehicle_counts'].values()) for item in recent_data
-        ])
+        校准数据默认取经验回放中最近记录的状态，并补充四分之一在同一车流量/
+        等待时间范围内按状态布局均匀随机生成的状态。精度检查使用另外随机生成
+        的状态：与校准样本无关，覆盖各种交通场景、相位和时间，浮点策略在这些
+        状态上不会总是选同一个动作（经验回放中的状态往往只对应一个动作）。
+        
+        Args:
+            calibration_states: 校准状态 (n, state_size)，默认取自经验回放
+            calibration_size: 从经验回放中取的最多状态数
+            validation_states: 精度检查状态，默认随机生成
+            validation_size: 随机生成的精度检查状态数
+            activate: 是否将决策切换到量化引擎
+            filepath: 保存量化策略的路径，'default' 表示 drl_policy_<stem>_int8.npz
+            
+        Returns:
+            dict: 精度检查结果（动作不一致率、Q值误差、浮点策略选择的不同动作数）与权重大小
+        """
+        if isinstance(self.numpy_policy, QuantizedPolicy):
+            raise RuntimeError("Policy is already quantized")
+        if self.numpy_policy is not None:
+            float_policy = self.numpy_policy
+        elif self.q_network is not None:
+            with self.train_lock:
+                float_policy = NumpyPolicy.from_keras(self.q_network)
+        else:
+            raise RuntimeError("No policy available to quantize")
         
-        return {
-            'average_waiting_time': float(avg_waiting_time),
-            'total_vehicles_processed': total_vehicles,
+        num_lanes = len(self.LANES)
+        if calibration_states is None:
+            calibration_states = self._default_calibration_states(calibration_size)
+        calibration_states = np.asarray(calibration_states, dtype=np.float32)
+        if validation_states is None:
+            validation_states = self._sample_states(
+                validation_size,
+                max_flow=float(calibration_states[:, :num_lanes].max()),
+                max_wait=float(calibration_states[:, num_lanes:2 * num_lanes].max())
+            )
+        
+        quantized = QuantizedPolicy.quantize(float_policy, calibration_states)
+        report = compare_policies(float_policy, quantized, validation_states)
+        report.update({
+            'calibration_samples': int(len(calibration_states)),
+            'float_parameter_bytes': float_policy.parameter_bytes(),
+            'quantized_parameter_bytes': quantized.parameter_bytes()
+        })
+        logger.info(
+            f"Policy quantized for intersection {self.intersection_id}: "
+            f"action mismatch {report['action_mismatch_rate']:.4f} over {report['distinct_actions']} actions, "
+            f"mean |dQ| {report['mean_abs_q_error']:.4f}, "
+            f"{report['float_parameter_bytes']} -> {report['quantized_parameter_bytes']} bytes"
+        )
+        
+        if filepath is not None:
+            report['filepath'] = quantized.save(
+                self._policy_filepath(quantized=True) if filepath == 'default' else filepath
+            )
+        if activate:
+            self.numpy_policy = quantized
+        return report
+    
+    def _load_numpy_policy(self, filepath: Optional[str] = None):
+        """加载导出的NumPy策略（浮点或int8量化）"""
+        filepath = filepath or self._policy_filepath(quantized=self.quantized)
+        try:
+            if os.path.exists(filepath):
+                self.numpy_policy = load_policy(filepath)
+                logger.info(f"NumPy policy loaded from {filepath}")
+            else:
+                logger.warning(f"No exported policy found at {filepath}, falling back to default phase")
+        except Exception as e:
+            logger.warning(f"Failed to load NumPy policy: {e}")
+    
+    def get_performance_metrics(self) -> Dict:
+        """获取控制器性能指标"""
+        metrics = {
             'exploration_rate': self.epsilon,
-            'memory_size': len(self.memory)
+            'memory_size': len(self.memory) if self.memory is not None else 0,
+            'learner_steps': self.learner_steps,
+            'learner_steps_per_sec': self.learner_steps / self.learner_time if self.learner_time > 0 else 0.0,
+            'last_loss': self.last_loss,
+            'decision_latency': self.get_decision_latency_stats(),
+            'background_learner': self.learner.get_status() if self.learner is not None else None
         }
+        
+        if len(self.traffic_stats) == 0:
+            return metrics
+        
+        # 最近 metrics_window 个时间点的滑动统计
+        summary = self.traffic_stats.window_summary(self.metrics_window)
+        metrics.update({
+            'average_waiting_time': summary['average_waiting_time'],
+            'total_vehicles_processed': summary['total_vehicles'],
+            'traffic_windows': {
+                window: self.traffic_stats.window_summary(window)
+                for window in self.traffic_stats.windows
+            }
+        })
+        return metrics
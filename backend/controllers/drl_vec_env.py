@@ -0,0 +1,189 @@
+import numpy as np
+import logging
+from typing import Dict, Optional, Tuple
+
+from .drl_traffic_controller import DRLTrafficController
+
+logger = logging.getLogger(__name__)
+
+
+class VectorizedTrafficEnv:
+    """
+    向量化的多路口交通仿真环境
+
+    N 个路口以 NumPy 数组同步推进：每个车道的排队车辆数、车头等待时间、
+    到达率和放行能力都是 (N, 8) 数组，一次 step 完成所有路口的到达、
+    放行和相位切换。输出的状态与 DRLTrafficController._get_state 的布局
+    完全一致，奖励与 calculate_reward 的计算方式一致，可直接用于生成
+    DQN 训练经验。
+    """
+
+    def __init__(self, num_envs: int, step_seconds: float = 5.0,
+                 arrival_rates: Optional[np.ndarray] = None,
+                 saturation_flow: float = 0.5, lost_time: float = 5.0,
+                 episode_steps: int = 720, max_queue: float = 200.0,
+                 seed: Optional[int] = None, phases: Optional[Dict[int, Dict]] = None):
+        """
+        Args:
+            num_envs: 同步仿真的路口数
+            step_seconds: 每步仿真时长（秒），对应一次控制决策
+            arrival_rates: 各车道到达率（辆/秒），形状 (8,) 或 (num_envs, 8)；
+                默认每个路口随机生成不同的需求场景
+            saturation_flow: 绿灯车道的饱和放行率（辆/秒）
+            lost_time: 相位切换时的损失时间（黄灯+全红，秒）
+            episode_steps: 每个回合的步数，到达后返回 done 并自动重置该路口
+            max_queue: 单车道排队上限（辆）
+            seed: 随机种子
+            phases: 相位定义 {相位: {'directions': [放行车道, ...]}}，默认与
+                DRLTrafficController.PHASES 相同；其他控制器可传入自己的相位方案
+        """
+        self.num_envs = num_envs
+        self.step_seconds = step_seconds
+        self.saturation_flow = saturation_flow
+        self.lost_time = lost_time
+        self.episode_steps = episode_steps
+        self.max_queue = max_queue
+        self.rng = np.random.default_rng(seed)
+
+        self.lanes = DRLTrafficController.LANES
+        self.phases = phases if phases is not None else DRLTrafficController.PHASES
+        self.num_lanes = len(self.lanes)
+        self.num_phases = len(self.phases)
+        self.state_size = self.num_lanes * 2 + self.num_phases + 1
+
+        # 相位 -> 放行车道掩码 (num_phases, num_lanes)
+        self.phase_lane_mask = np.zeros((self.num_phases, self.num_lanes), dtype=np.float32)
+        for phase, info in self.phases.items():
+            for lane in info['directions']:
+                self.phase_lane_mask[phase, self.lanes.index(lane)] = 1.0
+
+        if arrival_rates is None:
+            self._random_rates = True
+            self.arrival_rates = self._sample_arrival_rates(num_envs)
+        else:
+            self._random_rates = False
+            self.arrival_rates = np.broadcast_to(
+                np.asarray(arrival_rates, dtype=np.float32), (num_envs, self.num_lanes)
+            ).copy()
+
+        # 仿真状态
+        self.queues = np.zeros((num_envs, self.num_lanes), dtype=np.float32)
+        self.waits = np.zeros((num_envs, self.num_lanes), dtype=np.float32)
+        self.phases_now = np.zeros(num_envs, dtype=np.int64)
+        self.clock = np.zeros(num_envs, dtype=np.float64)
+        self.steps = np.zeros(num_envs, dtype=np.int64)
+
+        # 预分配的输出缓冲
+        self._states = np.zeros((num_envs, self.state_size), dtype=np.float32)
+        self._rows = np.arange(num_envs)
+
+    def _sample_arrival_rates(self, count: int) -> np.ndarray:
+        """随机生成需求场景：直行 0.05~0.3 辆/秒，左转为直行的 20%~50%"""
+        straight = self.rng.uniform(0.05, 0.3, size=(count, self.num_lanes))
+        left_ratio = self.rng.uniform(0.2, 0.5, size=(count, self.num_lanes))
+        is_left = np.array(['left' in lane for lane in self.lanes])
+        return np.where(is_left, straight * left_ratio, straight).astype(np.float32)
+
+    def _reset_envs(self, mask: np.ndarray):
+        """重置指定路口"""
+        count = int(mask.sum())
+        if count == 0:
+            return
+        self.queues[mask] = self.rng.poisson(3.0, size=(count, self.num_lanes))
+        self.waits[mask] = 0.0
+        self.phases_now[mask] = self.rng.integers(0, self.num_phases, size=count)
+        self.clock[mask] = self.rng.uniform(0, 86400, size=count)
+        self.steps[mask] = 0
+        if self._random_rates:
+            self.arrival_rates[mask] = self._sample_arrival_rates(count)
+
+    def _build_states(self) -> np.ndarray:
+        """按 _get_state 的布局生成状态: [车流量×8, 等待时间×8, 相位one-hot, 时间]"""
+        states = self._states
+        states[:, :self.num_lanes] = self.queues
+        states[:, self.num_lanes:2 * self.num_lanes] = self.waits
+        phase_block = states[:, 2 * self.num_lanes:2 * self.num_lanes + self.num_phases]
+        phase_block[:] = 0.0
+        phase_block[self._rows, self.phases_now] = 1.0
+        states[:, -1] = (self.clock % 3600) / 3600
+        return states.copy()
+
+    def reset(self) -> np.ndarray:
+        """重置所有路口，返回初始状态 (num_envs, state_size)"""
+        self._reset_envs(np.ones(self.num_envs, dtype=bool))
+        return self._build_states()
+
+    def step(self, actions: np.ndarray,
+             durations: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict]:
+        """
+        所有路口同步推进一步
+
+        Args:
+            actions: 每个路口选择的相位 (num_envs,)
+            durations: 每个路口本步的时长（秒）(num_envs,)，例如控制器给出的绿灯时间；
+                默认为 step_seconds
+
+        Returns:
+            tuple: (next_states, rewards, dones, info)
+                dones 表示回合到达 episode_steps（时间截断），这些路口随后被自动
+                重置，next_states 中对应行为重置后的状态；截断前的状态在
+                info['final_states'] 中
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        if durations is None:
+            dt = np.full(self.num_envs, self.step_seconds, dtype=np.float32)
+        else:
+            dt = np.broadcast_to(np.asarray(durations, dtype=np.float32), (self.num_envs,))
+
+        # 相位切换损失时间
+        switched = actions != self.phases_now
+        effective_green = np.where(switched, np.maximum(dt - self.lost_time, 0.0), dt).astype(np.float32)
+        self.phases_now = actions
+
+        # 到达
+        arrivals = self.rng.poisson(self.arrival_rates * dt[:, None]).astype(np.float32)
+        queues_before = self.queues + arrivals
+
+        # 放行：绿灯车道按饱和流率放行
+        green = self.phase_lane_mask[actions]
+        capacity = green * (self.saturation_flow * effective_green)[:, None]
+        passed = np.minimum(queues_before, capacity)
+        self.queues = np.minimum(queues_before - passed, self.max_queue)
+
+        # 等待时间：红灯车道上有车则继续累积，绿灯车道按剩余比例衰减
+        remaining_ratio = np.divide(self.queues, queues_before,
+                                    out=np.zeros_like(self.queues), where=queues_before > 0)
+        self.waits = np.where(
+            green > 0,
+            self.waits * remaining_ratio,
+            np.where(queues_before > 0, self.waits + dt[:, None], 0.0)
+        ).astype(np.float32)
+
+        self.clock += dt
+        self.steps += 1
+
+        # 与 DRLTrafficController.calculate_reward 相同的奖励
+        rewards = -0.1 * self.waits.sum(axis=1) + 0.5 * passed.sum(axis=1)
+
+        final_states = self._build_states()
+        dones = self.steps >= self.episode_steps
+        info = {
+            'final_states': final_states,
+            'passed': passed.sum(axis=1),
+            'queue_total': self.queues.sum(axis=1)
+        }
+        if dones.any():
+            self._reset_envs(dones)
+            next_states = self._build_states()
+        else:
+            next_states = final_states
+
+        return next_states, rewards.astype(np.float32), dones, info
+
+    def traffic_data(self, index: int) -> Dict:
+        """将第 index 个路口的当前状态转换为控制器使用的交通数据字典"""
+        data = {}
+        for j, lane in enumerate(self.lanes):
+            data[lane] = float(self.queues[index, j])
+            data[f'{lane}_wait'] = float(self.waits[index, j])
+        return data
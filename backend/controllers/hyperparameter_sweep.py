@@ -0,0 +1,366 @@
+import os
+import csv
+import json
+import time
+import random
+import logging
+import itertools
+import tempfile
+import multiprocessing
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .drl_vec_env import VectorizedTrafficEnv
+
+logger = logging.getLogger(__name__)
+
+# AdaptiveTrafficController 的相位在仿真车道上的放行方案（车道名称与 DRLTrafficController.LANES 一致）
+ADAPTIVE_PHASE_LANES = {
+    0: {'directions': ['north_straight', 'south_straight']},
+    1: {'directions': ['east_straight', 'west_straight']},
+    2: {'directions': ['north_left']},
+    3: {'directions': ['east_left']},
+    4: {'directions': ['south_left']},
+    5: {'directions': ['west_left']}
+}
+
+# 仿真车道所属方向（0北 1南 2东 3西），与 BatchAdaptiveTrafficController 的方向编码一致
+SIM_LANE_DIRECTIONS = np.array([0, 0, 1, 1, 2, 2, 3, 3])
+
+# 排队车辆数达到该值时拥堵程度记为1
+CONGESTION_QUEUE = 20.0
+FREE_FLOW_SPEED = 50.0
+
+# 各控制器可调的超参数
+TUNABLE_PARAMETERS = {
+    'adaptive': ('alpha', 'gamma', 'epsilon', 'epsilon_decay', 'epsilon_min', 'min_green_time', 'max_green_time'),
+    'drl': ('learning_rate', 'gamma', 'epsilon_decay', 'epsilon_min', 'batch_size',
+            'min_green_time', 'max_green_time')
+}
+
+
+class EpisodeMetrics:
+    """仿真过程中的延误/通行量统计"""
+
+    def __init__(self):
+        self.vehicle_seconds = 0.0
+        self.passed = 0.0
+        self.sim_seconds = 0.0
+        self.queue_samples = 0.0
+        self.steps = 0
+
+    def add(self, queue_total: np.ndarray, passed: np.ndarray, durations: np.ndarray):
+        """累计一步：排队车辆数 × 时长即为该步的总延误（车·秒）"""
+        self.vehicle_seconds += float((queue_total * durations).sum())
+        self.passed += float(passed.sum())
+        self.sim_seconds += float(durations.sum())
+        self.queue_samples += float(queue_total.mean())
+        self.steps += 1
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'average_delay': self.vehicle_seconds / self.passed if self.passed else float('inf'),
+            'throughput_per_hour': self.passed / self.sim_seconds * 3600 if self.sim_seconds else 0.0,
+            'average_queue': self.queue_samples / self.steps if self.steps else 0.0
+        }
+
+
+def run_adaptive_trial(params: Dict, scenario_seeds: Sequence[int], train_steps: int,
+                       eval_steps: int, seed: int) -> Dict[str, float]:
+    """
+    在仿真环境中训练并评估一组Q-Learning超参数
+
+    每个场景种子对应一个仿真路口，所有场景由 BatchAdaptiveTrafficController
+    同步推进（各路口独立的Q表）。
+    """
+    from .batch_adaptive_control import BatchAdaptiveTrafficController
+
+    envs = [VectorizedTrafficEnv(1, seed=s, phases=ADAPTIVE_PHASE_LANES,
+                                 episode_steps=train_steps + eval_steps + 1) for s in scenario_seeds]
+    controller = BatchAdaptiveTrafficController(
+        [f'sim_{s}' for s in scenario_seeds], SIM_LANE_DIRECTIONS, seed=seed
+    )
+    for name in TUNABLE_PARAMETERS['adaptive']:
+        if name in params:
+            value = params[name]
+            setattr(controller, name, np.full(controller.num_intersections, value) if name == 'epsilon' else value)
+    controller.green_time[:] = controller.min_green_time
+
+    for env in envs:
+        env.reset()
+    metrics = EpisodeMetrics()
+    for step in range(train_steps + eval_steps):
+        if step == train_steps:
+            controller.epsilon[:] = 0.0
+        queues = np.concatenate([env.queues for env in envs])
+        congestion = np.minimum(queues / CONGESTION_QUEUE, 1.0)
+        total = queues.sum(axis=1)
+        speed = FREE_FLOW_SPEED * (1.0 - congestion.mean(axis=1))
+        result = controller.control_step(congestion, average_speed=speed, total_vehicles=total)
+
+        durations = result['green_time'].astype(np.float32)
+        passed = np.empty(len(envs))
+        queue_total = np.empty(len(envs))
+        for i, env in enumerate(envs):
+            _, _, _, info = env.step(result['phases'][i:i + 1], durations[i:i + 1])
+            passed[i] = info['passed'][0]
+            queue_total[i] = info['queue_total'][0]
+        if step >= train_steps:
+            metrics.add(queue_total, passed, durations)
+
+    return metrics.summary()
+
+
+def run_drl_trial(params: Dict, scenario_seeds: Sequence[int], train_steps: int,
+                  eval_steps: int, seed: int) -> Dict[str, float]:
+    """
+    在仿真环境中训练并评估一组DQN超参数
+
+    训练阶段按ε-greedy采集经验，每步做一次学习；评估阶段贪婪决策，
+    每步时长取控制器 _calculate_phase_duration 给出的绿灯时间。
+    """
+    from .drl_traffic_controller import DRLTrafficController
+
+    random.seed(seed)
+    np.random.seed(seed)
+    # 控制器的模型目录只在试验期间使用，结束后连同其中的文件一起删除
+    with tempfile.TemporaryDirectory(prefix='drl_sweep_') as model_path:
+        controller = DRLTrafficController(f'sweep_{seed}', model_path=model_path)
+        try:
+            return _train_and_evaluate_drl(controller, params, scenario_seeds, train_steps, eval_steps)
+        finally:
+            controller.close()
+
+
+def _train_and_evaluate_drl(controller, params: Dict, scenario_seeds: Sequence[int], train_steps: int,
+                            eval_steps: int) -> Dict[str, float]:
+    """run_drl_trial 的训练和评估过程"""
+    for name in TUNABLE_PARAMETERS['drl']:
+        if name in params:
+            setattr(controller, name, params[name])
+    if 'learning_rate' in params:
+        controller.q_network.optimizer.learning_rate.assign(params['learning_rate'])
+
+    envs = [VectorizedTrafficEnv(1, seed=s, episode_steps=train_steps + eval_steps + 1) for s in scenario_seeds]
+    states = np.concatenate([env.reset() for env in envs])
+    num_actions = len(controller.phases)
+    not_done = np.zeros(len(envs), dtype=np.bool_)
+    metrics = EpisodeMetrics()
+
+    for step in range(train_steps + eval_steps):
+        training = step < train_steps
+        q_values = np.asarray(controller.q_network.predict_on_batch(states))
+        actions = np.argmax(q_values, axis=1)
+        if training:
+            explore = np.random.random(len(envs)) <= controller.epsilon
+            actions[explore] = np.random.randint(0, num_actions, size=int(explore.sum()))
+
+        durations = np.array([
+            controller._calculate_phase_duration(int(a), env.traffic_data(0)) for a, env in zip(actions, envs)
+        ], dtype=np.float32)
+
+        next_states = np.empty_like(states)
+        final_states = np.empty_like(states)
+        rewards = np.empty(len(envs), dtype=np.float32)
+        passed = np.empty(len(envs))
+        queue_total = np.empty(len(envs))
+        for i, env in enumerate(envs):
+            next_state, reward, _, info = env.step(actions[i:i + 1], durations[i:i + 1])
+            next_states[i], final_states[i], rewards[i] = next_state[0], info['final_states'][0], reward[0]
+            passed[i] = info['passed'][0]
+            queue_total[i] = info['queue_total'][0]
+
+        if training:
+            controller.memory.add_batch(states, actions, rewards, final_states, not_done)
+            controller._replay()
+        else:
+            metrics.add(queue_total, passed, durations)
+        states = next_states
+
+    return metrics.summary()
+
+
+TRIAL_RUNNERS = {
+    'adaptive': run_adaptive_trial,
+    'drl': run_drl_trial
+}
+
+
+def _run_trial(task: Tuple[str, int, Dict, List[int], int, int, int]) -> Dict:
+    """进程池任务：运行一个试验并返回结果行"""
+    controller_type, trial_id, params, scenario_seeds, train_steps, eval_steps, seed = task
+    start = time.perf_counter()
+    try:
+        metrics = TRIAL_RUNNERS[controller_type](params, scenario_seeds, train_steps, eval_steps, seed)
+        error = None
+    except Exception as e:
+        metrics, error = {}, str(e)
+    return {
+        'trial_id': trial_id,
+        'controller': controller_type,
+        'params': params,
+        'seed': seed,
+        'elapsed': time.perf_counter() - start,
+        'error': error,
+        **metrics
+    }
+
+
+def grid_trials(grid: Dict[str, Sequence]) -> List[Dict]:
+    """参数网格的全部组合"""
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+def random_trials(space: Dict[str, Any], count: int, seed: int = 0) -> List[Dict]:
+    """
+    随机搜索的参数组合
+
+    Args:
+        space: {参数: (下限, 上限)} 在区间内均匀采样（两端都是整数时采样整数），
+            或 {参数: [候选值, ...]} 从候选中选择
+        count: 试验数
+        seed: 随机种子（相同种子生成相同的试验序列，便于断点续跑）
+    """
+    rng = random.Random(seed)
+    trials = []
+    for _ in range(count):
+        params = {}
+        for name in sorted(space):
+            spec = space[name]
+            if isinstance(spec, tuple) and len(spec) == 2:
+                low, high = spec
+                params[name] = rng.randint(low, high) if isinstance(low, int) and isinstance(high, int) \
+                    else rng.uniform(low, high)
+            else:
+                params[name] = rng.choice(list(spec))
+        trials.append(params)
+    return trials
+
+
+class HyperparameterSweep:
+    """
+    控制器超参数的并行搜索
+
+    每个试验在相同的一组场景种子上训练并评估（公共随机数，试验之间可比），
+    试验在进程池中并行运行。每完成一个试验就把结果追加到检查点文件
+    （JSONL），中断后用同样的参数重新运行会跳过已完成的试验。
+    """
+
+    def __init__(self, controller_type: str, trials: List[Dict], checkpoint_path: str,
+                 scenarios: int = 4, train_steps: int = 500, eval_steps: int = 200,
+                 workers: Optional[int] = None, seed: int = 0, metric: str = 'average_delay'):
+        """
+        Args:
+            controller_type: 'adaptive'（Q-Learning）或 'drl'（DQN）
+            trials: 参数组合列表（见 grid_trials / random_trials）
+            checkpoint_path: 结果检查点文件（.jsonl）
+            scenarios: 每个试验评估的仿真场景（路口）数
+            train_steps: 每个试验的训练步数
+            eval_steps: 训练后贪婪评估的步数
+            workers: 进程数，0表示在主进程中运行，默认CPU核数
+            seed: 场景和试验的随机种子基数
+            metric: 结果表的排序指标（越小越好；throughput_per_hour 越大越好）
+        """
+        if controller_type not in TRIAL_RUNNERS:
+            raise ValueError(f"Unknown controller type: {controller_type}")
+        unknown = {name for params in trials for name in params} - set(TUNABLE_PARAMETERS[controller_type])
+        if unknown:
+            raise ValueError(f"Unknown parameters for {controller_type}: {sorted(unknown)}")
+
+        self.controller_type = controller_type
+        self.trials = trials
+        self.checkpoint_path = checkpoint_path
+        self.scenario_seeds = [seed * 1000 + i for i in range(scenarios)]
+        self.train_steps = train_steps
+        self.eval_steps = eval_steps
+        self.workers = os.cpu_count() if workers is None else workers
+        self.seed = seed
+        self.metric = metric
+
+    def load_checkpoint(self) -> Dict[int, Dict]:
+        """读取已完成的试验结果"""
+        results = {}
+        if not os.path.exists(self.checkpoint_path):
+            return results
+        with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    # 中断时写了一半的行
+                    continue
+                if row.get('controller') == self.controller_type and row.get('error') is None:
+                    results[row['trial_id']] = row
+        return results
+
+    def _tasks(self, done: Dict[int, Dict]) -> Iterator[Tuple]:
+        for trial_id, params in enumerate(self.trials):
+            if trial_id in done:
+                continue
+            yield (self.controller_type, trial_id, params, self.scenario_seeds,
+                   self.train_steps, self.eval_steps, self.seed * 100003 + trial_id)
+
+    def run(self) -> List[Dict]:
+        """
+        运行所有未完成的试验
+
+        Returns:
+            list: 全部试验结果（含检查点中已有的），按指标排序
+        """
+        # 检查点中的参数与当前试验不一致时视为未完成
+        done = {tid: row for tid, row in self.load_checkpoint().items()
+                if tid < len(self.trials) and row['params'] == self.trials[tid]}
+        tasks = list(self._tasks(done))
+        logger.info(f"Sweep: {len(done)} trials already completed, {len(tasks)} to run")
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.checkpoint_path)), exist_ok=True)
+        with open(self.checkpoint_path, 'a+', encoding='utf-8') as checkpoint:
+            # 中断时写了一半的行单独成行，不与新结果拼接
+            if checkpoint.tell() > 0:
+                checkpoint.seek(checkpoint.tell() - 1)
+                if checkpoint.read(1) != '\n':
+                    checkpoint.write('\n')
+            for row in self._execute(tasks):
+                checkpoint.write(json.dumps(row, separators=(',', ':')) + '\n')
+                checkpoint.flush()
+                if row['error'] is None:
+                    done[row['trial_id']] = row
+                    logger.info(f"Trial {row['trial_id']} {row['params']}: {self.metric}={row.get(self.metric)}")
+                else:
+                    logger.error(f"Trial {row['trial_id']} failed: {row['error']}")
+
+        return self.results(done)
+
+    def _execute(self, tasks: List[Tuple]) -> Iterator[Dict]:
+        if self.workers == 0 or len(tasks) <= 1:
+            for task in tasks:
+                yield _run_trial(task)
+            return
+        # DQN 试验会在工作进程中加载 TensorFlow，使用 spawn 启动
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(min(self.workers, len(tasks))) as pool:
+            yield from pool.imap_unordered(_run_trial, tasks)
+
+    def results(self, done: Optional[Dict[int, Dict]] = None) -> List[Dict]:
+        """结果表：每行一个试验，按指标从好到差排序"""
+        rows = list((done if done is not None else self.load_checkpoint()).values())
+        reverse = self.metric == 'throughput_per_hour'
+        return sorted(rows, key=lambda row: row.get(self.metric, float('inf')), reverse=reverse)
+
+    def write_table(self, filepath: str, rows: Optional[List[Dict]] = None) -> str:
+        """把结果表写成CSV（参数各占一列）"""
+        rows = self.results() if rows is None else rows
+        param_names = sorted({name for row in rows for name in row['params']})
+        metric_names = ['average_delay', 'throughput_per_hour', 'average_queue']
+        with open(filepath, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['rank', 'trial_id'] + param_names + metric_names + ['elapsed'])
+            for rank, row in enumerate(rows, 1):
+                writer.writerow([rank, row['trial_id']] + [row['params'].get(n) for n in param_names]
+                                + [row.get(n) for n in metric_names] + [round(row['elapsed'], 2)])
+        return filepath
@@ -0,0 +1,218 @@
+import numpy as np
+import logging
+from typing import Dict, List, Tuple, Any
+
+logger = logging.getLogger(__name__)
+
+# 导出文件格式版本
+POLICY_FORMAT_VERSION = 1
+
+_ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0, out=x),
+    'tanh': np.tanh,
+    'sigmoid': lambda x: 1.0 / (1.0 + np.exp(-x)),
+}
+
+
+def _extract_layers(q_network: Any) -> List[Tuple[str, np.ndarray, np.ndarray, str]]:
+    """
+    提取Keras Q网络中推理所需的层参数
+
+    Dropout 和 Input 层在推理时无作用，直接跳过。BatchNormalization 以
+    推理模式（移动均值/方差）折算为逐元素的缩放和偏移。
+
+    Returns:
+        list: 每层 (kind, w, b, activation)，kind 为 'dense' 或 'affine'
+    """
+    raw = []
+    for layer in q_network.layers:
+        layer_type = layer.__class__.__name__
+
+        if layer_type == 'Dense':
+            weights = layer.get_weights()
+            kernel = weights[0]
+            bias = weights[1] if layer.use_bias else np.zeros(kernel.shape[1], dtype=np.float32)
+            activation = getattr(layer.activation, '__name__', 'linear')
+            if activation not in _ACTIVATIONS:
+                raise ValueError(f"Unsupported activation for NumPy export: {activation}")
+            raw.append(('dense', kernel.astype(np.float32), bias.astype(np.float32), activation))
+
+        elif layer_type == 'BatchNormalization':
+            weights = layer.get_weights()
+            gamma = weights.pop(0) if layer.scale else None
+            beta = weights.pop(0) if layer.center else None
+            moving_mean, moving_var = weights
+            scale = 1.0 / np.sqrt(moving_var + layer.epsilon)
+            if gamma is not None:
+                scale = scale * gamma
+            shift = -moving_mean * scale
+            if beta is not None:
+                shift = shift + beta
+            raw.append(('affine', scale.astype(np.float32), shift.astype(np.float32), 'linear'))
+
+        elif layer_type in ('InputLayer', 'Dropout'):
+            continue
+        else:
+            raise ValueError(f"Unsupported layer for NumPy export: {layer_type}")
+
+    return raw
+
+
+def export_policy_weights(q_network: Any, filepath: str) -> str:
+    """
+    将Keras Q网络的 Dense/BatchNormalization 权重导出为紧凑的 .npz 文件
+
+    Args:
+        q_network: 已构建的 keras.Model
+        filepath: 输出文件路径
+
+    Returns:
+        str: 实际写入的文件路径
+    """
+    raw = _extract_layers(q_network)
+    arrays: Dict[str, np.ndarray] = {}
+    for i, (_, w, b, _) in enumerate(raw):
+        arrays[f'w_{i}'] = w
+        arrays[f'b_{i}'] = b
+
+    if not filepath.endswith('.npz'):
+        filepath += '.npz'
+    np.savez(
+        filepath,
+        format_version=np.array(POLICY_FORMAT_VERSION),
+        kinds=np.array([layer[0] for layer in raw]),
+        activations=np.array([layer[3] for layer in raw]),
+        **arrays
+    )
+    logger.info(f"Policy weights exported to {filepath}")
+    return filepath
+
+
+class NumpyPolicy:
+    """
+    纯NumPy实现的DQN前向推理引擎
+
+    仅依赖NumPy，适用于只做决策、不做训练的边缘节点。加载时将每个
+    BatchNormalization 的仿射变换折叠进其后的 Dense 层，推理只剩若干次
+    矩阵乘法和激活函数。
+    """
+
+    def __init__(self, layers: List[Tuple[np.ndarray, np.ndarray, str]], version: int = 0):
+        # 每层: (kernel, bias, activation)；权重只读，可在线程间安全共享
+        for kernel, bias, _ in layers:
+            kernel.setflags(write=False)
+            bias.setflags(write=False)
+        self.layers = layers
+        self.version = version
+        self.input_size = layers[0][0].shape[0]
+        self.output_size = layers[-1][0].shape[1]
+
+    @classmethod
+    def load(cls, filepath: str) -> 'NumpyPolicy':
+        """从 export_policy_weights 生成的文件加载策略"""
+        with np.load(filepath, allow_pickle=False) as data:
+            version = int(data['format_version'])
+            if version != POLICY_FORMAT_VERSION:
+                raise ValueError(f"Unsupported policy format version: {version}")
+            kinds = [str(k) for k in data['kinds']]
+            activations = [str(a) for a in data['activations']]
+            raw = [(kinds[i], data[f'w_{i}'], data[f'b_{i}'], activations[i]) for i in range(len(kinds))]
+        return cls(cls._fold_layers(raw))
+
+    @classmethod
+    def from_keras(cls, q_network: Any, version: int = 0) -> 'NumpyPolicy':
+        """直接从内存中的Keras模型生成权重快照"""
+        return cls(cls._fold_layers(_extract_layers(q_network)), version=version)
+
+    @staticmethod
+    def _fold_layers(raw: List[Tuple[str, np.ndarray, np.ndarray, str]]) -> List[Tuple[np.ndarray, np.ndarray, str]]:
+        """将仿射层折叠进下一个Dense层"""
+        layers = []
+        pending_scale = None
+        pending_shift = None
+
+        for kind, w, b, activation in raw:
+            if kind == 'affine':
+                # 连续的仿射层合并: y = (x*s1+t1)*s2+t2
+                if pending_scale is None:
+                    pending_scale, pending_shift = w.copy(), b.copy()
+                else:
+                    pending_shift = pending_shift * w + b
+                    pending_scale = pending_scale * w
+                continue
+
+            kernel, bias = w, b
+            if pending_scale is not None:
+                # W·(s*x + t) + b = (diag(s)·W)·x + (W·t + b)
+                bias = bias + pending_shift @ kernel
+                kernel = kernel * pending_scale[:, None]
+                pending_scale = pending_shift = None
+            layers.append((np.ascontiguousarray(kernel, dtype=np.float32),
+                           bias.astype(np.float32), activation))
+
+        if pending_scale is not None:
+            # 末尾的仿射层：以对角矩阵形式保留
+            layers.append((np.diag(pending_scale).astype(np.float32),
+                           pending_shift.astype(np.float32), 'linear'))
+
+        return layers
+
+    def predict_on_batch(self, states: np.ndarray) -> np.ndarray:
+        """批量计算Q值（与 keras.Model.predict_on_batch 接口一致）"""
+        x = np.asarray(states, dtype=np.float32)
+        if x.ndim == 1:
+            x = x.reshape(1, -1)
+        for kernel, bias, activation in self.layers:
+            x = x @ kernel
+            x += bias
+            x = _ACTIVATIONS[activation](x)
+        return x
+
+    def predict(self, state: np.ndarray) -> np.ndarray:
+        """计算单个状态的Q值"""
+        return self.predict_on_batch(state)[0]
+
+    def act(self, state: np.ndarray) -> int:
+        """贪婪动作选择"""
+        return int(np.argmax(self.predict(state)))
+
+    def parameter_bytes(self) -> int:
+        """权重占用的字节数"""
+        return sum(kernel.nbytes + bias.nbytes for kernel, bias, _ in self.layers)
+
+
+def load_policy(filepath: str):
+    """按文件内容加载浮点NumPy策略或int8量化策略"""
+    with np.load(filepath, allow_pickle=False) as data:
+        quantized = 'quantized' in data.files
+    if quantized:
+        from .quantized_policy import QuantizedPolicy
+        return QuantizedPolicy.load(filepath)
+    return NumpyPolicy.load(filepath)
+
+
+def compare_policies(reference: Any, candidate: Any, states: np.ndarray) -> Dict:
+    """
+    比较两个策略在同一批状态上的输出
+
+    Returns:
+        dict: argmax动作不一致率、Q值绝对误差（最大/平均，及平均误差相对参考Q值
+            平均幅度的比例）和参考策略选择的不同动作数
+    """
+    if len(states) == 0:
+        return {'samples': 0, 'action_mismatch_rate': 0.0, 'max_abs_q_error': 0.0,
+                'mean_abs_q_error': 0.0, 'relative_q_error': 0.0, 'distinct_actions': 0}
+    q_ref = np.asarray(reference.predict_on_batch(states))
+    q_cand = np.asarray(candidate.predict_on_batch(states))
+    actions = np.argmax(q_ref, axis=1)
+    error = np.abs(q_ref - q_cand)
+    return {
+        'samples': int(len(states)),
+        'action_mismatch_rate': float((actions != np.argmax(q_cand, axis=1)).mean()),
+        'max_abs_q_error': float(error.max()),
+        'mean_abs_q_error': float(error.mean()),
+        'relative_q_error': float(error.mean() / max(float(np.abs(q_ref).mean()), 1e-12)),
+        # 参考策略在这些状态上只选同一个动作时，不一致率说明不了精度
+        'distinct_actions': int(len(np.unique(actions)))
+    }
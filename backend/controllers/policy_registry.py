@@ -0,0 +1,129 @@
+import threading
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from .quantized_policy import QuantizedPolicy
+
+logger = logging.getLogger(__name__)
+
+
+class SharedPolicy:
+    """已加载的共享策略（只读权重），由多个路口的控制器共同引用"""
+
+    def __init__(self, name: str, version: Optional[str], q_network: Any = None,
+                 target_network: Any = None, numpy_policy: Any = None):
+        self.name = name
+        self.version = version
+        self.q_network = q_network
+        self.target_network = target_network
+        self.numpy_policy = numpy_policy
+        self.ref_count = 0
+
+    def parameter_bytes(self) -> int:
+        """策略权重占用的字节数"""
+        total = 0
+        if self.numpy_policy is not None:
+            total += self.numpy_policy.parameter_bytes()
+        if self.q_network is not None:
+            total += sum(np.asarray(w).nbytes for w in self.q_network.get_weights())
+        return total
+
+
+class PolicyRegistry:
+    """
+    按策略名称/版本管理共享策略的注册表
+
+    同一策略只加载一次，所有使用该策略的路口共享同一份只读权重；
+    每个路口自己的相位、经验回放和探索率仍保存在各自的控制器中。
+    """
+
+    def __init__(self):
+        self._policies: Dict[Tuple, SharedPolicy] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, version: Optional[str], model_path: str, inference_only: bool,
+             quantized: bool) -> Tuple:
+        return (name, version, model_path, inference_only, quantized)
+
+    def acquire(self, name: str, version: Optional[str], model_path: str, inference_only: bool,
+                loader: Callable[[], Tuple[Any, Any, Any]], quantized: bool = False) -> SharedPolicy:
+        """
+        获取共享策略，首次使用时调用 loader 加载
+
+        Args:
+            name: 策略名称
+            version: 策略版本，None表示未编号的默认版本
+            model_path: 模型目录
+            inference_only: 是否为纯NumPy推理策略
+            loader: 返回 (q_network, target_network, numpy_policy) 的加载函数
+            quantized: 是否为int8量化策略
+
+        Returns:
+            SharedPolicy: 共享策略（引用计数已加一）
+        """
+        key = self._key(name, version, model_path, inference_only, quantized)
+        with self._lock:
+            policy = self._policies.get(key)
+            if policy is None:
+                q_network, target_network, numpy_policy = loader()
+                policy = SharedPolicy(name, version, q_network, target_network, numpy_policy)
+                self._policies[key] = policy
+                logger.info(f"Policy {name} (version {version}) loaded into registry")
+            policy.ref_count += 1
+            return policy
+
+    def release(self, policy: SharedPolicy, model_path: str, inference_only: bool,
+                quantized: bool = False):
+        """释放一次引用，引用计数归零时卸载策略"""
+        key = self._key(policy.name, policy.version, model_path, inference_only, quantized)
+        with self._lock:
+            if self._policies.get(key) is not policy:
+                return
+            policy.ref_count -= 1
+            if policy.ref_count <= 0:
+                del self._policies[key]
+                logger.info(f"Policy {policy.name} (version {policy.version}) unloaded from registry")
+
+    @staticmethod
+    def _engine_name(policy: SharedPolicy) -> str:
+        if policy.numpy_policy is None:
+            return 'keras'
+        return 'litert_int8' if isinstance(policy.numpy_policy, QuantizedPolicy) else 'numpy'
+
+    def get_stats(self) -> Dict:
+        """注册表状态：已加载策略、引用数和权重大小"""
+        with self._lock:
+            policies = list(self._policies.values())
+        return {
+            'loaded_policies': len(policies),
+            'policies': [
+                {
+                    'name': policy.name,
+                    'version': policy.version,
+                    'ref_count': policy.ref_count,
+                    'engine': self._engine_name(policy),
+                    'parameter_bytes': policy.parameter_bytes()
+                }
+                for policy in policies
+            ]
+        }
+
+    def clear(self):
+        """卸载所有策略"""
+        with self._lock:
+            self._policies.clear()
+
+
+# 全局注册表实例
+policy_registry = None
+
+
+def get_policy_registry() -> PolicyRegistry:
+    """获取全局策略注册表"""
+    global policy_registry
+    if policy_registry is None:
+        policy_registry = PolicyRegistry()
+    return policy_registry
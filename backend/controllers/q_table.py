@@ -0,0 +1,157 @@
+import json
+import logging
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class DenseQTable:
+    """
+    稠密的Q表
+
+    状态和动作编码为整数下标，Q值存放在 (状态数, 动作数) 的 float64 数组中，
+    取最大值/最优动作都是对整行的向量化运算，可以同时处理一批状态。
+
+    为了与原来 defaultdict 实现的行为一致，未访问过的 (状态, 动作) 用 -inf
+    标记：最优动作只在访问过的动作中选择，整行都未访问时最大Q值按0处理。
+
+    每个状态的最优动作和最大Q值单独缓存，写入时增量维护，单状态查询只需
+    一次数组取值；因此Q值应通过 set / update_from_dict 写入，直接修改
+    values 后需调用 refresh()。
+    """
+
+    def __init__(self, states: List[str], actions: List[str]):
+        """
+        Args:
+            states: 状态名称列表，下标即状态编码
+            actions: 动作名称列表，下标即动作编码
+        """
+        self.states = list(states)
+        self.actions = list(actions)
+        self.state_index = {state: i for i, state in enumerate(self.states)}
+        self.action_index = {action: i for i, action in enumerate(self.actions)}
+        self.values = np.full((len(self.states), len(self.actions)), -np.inf, dtype=np.float64)
+        # 每个状态的最优动作（未访问为 -1）和最大Q值（未访问为 -inf）
+        self.best_action_cache = np.full(len(self.states), -1, dtype=np.int64)
+        self.best_value_cache = np.full(len(self.states), -np.inf, dtype=np.float64)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def __len__(self) -> int:
+        """访问过的状态数"""
+        return int(np.isfinite(self.values).any(axis=1).sum())
+
+    def __getitem__(self, state: Union[str, int]) -> Dict[str, float]:
+        """兼容字典访问：q_table[state] 返回该状态下已访问动作的Q值"""
+        s = self.state_index[state] if isinstance(state, str) else state
+        row = self.values[s]
+        return {self.actions[a]: float(row[a]) for a in np.flatnonzero(np.isfinite(row))}
+
+    def get(self, state: int, action: int) -> float:
+        """Q(s, a)，未访问时为0"""
+        value = self.values.item(state, action)
+        return value if value != -np.inf else 0.0
+
+    def set(self, state: int, action: int, value: float):
+        """写入 Q(s, a)，同时维护该状态的最优动作缓存"""
+        self.values[state, action] = value
+        best_action = self.best_action_cache.item(state)
+        best_value = self.best_value_cache.item(state)
+        if value > best_value or (value == best_value and action < best_action):
+            self.best_action_cache[state] = action
+            self.best_value_cache[state] = value
+        elif action == best_action:
+            # 原最优动作的Q值下降，重新在整行中选择
+            row = self.values[state]
+            best_action = int(row.argmax())
+            self.best_action_cache[state] = best_action
+            self.best_value_cache[state] = row.item(best_action)
+
+    def refresh(self, states: Optional[np.ndarray] = None):
+        """按Q值重新计算最优动作缓存，默认全部状态"""
+        if states is None:
+            states = np.arange(len(self.states))
+        rows = self.values[states]
+        actions = rows.argmax(axis=1)
+        values = rows[np.arange(len(states)), actions]
+        visited = np.isfinite(values)
+        self.best_action_cache[states] = np.where(visited, actions, -1)
+        self.best_value_cache[states] = values
+
+    def max_value(self, state: int) -> float:
+        """max_a Q(s, a)，状态未访问时为0"""
+        value = self.best_value_cache.item(state)
+        return value if value != -np.inf else 0.0
+
+    def max_values(self, states: np.ndarray) -> np.ndarray:
+        """批量 max_a Q(s, a)"""
+        values = self.best_value_cache[states]
+        return np.where(np.isfinite(values), values, 0.0)
+
+    def best_action(self, state: int) -> int:
+        """最优动作下标，状态未访问时返回 -1"""
+        return self.best_action_cache.item(state)
+
+    def best_actions(self, states: np.ndarray) -> np.ndarray:
+        """批量最优动作下标，未访问的状态为 -1"""
+        return self.best_action_cache[states]
+
+    def load_values(self, values: np.ndarray):
+        """替换整张Q值数组（例如读入的快照）并重建最优动作缓存"""
+        if values.shape != self.values.shape:
+            raise ValueError(f"Q-table shape {values.shape} does not match {self.values.shape}")
+        self.values = values
+        self.refresh()
+
+    def clear(self):
+        """清空Q表"""
+        self.values.fill(-np.inf)
+        self.best_action_cache.fill(-1)
+        self.best_value_cache.fill(-np.inf)
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        """转换为原JSON格式 {状态: {动作: Q值}}"""
+        result = {}
+        for s in np.flatnonzero(np.isfinite(self.values).any(axis=1)):
+            result[self.states[s]] = self[int(s)]
+        return result
+
+    def update_from_dict(self, data: Dict[str, Dict[str, float]]) -> int:
+        """
+        从原JSON格式读入Q值
+
+        Returns:
+            int: 读入的Q值个数（不在状态/动作空间内的条目会被跳过）
+        """
+        loaded = 0
+        skipped = 0
+        for state, actions in data.items():
+            s = self.state_index.get(state)
+            if s is None:
+                skipped += len(actions) or 1
+                continue
+            for action, value in actions.items():
+                a = self.action_index.get(action)
+                if a is None:
+                    skipped += 1
+                    continue
+                self.values[s, a] = float(value)
+                loaded += 1
+        self.refresh()
+        if skipped:
+            logger.warning(f"跳过了 {skipped} 个不在状态/动作空间内的Q表条目")
+        return loaded
+
+    def load_json(self, filepath: str) -> int:
+        """从JSON文件读入Q值"""
+        with open(filepath, 'r') as f:
+            return self.update_from_dict(json.load(f))
+
+    def save_json(self, filepath: str, indent: Optional[int] = 2):
+        """以原JSON格式保存"""
+        with open(filepath, 'w') as f:
+            json.dump(self.to_dict(), f, indent=indent)
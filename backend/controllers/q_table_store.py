@@ -0,0 +1,267 @@
+import os
+import struct
+import tempfile
+import threading
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .q_table import DenseQTable
+
+logger = logging.getLogger(__name__)
+
+# 快照文件头: 魔数(8) + 格式版本(4) + 行数(4) + 列数(4) + 保留(4) + 序号(8)，补齐到64字节
+SNAPSHOT_MAGIC = b'TLQTABLE'
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct('<8sIIIIQ')
+SNAPSHOT_HEADER_SIZE = 64
+
+# 更新日志记录: 序号, 状态下标, 动作下标, Q值
+LOG_RECORD_DTYPE = np.dtype([('seq', '<u8'), ('state', '<i4'), ('action', '<i4'), ('value', '<f8')])
+
+
+class QTableStore:
+    """
+    Q表的二进制增量持久化
+
+    - 快照: 64字节文件头 + Q值数组的原始 float64 数据，先写临时文件再 rename，
+      写入过程中崩溃不会留下损坏的快照；启动时一次读入整个数组
+    - 更新日志: 两次快照之间的每次Q值写入追加为定长二进制记录，保存的开销
+      与变更数成正比，而不是与整张表成正比
+
+    控制线程只把更新追加到内存队列；日志追加和快照都由所有Q表共享的后台
+    写入线程（QTableWriter）完成。
+    每条更新带有递增序号，快照记录写入时的序号，加载时只重放序号更大的日志，
+    因此在快照 rename 之后、日志截断之前崩溃也不会重复应用更新。
+    """
+
+    def __init__(self, directory: str, name: str, flush_interval: float = 1.0,
+                 snapshot_every: int = 1000):
+        """
+        Args:
+            directory: 存储目录
+            name: 文件名主干，生成 <name>.qtb（快照）和 <name>.qlog（更新日志）
+            flush_interval: 后台线程把更新追加到日志的间隔（秒）
+            snapshot_every: 距上次快照的更新数达到该值时自动写快照
+        """
+        self.snapshot_path = os.path.join(directory, f'{name}.qtb')
+        self.log_path = os.path.join(directory, f'{name}.qlog')
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+
+        self._table: Optional[DenseQTable] = None
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[int, int, int, float]] = []
+        self._seq = 0
+        self._snapshot_seq = 0
+        self._snapshot_requested = False
+        # 保证同一张表的日志追加和快照不会被写入线程和 close 同时执行
+        self._write_lock = threading.Lock()
+        self._writer: Optional['QTableWriter'] = None
+
+        self.stats = {
+            'records_logged': 0,
+            'log_flushes': 0,
+            'snapshots': 0,
+            'last_snapshot_time': None
+        }
+
+    def exists(self) -> bool:
+        """是否已有二进制快照或日志"""
+        return os.path.exists(self.snapshot_path) or os.path.exists(self.log_path)
+
+    def load(self, table: DenseQTable) -> bool:
+        """
+        加载快照并重放日志
+
+        Returns:
+            bool: 是否读到了已有数据
+        """
+        loaded = False
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'rb') as f:
+                magic, version, rows, cols, _, seq = SNAPSHOT_HEADER.unpack(f.read(SNAPSHOT_HEADER.size))
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_FORMAT_VERSION:
+                raise ValueError(f"Unsupported Q-table snapshot: {self.snapshot_path}")
+            if (rows, cols) != table.shape:
+                raise ValueError(f"Q-table snapshot shape {(rows, cols)} does not match {table.shape}")
+            # 读入普通数组，不保留对快照文件的映射：之后的快照要 rename 覆盖该文件，
+            # 在Windows上被映射或打开的文件不能被替换
+            values = np.fromfile(self.snapshot_path, dtype='<f8', count=rows * cols,
+                                 offset=SNAPSHOT_HEADER_SIZE)
+            if values.size != rows * cols:
+                raise ValueError(f"Truncated Q-table snapshot: {self.snapshot_path}")
+            table.load_values(values.reshape(rows, cols))
+            self._snapshot_seq = self._seq = seq
+            loaded = True
+
+        if os.path.exists(self.log_path):
+            size = os.path.getsize(self.log_path)
+            count = size // LOG_RECORD_DTYPE.itemsize
+            if size % LOG_RECORD_DTYPE.itemsize:
+                # 末尾不完整的记录（写入时崩溃）丢弃，保证之后追加的记录对齐
+                with open(self.log_path, 'r+b') as f:
+                    f.truncate(count * LOG_RECORD_DTYPE.itemsize)
+            if count:
+                records = np.fromfile(self.log_path, dtype=LOG_RECORD_DTYPE, count=count)
+                records = records[records['seq'] > self._snapshot_seq]
+                if len(records):
+                    # 同一位置多次写入时以最后一次为准
+                    flat = records['state'].astype(np.int64) * table.shape[1] + records['action']
+                    _, last = np.unique(flat[::-1], return_index=True)
+                    latest = records[len(records) - 1 - last]
+                    table.values[latest['state'], latest['action']] = latest['value']
+                    table.refresh(np.unique(latest['state']))
+                    self._seq = int(records['seq'].max())
+                    loaded = True
+
+        self._table = table
+        return loaded
+
+    def attach(self, table: DenseQTable):
+        """关联要持久化的Q表（未调用 load 时使用）"""
+        self._table = table
+
+    def start(self):
+        """注册到共享的后台写入线程"""
+        if self._writer is not None:
+            return
+        self._writer = get_q_table_writer()
+        self._writer.register(self)
+
+    def record(self, state: int, action: int, value: float):
+        """记录一次Q值写入（O(1)，只追加到内存队列）"""
+        with self._lock:
+            self._seq += 1
+            self._pending.append((self._seq, state, action, value))
+            if self._seq - self._snapshot_seq >= self.snapshot_every:
+                self._snapshot_requested = True
+                if self._writer is not None:
+                    self._writer.wakeup()
+
+    def request_snapshot(self):
+        """请求后台线程尽快写一次快照（不阻塞）"""
+        self._snapshot_requested = True
+        if self._writer is not None:
+            self._writer.wakeup()
+
+    def close(self):
+        """从后台写入线程注销，写出剩余日志和最终快照"""
+        if self._writer is not None:
+            self._writer.unregister(self)
+            self._writer = None
+        self._write(snapshot=True)
+
+    def _write(self, snapshot: bool):
+        """追加日志，需要时写快照"""
+        if self._table is None:
+            return
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                if snapshot:
+                    self._snapshot_requested = False
+                    values = self._table.values.copy()
+                    seq = self._seq
+
+            if pending:
+                self._append_log(pending)
+            if snapshot and (seq != self._snapshot_seq or not os.path.exists(self.snapshot_path)):
+                self._write_snapshot(values, seq)
+
+    def _append_log(self, pending: List[Tuple[int, int, int, float]]):
+        """把一批更新追加到日志"""
+        records = np.array(pending, dtype=LOG_RECORD_DTYPE)
+        with open(self.log_path, 'ab') as f:
+            f.write(records.tobytes())
+            f.flush()
+        self.stats['records_logged'] += len(records)
+        self.stats['log_flushes'] += 1
+
+    def _write_snapshot(self, values: np.ndarray, seq: int):
+        """原子地写快照（临时文件 + fsync + rename），然后截断已被快照覆盖的日志"""
+        directory = os.path.dirname(self.snapshot_path) or '.'
+        rows, cols = values.shape
+        header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION, rows, cols, 0, seq)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(header.ljust(SNAPSHOT_HEADER_SIZE, b'\0'))
+                f.write(np.ascontiguousarray(values, dtype='<f8').tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        # 日志中的记录都已包含在快照里（序号 <= seq），可以截断
+        if os.path.exists(self.log_path):
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(0)
+        self._snapshot_seq = seq
+        self.stats['snapshots'] += 1
+        self.stats['last_snapshot_time'] = os.path.getmtime(self.snapshot_path)
+
+
+class QTableWriter:
+    """
+    所有 QTableStore 共享的后台写入线程
+
+    每个路口一个写入线程时，线程数随路口数增长；这里由一个线程按
+    flush_interval 轮询已注册的Q表，追加日志并写出请求的快照。
+    """
+
+    def __init__(self, flush_interval: float = 1.0):
+        self.flush_interval = flush_interval
+        self._stores: List[QTableStore] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, store: QTableStore):
+        """注册Q表，必要时启动写入线程"""
+        with self._lock:
+            if store not in self._stores:
+                self._stores.append(store)
+            self.flush_interval = min(self.flush_interval, store.flush_interval)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def unregister(self, store: QTableStore):
+        """注销Q表（正在进行的写入由 QTableStore 自己的锁等待完成）"""
+        with self._lock:
+            if store in self._stores:
+                self._stores.remove(store)
+
+    def wakeup(self):
+        """唤醒写入线程（有快照请求时不必等到下一个间隔）"""
+        self._wakeup.set()
+
+    def _run(self):
+        """后台写入循环"""
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            with self._lock:
+                stores = list(self._stores)
+            for store in stores:
+                try:
+                    store._write(snapshot=store._snapshot_requested)
+                except Exception as e:
+                    logger.error(f"Q表持久化失败 ({store.snapshot_path}): {e}")
+
+
+# 全局写入线程实例
+q_table_writer = None
+
+
+def get_q_table_writer() -> QTableWriter:
+    """获取全局Q表写入线程"""
+    global q_table_writer
+    if q_table_writer is None:
+        q_table_writer = QTableWriter()
+    return q_table_writer
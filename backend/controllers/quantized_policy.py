@@ -0,0 +1,213 @@
+import threading
+import logging
+import warnings
+
+from typing import List, Tuple
+
+import numpy as np
+
+from .numpy_policy import NumpyPolicy, POLICY_FORMAT_VERSION
+
+logger = logging.getLogger(__name__)
+
+
+def _interpreter_class():
+    """
+    获取 LiteRT/TFLite 解释器类
+
+    边缘节点只需安装轻量的 ai-edge-litert（或旧版 tflite-runtime），
+    都不可用时才退回完整 TensorFlow 中的 tf.lite.Interpreter。
+    """
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        import tensorflow as tf
+    except ImportError:
+        raise ImportError(
+            "int8 policy inference requires LiteRT. Please install it with: pip install ai-edge-litert"
+        )
+    return tf.lite.Interpreter
+
+
+class QuantizedPolicy:
+    """
+    训练后int8量化的DQN推理引擎
+
+    NumPy没有int8矩阵乘法内核，因此量化后的网络转换为全整数的LiteRT（TFLite）
+    模型：Dense层权重按输出通道、激活按张量量化为int8，由LiteRT的int8
+    FULLY_CONNECTED内核（XNNPACK/ruy）计算，内存中只保留int8权重和int32偏置。
+
+    状态中车流量、等待时间、相位one-hot和时间的取值范围相差很大，单一的
+    输入缩放系数会丢掉小范围特征的精度。输入先按特征除以校准得到的最大值
+    归一化，该缩放同时折算进第一层权重；转换前再做跨层均衡（见
+    _equalize_layers）。激活按张量量化，Q值的绝对误差约为校准数据Q值
+    幅度的千分之几：Q值远小于校准范围的状态（例如车辆很少的路口）相对
+    误差较大，但各动作的误差相近，动作选择基本不受影响。
+
+    LiteRT解释器不是线程安全的，推理在锁内进行；批大小变化时重新分配张量。
+    """
+
+    def __init__(self, model_content: bytes, input_scale: np.ndarray, version: int = 0):
+        """
+        Args:
+            model_content: int8 LiteRT 模型
+            input_scale: 按特征的输入归一化系数（状态乘以该系数后送入模型）
+            version: 权重版本
+        """
+        self.model_content = bytes(model_content)
+        self.input_scale = np.asarray(input_scale, dtype=np.float32)
+        self.input_scale.setflags(write=False)
+        self.version = version
+
+        interpreter_class = _interpreter_class()
+        with warnings.catch_warnings():
+            # tf.lite.Interpreter 会提示迁移到 ai_edge_litert
+            warnings.simplefilter('ignore')
+            self._interpreter = interpreter_class(model_content=self.model_content, num_threads=1)
+        self._interpreter.allocate_tensors()
+        input_details = self._interpreter.get_input_details()[0]
+        output_details = self._interpreter.get_output_details()[0]
+        self._input_index = input_details['index']
+        self._output_index = output_details['index']
+        self._batch_size = int(input_details['shape'][0])
+        self._lock = threading.Lock()
+
+        self.input_size = int(input_details['shape'][1])
+        self.output_size = int(output_details['shape'][1])
+
+    @staticmethod
+    def _equalize_layers(layers: List[Tuple[np.ndarray, np.ndarray, str]]
+                         ) -> List[Tuple[np.ndarray, np.ndarray, str]]:
+        """
+        跨层均衡：在浮点下对网络做等价变换，使其适合按输出通道的int8权重量化
+
+        折叠BatchNormalization后，下一层个别输入行的权重远大于同列其他权重，
+        按输出通道量化时其余权重只剩几个量化级。ReLU/线性激活满足
+        f(x/s)·s = f(x)，因此可以把每个通道的缩放在前一层的输出列和后一层的
+        输入行之间平衡（两者的最大绝对值相等）。
+        """
+        equalized = [[kernel.astype(np.float64), bias.astype(np.float64), activation]
+                     for kernel, bias, activation in layers]
+        for current, following in zip(equalized[:-1], equalized[1:]):
+            if current[2] not in ('relu', 'linear'):
+                continue
+            out_range = np.abs(current[0]).max(axis=0)
+            in_range = np.abs(following[0]).max(axis=1)
+            valid = (out_range > 0) & (in_range > 0)
+            scale = np.ones_like(out_range)
+            scale[valid] = np.sqrt(out_range[valid] / in_range[valid])
+            current[0] /= scale
+            current[1] /= scale
+            following[0] *= scale[:, None]
+        return [(kernel.astype(np.float32), bias.astype(np.float32), activation)
+                for kernel, bias, activation in equalized]
+
+    @classmethod
+    def quantize(cls, policy: NumpyPolicy, calibration_states: np.ndarray,
+                 batch_size: int = 32) -> 'QuantizedPolicy':
+        """
+        用校准数据对浮点策略做训练后量化（需要TensorFlow）
+
+        Args:
+            policy: 浮点NumPy策略
+            calibration_states: 校准状态 (n, state_size)，决定输入归一化系数和各层激活的量化范围，
+                超出校准范围的激活会被截断
+            batch_size: 校准时每批送入转换器的状态数
+        """
+        import tensorflow as tf
+
+        x = np.asarray(calibration_states, dtype=np.float32)
+        if len(x) == 0:
+            raise ValueError("Calibration states are required for quantization")
+        feature_max = np.maximum(np.abs(x).max(axis=0), 1e-6).astype(np.float32)
+        normalized = x / feature_max
+
+        # z = x / m  =>  x·W = z·(diag(m)·W)
+        layers = [(kernel * feature_max[:, None], bias, activation) if i == 0 else (kernel, bias, activation)
+                  for i, (kernel, bias, activation) in enumerate(policy.layers)]
+        activations = {
+            'linear': tf.identity, 'relu': tf.nn.relu, 'tanh': tf.tanh, 'sigmoid': tf.sigmoid
+        }
+        for _, _, activation in layers:
+            if activation not in activations:
+                raise ValueError(f"Unsupported activation for int8 quantization: {activation}")
+        graph_layers = [(tf.constant(kernel), tf.constant(bias), activations[activation])
+                        for kernel, bias, activation in cls._equalize_layers(layers)]
+
+        @tf.function(input_signature=[tf.TensorSpec([None, policy.input_size], tf.float32)])
+        def forward(z):
+            for kernel, bias, activation in graph_layers:
+                z = activation(tf.matmul(z, kernel) + bias)
+            return z
+
+        def representative_dataset():
+            for start in range(0, len(normalized), batch_size):
+                yield [normalized[start:start + batch_size]]
+
+        converter = tf.lite.TFLiteConverter.from_concrete_functions([forward.get_concrete_function()], forward)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        model_content = converter.convert()
+        return cls(model_content, 1.0 / feature_max, version=policy.version)
+
+    def predict_on_batch(self, states: np.ndarray) -> np.ndarray:
+        """批量计算Q值（与 keras.Model.predict_on_batch 接口一致）"""
+        x = np.asarray(states, dtype=np.float32)
+        if x.ndim == 1:
+            x = x.reshape(1, -1)
+        if len(x) == 0:
+            return np.zeros((0, self.output_size), dtype=np.float32)
+        x = x * self.input_scale
+        with self._lock:
+            if len(x) != self._batch_size:
+                self._interpreter.resize_tensor_input(self._input_index, x.shape)
+                self._interpreter.allocate_tensors()
+                self._batch_size = len(x)
+            self._interpreter.set_tensor(self._input_index, x)
+            self._interpreter.invoke()
+            return self._interpreter.get_tensor(self._output_index)
+
+    def predict(self, state: np.ndarray) -> np.ndarray:
+        """计算单个状态的Q值"""
+        return self.predict_on_batch(state)[0]
+
+    def act(self, state: np.ndarray) -> int:
+        """贪婪动作选择"""
+        return int(np.argmax(self.predict(state)))
+
+    def parameter_bytes(self) -> int:
+        """模型（int8权重、int32偏置和量化参数）占用的字节数"""
+        return len(self.model_content) + self.input_scale.nbytes
+
+    def save(self, filepath: str) -> str:
+        """保存量化策略"""
+        if not filepath.endswith('.npz'):
+            filepath += '.npz'
+        np.savez(
+            filepath,
+            format_version=np.array(POLICY_FORMAT_VERSION),
+            quantized=np.array(True),
+            model=np.frombuffer(self.model_content, dtype=np.uint8),
+            input_scale=self.input_scale
+        )
+        logger.info(f"Quantized policy saved to {filepath}")
+        return filepath
+
+    @classmethod
+    def load(cls, filepath: str) -> 'QuantizedPolicy':
+        """加载量化策略"""
+        with np.load(filepath, allow_pickle=False) as data:
+            version = int(data['format_version'])
+            if version != POLICY_FORMAT_VERSION or 'model' not in data.files:
+                raise ValueError(f"Unsupported quantized policy format in {filepath}, please re-run quantize_policy")
+            return cls(data['model'].tobytes(), data['input_scale'])
+
@@ -0,0 +1,285 @@
+import numpy as np
+import os
+import logging
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayBuffer:
+    """
+    基于预分配连续数组的经验回放环形缓冲区
+
+    states/actions/rewards/next_states/dones 各自存放在一块连续数组中，
+    插入为O(1)，采样通过整数索引一次性取出整批数据。
+    指定 filepath 时数组以内存映射文件（.npy）存放在该目录下，
+    经验可在进程重启后保留，也可被离线训练进程以只读方式直接映射读取。
+    """
+
+    FIELDS = ('states', 'actions', 'rewards', 'next_states', 'dones')
+
+    def __init__(self, capacity: int, state_size: int, filepath: Optional[str] = None,
+                 readonly: bool = False):
+        """
+        Args:
+            capacity: 最大经验条数
+            state_size: 状态向量维度
+            filepath: 内存映射存储目录；为None时使用普通内存数组
+            readonly: 以只读方式映射已有的存储目录（供离线训练进程使用）
+        """
+        self.capacity = capacity
+        self.state_size = state_size
+        self.filepath = filepath
+        self.readonly = readonly
+
+        shapes = {
+            'states': ((capacity, state_size), np.float32),
+            'actions': ((capacity,), np.int64),
+            'rewards': ((capacity,), np.float32),
+            'next_states': ((capacity, state_size), np.float32),
+            'dones': ((capacity,), np.bool_),
+        }
+
+        if filepath is None:
+            arrays = {name: np.zeros(shape, dtype=dtype) for name, (shape, dtype) in shapes.items()}
+            # meta: [写入位置, 当前条数]
+            self._meta = np.zeros(2, dtype=np.int64)
+        else:
+            arrays, self._meta = self._open_mapped(filepath, shapes, readonly)
+
+        self.states = arrays['states']
+        self.actions = arrays['actions']
+        self.rewards = arrays['rewards']
+        self.next_states = arrays['next_states']
+        self.dones = arrays['dones']
+
+    @staticmethod
+    def _open_mapped(filepath: str, shapes: dict, readonly: bool):
+        """打开或创建内存映射数组"""
+        os.makedirs(filepath, exist_ok=True)
+        meta_file = os.path.join(filepath, 'meta.npy')
+        existing = os.path.exists(meta_file)
+        mode = 'r' if readonly else 'r+'
+
+        arrays = {}
+        if existing:
+            for name, (shape, dtype) in shapes.items():
+                array = np.load(os.path.join(filepath, f'{name}.npy'), mmap_mode=mode)
+                if array.shape != shape or array.dtype != dtype:
+                    raise ValueError(
+                        f"Replay file {name}.npy has shape {array.shape}/{array.dtype}, expected {shape}/{np.dtype(dtype)}"
+                    )
+                arrays[name] = array
+            meta = np.load(meta_file, mmap_mode=mode)
+            logger.info(f"Replay buffer mapped from {filepath} ({int(meta[1])} transitions)")
+        else:
+            if readonly:
+                raise FileNotFoundError(f"Replay buffer not found: {filepath}")
+            for name, (shape, dtype) in shapes.items():
+                arrays[name] = np.lib.format.open_memmap(
+                    os.path.join(filepath, f'{name}.npy'), mode='w+', dtype=dtype, shape=shape
+                )
+            meta = np.lib.format.open_memmap(meta_file, mode='w+', dtype=np.int64, shape=(2,))
+            logger.info(f"Replay buffer created at {filepath}")
+
+        return arrays, meta
+
+    def __len__(self) -> int:
+        return int(self._meta[1])
+
+    @property
+    def position(self) -> int:
+        """下一次写入位置"""
+        return int(self._meta[0])
+
+    def add(self, state: np.ndarray, action: int, reward: float,
+            next_state: np.ndarray, done: bool):
+        """写入一条经验，缓冲区满时覆盖最旧的记录"""
+        i = int(self._meta[0])
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        self._meta[0] = (i + 1) % self.capacity
+        if self._meta[1] < self.capacity:
+            self._meta[1] += 1
+
+    def add_batch(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+                  next_states: np.ndarray, dones: np.ndarray) -> np.ndarray:
+        """
+        批量写入经验（一次切片赋值，必要时环绕）
+
+        Returns:
+            np.ndarray: 写入位置的索引
+        """
+        n = len(actions)
+        if n > self.capacity:
+            # 只保留最新的 capacity 条
+            states, actions, rewards = states[-self.capacity:], actions[-self.capacity:], rewards[-self.capacity:]
+            next_states, dones = next_states[-self.capacity:], dones[-self.capacity:]
+            n = self.capacity
+        indices = (int(self._meta[0]) + np.arange(n)) % self.capacity
+        self.states[indices] = states
+        self.actions[indices] = actions
+        self.rewards[indices] = rewards
+        self.next_states[indices] = next_states
+        self.dones[indices] = dones
+        self._meta[0] = (int(self._meta[0]) + n) % self.capacity
+        self._meta[1] = min(self.capacity, int(self._meta[1]) + n)
+        return indices
+
+    def sample_indices(self, batch_size: int) -> np.ndarray:
+        """均匀随机采样索引（有放回）"""
+        return np.random.randint(0, len(self), size=batch_size)
+
+    def get(self, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """按索引批量取出经验"""
+        return (
+            self.states[indices],
+            self.actions[indices],
+            self.rewards[indices],
+            self.next_states[indices],
+            self.dones[indices],
+        )
+
+    def sample(self, batch_size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """均匀随机采样一批经验"""
+        return self.get(self.sample_indices(batch_size))
+
+    def flush(self):
+        """将内存映射数据刷写到磁盘"""
+        if self.filepath is None or self.readonly:
+            return
+        for name in self.FIELDS:
+            getattr(self, name).flush()
+        self._meta.flush()
+
+    def clear(self):
+        """清空缓冲区（不释放预分配内存）"""
+        self._meta[:] = 0
+
+
+class SumTree:
+    """
+    基于数组的求和树
+
+    叶子存放每条经验的优先级，内部节点存放子树优先级之和。
+    单点更新为O(log n)，批量更新与按比例批量采样均按层向量化。
+    """
+
+    def __init__(self, capacity: int):
+        # 叶子数取2的幂，根节点下标为1，叶子 i 位于 leaf_offset + i
+        self.leaf_offset = 1 << max(0, int(np.ceil(np.log2(max(capacity, 1)))))
+        self.capacity = capacity
+        self.depth = int(np.log2(self.leaf_offset))
+        self.tree = np.zeros(2 * self.leaf_offset, dtype=np.float64)
+
+    @property
+    def total(self) -> float:
+        """所有优先级之和"""
+        return float(self.tree[1])
+
+    def update(self, indices: np.ndarray, priorities: np.ndarray):
+        """批量设置叶子优先级并自底向上更新父节点"""
+        nodes = np.asarray(indices, dtype=np.int64) + self.leaf_offset
+        self.tree[nodes] = priorities
+        for _ in range(self.depth):
+            # 重复的父节点由相同的子节点求和，重复赋值结果一致，无需去重
+            nodes = nodes >> 1
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def get(self, indices: np.ndarray) -> np.ndarray:
+        """读取叶子优先级"""
+        return self.tree[np.asarray(indices, dtype=np.int64) + self.leaf_offset]
+
+    def find(self, values: np.ndarray) -> np.ndarray:
+        """按累积和批量定位叶子（values 取值于 [0, total)）"""
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(values.shape[0], dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            left_sum = self.tree[left]
+            go_right = values >= left_sum
+            values -= left_sum * go_right
+            nodes = left + go_right
+        return nodes - self.leaf_offset
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+    优先经验回放缓冲区（Prioritized Experience Replay）
+
+    按 p_i^alpha 比例分层采样，返回用于修正采样偏差的重要性采样权重，
+    学习步骤结束后用新的TD误差更新优先级。
+    """
+
+    def __init__(self, capacity: int, state_size: int, filepath: Optional[str] = None,
+                 readonly: bool = False, alpha: float = 0.6, beta: float = 0.4,
+                 beta_increment: float = 0.001, priority_epsilon: float = 1e-3):
+        """
+        Args:
+            alpha: 优先级指数（0为均匀采样）
+            beta: 重要性采样修正指数初始值，逐步增加到1
+            beta_increment: 每次采样后beta的增量
+            priority_epsilon: 加到TD误差上的小常数，避免优先级为0
+        """
+        super().__init__(capacity, state_size, filepath=filepath, readonly=readonly)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.priority_epsilon = priority_epsilon
+        self.tree = SumTree(capacity)
+        self.max_priority = 1.0
+
+        # 映射文件中已有的经验以最大优先级重新加入
+        if len(self) > 0:
+            self.tree.update(np.arange(len(self)), np.full(len(self), self.max_priority))
+
+    def add(self, state: np.ndarray, action: int, reward: float,
+            next_state: np.ndarray, done: bool):
+        """写入经验，新经验使用当前最大优先级以保证至少被采样一次"""
+        i = self.position
+        super().add(state, action, reward, next_state, done)
+        self.tree.update(np.array([i]), np.array([self.max_priority]))
+
+    def add_batch(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+                  next_states: np.ndarray, dones: np.ndarray) -> np.ndarray:
+        """批量写入经验，均使用当前最大优先级"""
+        indices = super().add_batch(states, actions, rewards, next_states, dones)
+        self.tree.update(indices, np.full(len(indices), self.max_priority))
+        return indices
+
+    def sample_indices(self, batch_size: int) -> np.ndarray:
+        """按优先级比例分层采样索引"""
+        segment = self.tree.total / batch_size
+        values = (np.arange(batch_size) + np.random.random(batch_size)) * segment
+        indices = self.tree.find(values)
+        # 浮点误差可能落到空叶子上，截断到有效范围
+        return np.minimum(indices, len(self) - 1)
+
+    def sample_with_weights(self, batch_size: int):
+        """
+        采样一批经验及其重要性采样权重
+
+        Returns:
+            tuple: (states, actions, rewards, next_states, dones, indices, weights)
+        """
+        indices = self.sample_indices(batch_size)
+        probabilities = self.tree.get(indices) / self.tree.total
+        weights = (len(self) * probabilities) ** (-self.beta)
+        weights = (weights / weights.max()).astype(np.float32)
+        self.beta = min(1.0, self.beta + self.beta_increment)
+        return self.get(indices) + (indices, weights)
+
+    def update_priorities(self, indices: np.ndarray, td_errors: np.ndarray):
+        """根据TD误差更新优先级"""
+        priorities = (np.abs(td_errors) + self.priority_epsilon) ** self.alpha
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(indices, priorities)
+
+    def clear(self):
+        """清空缓冲区和优先级"""
+        super().clear()
+        self.tree.tree[:] = 0.0
+        self.max_priority = 1.0
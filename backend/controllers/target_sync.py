@@ -0,0 +1,83 @@
+import logging
+from typing import Any, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TargetNetworkSync:
+    """
+    Q网络到目标网络的原地权重同步
+
+    get_weights()/set_weights() 每次都会把全部权重拷贝成一组新的NumPy数组再写回。
+    这里在构建时一次性配对两个网络的变量，同步时在TensorFlow计算图内直接对
+    目标网络的变量执行 assign / assign_sub，不经过NumPy，也不在Python侧分配
+    新的数组：
+    - 硬同步: θ' ← θ
+    - Polyak软更新: θ' ← θ' - τ·(θ' - θ) = (1-τ)·θ' + τ·θ
+    """
+
+    def __init__(self, online_network: Any, target_network: Any):
+        """
+        Args:
+            online_network: Q网络
+            target_network: 结构相同、权重独立的目标网络
+        """
+        import tensorflow as tf
+
+        self._pairs = self._pair_variables(online_network, target_network, tf)
+        # τ 存放在预分配的变量中，修改 τ 不需要重新追踪计算图
+        self._tau = tf.Variable(0.0, dtype=tf.float32, trainable=False)
+
+        pairs = self._pairs
+        tau = self._tau
+
+        @tf.function
+        def hard_sync():
+            for target, online in pairs:
+                target.assign(online)
+
+        @tf.function
+        def soft_sync():
+            for target, online in pairs:
+                target.assign_sub(tf.cast(tau, target.dtype) * (target - online))
+
+        self._hard_sync = hard_sync
+        self._soft_sync = soft_sync
+
+    @staticmethod
+    def _unwrap(variable: Any, tf: Any) -> Any:
+        """
+        返回可在计算图内 assign 的 tf.Variable
+
+        tf.keras 的权重本身就是 tf.Variable（其 value 是方法，不能解包）；
+        Keras 3 的变量包装了 tf.Variable，通过 value 属性取得。
+        """
+        if isinstance(variable, tf.Variable):
+            return variable
+        return variable.value
+
+    @staticmethod
+    def _pair_variables(online_network: Any, target_network: Any, tf: Any) -> List[Tuple[Any, Any]]:
+        """按顺序配对两个网络的全部变量（含BatchNorm滑动统计）"""
+        online_weights = online_network.weights
+        target_weights = target_network.weights
+        if len(online_weights) != len(target_weights):
+            raise ValueError("Online and target networks have different architectures")
+
+        pairs = []
+        for online, target in zip(online_weights, target_weights):
+            if tuple(online.shape) != tuple(target.shape):
+                raise ValueError(f"Variable shape mismatch: {online.shape} vs {target.shape}")
+            if online is target:
+                raise ValueError("Target network shares variables with the online network")
+            pairs.append((TargetNetworkSync._unwrap(target, tf), TargetNetworkSync._unwrap(online, tf)))
+        return pairs
+
+    def hard_update(self):
+        """把Q网络权重完整复制到目标网络"""
+        self._hard_sync()
+
+    def soft_update(self, tau: float):
+        """Polyak软更新"""
+        self._tau.assign(tau)
+        self._soft_sync()
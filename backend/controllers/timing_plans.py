@@ -0,0 +1,547 @@
+import time
+import threading
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 1440
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+# 1970-01-01 是星期四，Unix纪元起的第0天对应一周中的第3天（星期一为0）
+EPOCH_WEEKDAY = 3
+
+# 信号状态编码
+STATE_GREEN = 0
+STATE_YELLOW = 1
+STATE_ALL_RED = 2
+STATE_FLASH = 3
+STATE_NAMES = ('green', 'yellow', 'all_red', 'flash')
+
+DAY_GROUPS = {
+    'daily': range(7),
+    'weekday': range(5),
+    'weekend': (5, 6),
+    'mon': (0,), 'tue': (1,), 'wed': (2,), 'thu': (3,), 'fri': (4,), 'sat': (5,), 'sun': (6,)
+}
+
+
+class TimingPlan:
+    """
+    定时配时方案
+
+    每个相位的时长（split）包含绿灯、黄灯和全红时间，周期长度为各相位
+    时长之和。周期以统一的参考时刻（Unix纪元）加相位差 offset 对齐，
+    同一时刻各路口的周期位置是确定的，便于干线协调。
+    """
+
+    def __init__(self, name: str, splits: Sequence[float], yellow: Union[float, Sequence[float]] = 3,
+                 all_red: Union[float, Sequence[float]] = 2, offset: float = 0, flash: bool = False):
+        """
+        Args:
+            name: 方案名称
+            splits: 各相位时长（秒，取整），按相位顺序
+            yellow: 黄灯时间（秒），可按相位分别给出
+            all_red: 全红时间（秒），可按相位分别给出
+            offset: 相位差（秒），周期起点相对参考时刻的偏移
+            flash: 是否为夜间黄闪方案（不运行周期）
+        """
+        self.name = name
+        self.flash = flash
+        self.offset = float(offset)
+        if flash:
+            self.splits = np.zeros(0, dtype=np.int64)
+            self.yellow = np.zeros(0, dtype=np.int64)
+            self.all_red = np.zeros(0, dtype=np.int64)
+            return
+
+        self.splits = np.rint(np.asarray(splits, dtype=np.float64)).astype(np.int64)
+        count = len(self.splits)
+        self.yellow = np.rint(np.broadcast_to(np.asarray(yellow, dtype=np.float64), (count,))).astype(np.int64)
+        self.all_red = np.rint(np.broadcast_to(np.asarray(all_red, dtype=np.float64), (count,))).astype(np.int64)
+        if count == 0:
+            raise ValueError(f"Timing plan {name} has no phases")
+        if np.any(self.splits <= self.yellow + self.all_red):
+            raise ValueError(f"Timing plan {name}: every split must be longer than yellow + all red")
+
+    @property
+    def cycle_length(self) -> int:
+        """周期长度（秒），黄闪方案为0"""
+        return int(self.splits.sum())
+
+    @property
+    def num_phases(self) -> int:
+        return len(self.splits)
+
+    def phase_start_times(self) -> np.ndarray:
+        """各相位在周期内的起始时刻（秒，不含相位差）"""
+        return np.concatenate([[0], np.cumsum(self.splits)[:-1]]) if self.num_phases else self.splits
+
+    def to_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'splits': self.splits.tolist(),
+            'yellow': self.yellow.tolist(),
+            'all_red': self.all_red.tolist(),
+            'offset': self.offset,
+            'flash': self.flash,
+            'cycle_length': self.cycle_length
+        }
+
+
+def _parse_days(days: Union[str, int, Iterable]) -> List[int]:
+    """'weekday' / 'weekend' / 'daily' / 'mon'... 或星期序号（星期一为0）"""
+    if isinstance(days, str):
+        if days not in DAY_GROUPS:
+            raise ValueError(f"Unknown day group: {days}")
+        return list(DAY_GROUPS[days])
+    if isinstance(days, int):
+        return [days]
+    result = []
+    for day in days:
+        result.extend(_parse_days(day))
+    return result
+
+
+def _parse_time(value: Union[str, int, Tuple[int, int]]) -> int:
+    """'HH:MM'、(时, 分) 或当天的分钟数 -> 当天的分钟数"""
+    if isinstance(value, str):
+        hour, minute = value.split(':')
+        value = (int(hour), int(minute))
+    if isinstance(value, tuple):
+        value = value[0] * 60 + value[1]
+    if not 0 <= value < MINUTES_PER_DAY:
+        raise ValueError(f"Invalid time of day: {value}")
+    return int(value)
+
+
+# 专用方案的查询键为 路口行号 × OVERRIDE_KEY_STRIDE + 方案名称编号（时段表中方案编号为 int16）
+OVERRIDE_KEY_STRIDE = 1 << 16
+
+
+class _PlanTable:
+    """
+    按槽位存放的方案查询表
+
+    每个槽位保存一个方案的周期、相位差、各相位结束时刻和逐秒相位表。槽位只追加
+    写入：替换方案时写入新槽位，已发布的查询表引用的槽位不会被修改；容量或
+    宽度不足时重新分配数组，旧数组仍由已发布的查询表持有。
+    """
+
+    def __init__(self, capacity: int = 16, max_phases: int = 1, max_cycle: int = 1):
+        self.size = 0
+        self.names: List[str] = []
+        self.flash = np.zeros(0, dtype=np.bool_)
+        self.cycle = np.ones(0, dtype=np.float64)
+        self.offset = np.zeros(0, dtype=np.float64)
+        self.phase_end = np.zeros((0, 0), dtype=np.float64)
+        self.yellow_end = np.zeros((0, 0), dtype=np.float64)
+        self.green_end = np.zeros((0, 0), dtype=np.float64)
+        self.phase_at = np.zeros((0, 0), dtype=np.int16)
+        self._allocate(capacity, max_phases, max_cycle)
+
+    def _allocate(self, capacity: int, max_phases: int, max_cycle: int):
+        """重新分配数组并复制已有槽位"""
+        size = self.size
+        flash = np.zeros(capacity, dtype=np.bool_)
+        cycle = np.ones(capacity, dtype=np.float64)
+        offset = np.zeros(capacity, dtype=np.float64)
+        phase_end = np.full((capacity, max_phases), np.inf)
+        yellow_end = np.full((capacity, max_phases), np.inf)
+        green_end = np.full((capacity, max_phases), np.inf)
+        phase_at = np.zeros((capacity, max_cycle), dtype=np.int16)
+        if size:
+            phases, width = self.phase_end.shape[1], self.phase_at.shape[1]
+            flash[:size] = self.flash[:size]
+            cycle[:size] = self.cycle[:size]
+            offset[:size] = self.offset[:size]
+            phase_end[:size, :phases] = self.phase_end[:size]
+            yellow_end[:size, :phases] = self.yellow_end[:size]
+            green_end[:size, :phases] = self.green_end[:size]
+            phase_at[:size, :width] = self.phase_at[:size]
+        self.flash, self.cycle, self.offset = flash, cycle, offset
+        self.phase_end, self.yellow_end, self.green_end = phase_end, yellow_end, green_end
+        self.phase_at = phase_at
+
+    def append(self, plan: TimingPlan) -> int:
+        """写入一个方案，返回槽位编号"""
+        capacity, max_phases = self.phase_end.shape
+        max_cycle = self.phase_at.shape[1]
+        if self.size >= capacity or plan.num_phases > max_phases or plan.cycle_length > max_cycle:
+            self._allocate(max(capacity, 1) * (2 if self.size >= capacity else 1),
+                           max(max_phases, plan.num_phases), max(max_cycle, plan.cycle_length))
+
+        slot = self.size
+        self.names.append(plan.name)
+        self.flash[slot] = plan.flash
+        # 黄闪方案的周期记为1，避免取模为0
+        self.cycle[slot] = max(plan.cycle_length, 1)
+        self.offset[slot] = plan.offset
+        # 各相位绿灯/黄灯/相位的结束时刻（不存在的相位结束时刻为无穷大）
+        phase_end = np.cumsum(plan.splits)
+        count = plan.num_phases
+        self.phase_end[slot, :count] = phase_end
+        self.yellow_end[slot, :count] = phase_end - plan.all_red
+        self.green_end[slot, :count] = phase_end - plan.all_red - plan.yellow
+        # 每一秒所处的相位：已结束的相位数
+        seconds = np.arange(self.phase_at.shape[1])
+        self.phase_at[slot] = np.minimum(np.searchsorted(phase_end, seconds, side='right'),
+                                         max(count - 1, 0))
+        self.size += 1
+        return slot
+
+    def nbytes(self) -> int:
+        return int(self.flash.nbytes + self.cycle.nbytes + self.offset.nbytes + self.phase_end.nbytes
+                   + self.yellow_end.nbytes + self.green_end.nbytes + self.phase_at.nbytes)
+
+
+class _CompiledPlans:
+    """发布给查询方的只读快照，整体替换发布"""
+
+    def __init__(self, intersection_ids: List[str], rows: Dict[str, int], schedule_index: np.ndarray,
+                 schedule_table: np.ndarray, key_names: List[str], key_slots: np.ndarray,
+                 override_keys: np.ndarray, override_slots: np.ndarray, table: _PlanTable):
+        self.intersection_ids = intersection_ids
+        self.rows = rows
+        self.schedule_index = schedule_index
+        self.schedule_table = schedule_table
+        # 方案名称编号 -> 全局方案槽位；(路口, 方案名称编号) 的专用方案为有序稀疏表
+        self.key_names = key_names
+        self.key_slots = key_slots
+        self.override_keys = override_keys
+        self.override_slots = override_slots
+
+        self.plan_names = table.names
+        self.flash = table.flash
+        self.cycle = table.cycle
+        self.offset = table.offset
+        self.phase_end = table.phase_end
+        self.yellow_end = table.yellow_end
+        self.green_end = table.green_end
+        self.phase_at = table.phase_at
+
+
+class TimingPlanEngine:
+    """
+    多路口分时段配时方案引擎
+
+    每个路口按一周的时段表选择配时方案（工作日早晚高峰、平峰、夜间黄闪等）。
+    时段表预先展开为按分钟索引的一周数组（相同的时段表只保存一份），
+    各方案预先展开为按秒索引的周期相位表，因此任意时刻的生效方案、当前
+    相位和剩余时间都只需几次数组下标访问；对全部路口的查询是一次向量化
+    计算。
+
+    时段表按方案名称引用方案；单个路口可以用 override_plan 把某个名称
+    替换为自己的专用方案（例如按本路口流量优化的配时），时段表本身不变。
+    专用方案以稀疏表保存，修改方案、专用方案或已有路口的时段表只增量更新
+    受影响的部分；只有增删路口时才在下一次查询前整体重新编译。
+    """
+
+    def __init__(self, utc_offset: Optional[float] = None):
+        """
+        Args:
+            utc_offset: 本地时间相对UTC的偏移（秒），用于确定时段；默认取系统时区
+        """
+        self.utc_offset = time.localtime().tm_gmtoff if utc_offset is None else utc_offset
+        self._plans: List[TimingPlan] = []
+        self._plan_ids: Dict[str, int] = {}
+        # 路口 -> 时段表编号；相同的一周数组只保存一份
+        self._schedules: Dict[str, int] = {}
+        self._weeks: List[np.ndarray] = []
+        self._week_ids: Dict[bytes, int] = {}
+        self._overrides: Dict[Tuple[str, int], TimingPlan] = {}
+        self._lock = threading.Lock()
+
+        # 编译状态（_compiled 为 None 时下一次查询整体重新编译）
+        self._compiled: Optional[_CompiledPlans] = None
+        self._table: Optional[_PlanTable] = None
+        self._schedule_table = np.zeros((0, MINUTES_PER_WEEK), dtype=np.int16)
+        self._schedule_index = np.zeros(0, dtype=np.int64)
+        self._key_slots = np.zeros(0, dtype=np.int64)
+        self._override_keys = np.zeros(0, dtype=np.int64)
+        self._override_slots = np.zeros(0, dtype=np.int64)
+
+    def has_plan(self, name: str) -> bool:
+        return name in self._plan_ids
+
+    def add_plan(self, plan: TimingPlan) -> int:
+        """注册（或按名称替换）配时方案，返回方案编号"""
+        with self._lock:
+            plan_id = self._plan_ids.get(plan.name)
+            if plan_id is None:
+                plan_id = len(self._plans)
+                self._plans.append(plan)
+                self._plan_ids[plan.name] = plan_id
+            else:
+                self._plans[plan_id] = plan
+            if self._compiled is not None:
+                slot = self._table.append(plan)
+                key_slots = self._key_slots.copy() if plan_id < len(self._key_slots) \
+                    else np.append(self._key_slots, 0)
+                key_slots[plan_id] = slot
+                self._key_slots = key_slots
+                self._publish()
+        return plan_id
+
+    def get_plan(self, name: str, intersection_id: Optional[str] = None) -> TimingPlan:
+        """按名称获取方案，给出路口时优先返回该路口的专用方案"""
+        plan_id = self._plan_ids[name]
+        if intersection_id is not None:
+            override = self._overrides.get((intersection_id, plan_id))
+            if override is not None:
+                return override
+        return self._plans[plan_id]
+
+    def override_plan(self, intersection_id: str, name: str, plan: Optional[TimingPlan]):
+        """为单个路口替换名为 name 的方案，plan 为 None 时恢复使用全局方案"""
+        self.override_plans([intersection_id], name, [plan])
+
+    def override_plans(self, intersection_ids: Sequence[str], name: str,
+                       plans: Sequence[Optional[TimingPlan]]):
+        """批量为多个路口替换名为 name 的方案"""
+        plan_id = self._plan_ids[name]
+        with self._lock:
+            changes: Dict[int, int] = {}
+            for intersection_id, plan in zip(intersection_ids, plans):
+                if plan is None:
+                    self._overrides.pop((intersection_id, plan_id), None)
+                else:
+                    self._overrides[(intersection_id, plan_id)] = plan
+                row = self._compiled.rows.get(intersection_id) if self._compiled is not None else None
+                if row is not None:
+                    changes[row * OVERRIDE_KEY_STRIDE + plan_id] = \
+                        -1 if plan is None else self._table.append(plan)
+            if changes:
+                self._apply_override_changes(changes)
+
+    def _apply_override_changes(self, changes: Dict[int, int]):
+        """把 {查询键: 槽位（-1表示删除）} 合并进有序的专用方案表并发布"""
+        keep = ~np.isin(self._override_keys, np.fromiter(changes, dtype=np.int64, count=len(changes)))
+        added = [(key, slot) for key, slot in changes.items() if slot >= 0]
+        keys = np.concatenate([self._override_keys[keep],
+                               np.array([key for key, _ in added], dtype=np.int64)])
+        slots = np.concatenate([self._override_slots[keep],
+                                np.array([slot for _, slot in added], dtype=np.int64)])
+        order = np.argsort(keys, kind='stable')
+        self._override_keys = keys[order]
+        self._override_slots = slots[order]
+        self._publish()
+
+    def has_schedule(self, intersection_id: str) -> bool:
+        return intersection_id in self._schedules
+
+    def set_schedule(self, intersection_id: str, entries: Sequence[Tuple]):
+        """
+        设置路口的一周时段表
+
+        Args:
+            intersection_id: 路口ID
+            entries: [(日期, 开始时间, 方案名称), ...]。日期为 'daily' / 'weekday' /
+                'weekend' / 'mon'... 或星期序号；开始时间为 'HH:MM'。每个时段持续到
+                下一个时段开始（跨天、跨周循环）
+        """
+        events = []
+        for days, start, plan_name in entries:
+            if plan_name not in self._plan_ids:
+                raise KeyError(f"Unknown timing plan: {plan_name}")
+            minute = _parse_time(start)
+            for day in _parse_days(days):
+                events.append((day * MINUTES_PER_DAY + minute, self._plan_ids[plan_name]))
+        if not events:
+            raise ValueError(f"Empty schedule for intersection {intersection_id}")
+
+        # 同一时刻的多个条目以后给出的为准
+        starts = {}
+        for minute, plan_id in events:
+            starts[minute] = plan_id
+        event_minutes = np.array(sorted(starts), dtype=np.int64)
+        event_plans = np.array([starts[m] for m in event_minutes], dtype=np.int16)
+
+        # 每分钟取最近一个已开始的时段；周初第一个时段之前沿用上周最后一个时段
+        slot = np.searchsorted(event_minutes, np.arange(MINUTES_PER_WEEK), side='right') - 1
+        week = event_plans[slot]
+
+        with self._lock:
+            week_id = self._week_ids.get(week.tobytes())
+            if week_id is None:
+                week_id = len(self._weeks)
+                self._weeks.append(week)
+                self._week_ids[week.tobytes()] = week_id
+            is_new = intersection_id not in self._schedules
+            self._schedules[intersection_id] = week_id
+            if is_new:
+                # 路口增加，下一次查询时重新编译
+                self._compiled = None
+            elif self._compiled is not None:
+                if week_id >= len(self._schedule_table):
+                    self._schedule_table = np.vstack([self._schedule_table, week[None, :]])
+                schedule_index = self._schedule_index.copy()
+                schedule_index[self._compiled.rows[intersection_id]] = week_id
+                self._schedule_index = schedule_index
+                self._publish()
+
+    def set_plan(self, intersection_id: str, plan_name: str):
+        """路口全周使用同一个方案"""
+        self.set_schedule(intersection_id, [('daily', '00:00', plan_name)])
+
+    def remove_intersection(self, intersection_id: str):
+        with self._lock:
+            if self._schedules.pop(intersection_id, None) is not None:
+                self._overrides = {key: plan for key, plan in self._overrides.items()
+                                   if key[0] != intersection_id}
+                self._compiled = None
+
+    def _publish(self):
+        """发布新的只读快照；废弃槽位过多时改为下一次查询前整体重新编译"""
+        live = len(self._key_slots) + len(self._override_keys)
+        if self._table.size > 2 * live + 64:
+            self._compiled = None
+            return
+        compiled = self._compiled
+        self._compiled = _CompiledPlans(
+            compiled.intersection_ids, compiled.rows, self._schedule_index, self._schedule_table,
+            list(self._plan_ids), self._key_slots, self._override_keys, self._override_slots, self._table
+        )
+
+    def _rebuild(self):
+        """整体重新编译：压缩时段表和方案槽位"""
+        intersection_ids = list(self._schedules)
+        rows = {intersection_id: i for i, intersection_id in enumerate(intersection_ids)}
+
+        # 只保留仍被使用的时段表
+        used = sorted(set(self._schedules.values()))
+        remap = {old: new for new, old in enumerate(used)}
+        self._weeks = [self._weeks[old] for old in used]
+        self._week_ids = {week.tobytes(): i for i, week in enumerate(self._weeks)}
+        self._schedules = {intersection_id: remap[week_id] for intersection_id, week_id in self._schedules.items()}
+        self._schedule_index = np.array([self._schedules[i] for i in intersection_ids], dtype=np.int64)
+        self._schedule_table = np.stack(self._weeks) if self._weeks \
+            else np.zeros((1, MINUTES_PER_WEEK), dtype=np.int16)
+
+        overrides = [(rows[intersection_id] * OVERRIDE_KEY_STRIDE + plan_id, plan)
+                     for (intersection_id, plan_id), plan in self._overrides.items()
+                     if intersection_id in rows]
+        overrides.sort(key=lambda item: item[0])
+        all_plans = self._plans + [plan for _, plan in overrides]
+        self._table = _PlanTable(
+            capacity=max(2 * len(all_plans), 16),
+            max_phases=max([plan.num_phases for plan in all_plans] + [1]),
+            max_cycle=max([plan.cycle_length for plan in all_plans] + [1])
+        )
+        self._key_slots = np.array([self._table.append(plan) for plan in self._plans], dtype=np.int64)
+        self._override_keys = np.array([key for key, _ in overrides], dtype=np.int64)
+        self._override_slots = np.array([self._table.append(plan) for _, plan in overrides], dtype=np.int64)
+
+        self._compiled = _CompiledPlans(
+            intersection_ids, rows, self._schedule_index, self._schedule_table, list(self._plan_ids),
+            self._key_slots, self._override_keys, self._override_slots, self._table
+        )
+        logger.info(f"Timing plans compiled: {len(intersection_ids)} intersections, "
+                    f"{len(self._weeks)} distinct schedules, {len(self._plans)} plans, "
+                    f"{len(overrides)} overrides")
+
+    def _get_compiled(self) -> _CompiledPlans:
+        compiled = self._compiled
+        if compiled is not None:
+            return compiled
+        with self._lock:
+            if self._compiled is None:
+                self._rebuild()
+            return self._compiled
+
+    def _minute_of_week(self, timestamp):
+        minutes = np.floor_divide(np.asarray(timestamp, dtype=np.float64) + self.utc_offset, 60).astype(np.int64)
+        return (minutes + EPOCH_WEEKDAY * MINUTES_PER_DAY) % MINUTES_PER_WEEK
+
+    def _evaluate_rows(self, compiled: _CompiledPlans, rows, timestamp) -> Dict[str, np.ndarray]:
+        keys = compiled.schedule_table[compiled.schedule_index[rows], self._minute_of_week(timestamp)]
+        plans = compiled.key_slots[keys]
+        if len(compiled.override_keys):
+            lookup = np.asarray(rows, dtype=np.int64) * OVERRIDE_KEY_STRIDE + keys
+            index = np.minimum(np.searchsorted(compiled.override_keys, lookup), len(compiled.override_keys) - 1)
+            plans = np.where(compiled.override_keys[index] == lookup, compiled.override_slots[index], plans)
+        flash = compiled.flash[plans]
+
+        position = np.mod(np.asarray(timestamp, dtype=np.float64) - compiled.offset[plans], compiled.cycle[plans])
+        phase = compiled.phase_at[plans, position.astype(np.int64)].astype(np.int64)
+        green_end = compiled.green_end[plans, phase]
+        yellow_end = compiled.yellow_end[plans, phase]
+        phase_end = compiled.phase_end[plans, phase]
+
+        state = np.where(position < green_end, STATE_GREEN,
+                         np.where(position < yellow_end, STATE_YELLOW, STATE_ALL_RED))
+        return {
+            'plan': plans,
+            'plan_key': keys.astype(np.int64),
+            'phase': np.where(flash, -1, phase),
+            'state': np.where(flash, STATE_FLASH, state),
+            'remaining_time': np.where(flash, 0.0, phase_end - position),
+            'cycle_position': np.where(flash, 0.0, position)
+        }
+
+    def evaluate(self, timestamp: Optional[float] = None,
+                 intersection_ids: Optional[Sequence[str]] = None) -> Dict:
+        """
+        向量化计算各路口此刻的信号状态
+
+        Args:
+            timestamp: Unix时间戳，默认当前时间
+            intersection_ids: 路口ID列表，默认全部已设置时段表的路口
+
+        Returns:
+            dict: intersection_ids 以及与之对齐的数组 plan（方案行）、plan_key（时段表
+                中的方案名称编号）、phase（相位，黄闪为-1）、state（STATE_* 编码）、
+                remaining_time（当前相位剩余秒数）、cycle_position（周期内位置）；
+                plan_names / key_names 为编号到名称的映射
+        """
+        compiled = self._get_compiled()
+        timestamp = time.time() if timestamp is None else timestamp
+        if intersection_ids is None:
+            intersection_ids = compiled.intersection_ids
+            rows = np.arange(len(intersection_ids))
+        else:
+            rows = np.array([compiled.rows[i] for i in intersection_ids], dtype=np.int64)
+        result = self._evaluate_rows(compiled, rows, timestamp)
+        result['intersection_ids'] = list(intersection_ids)
+        result['plan_names'] = compiled.plan_names
+        result['key_names'] = compiled.key_names
+        return result
+
+    def status(self, intersection_id: str, timestamp: Optional[float] = None) -> Dict:
+        """单个路口此刻的方案、相位、信号状态和剩余时间"""
+        compiled = self._get_compiled()
+        timestamp = time.time() if timestamp is None else timestamp
+        result = self._evaluate_rows(compiled, compiled.rows[intersection_id], timestamp)
+        return {
+            'plan': compiled.plan_names[int(result['plan'])],
+            'plan_key': compiled.key_names[int(result['plan_key'])],
+            'phase': int(result['phase']),
+            'state': STATE_NAMES[int(result['state'])],
+            'remaining_time': float(result['remaining_time']),
+            'cycle_position': float(result['cycle_position'])
+        }
+
+    def get_stats(self) -> Dict:
+        compiled = self._get_compiled()
+        return {
+            'plans': len(compiled.key_names),
+            'overrides': len(compiled.override_keys),
+            'intersections': len(compiled.intersection_ids),
+            'distinct_schedules': int(compiled.schedule_table.shape[0]) if compiled.intersection_ids else 0,
+            'table_bytes': int(compiled.schedule_table.nbytes + compiled.schedule_index.nbytes
+                               + compiled.override_keys.nbytes + compiled.override_slots.nbytes
+                               + self._table.nbytes())
+        }
+
+
+# 全局配时方案引擎实例
+timing_plan_engine = None
+
+
+def get_timing_plan_engine() -> TimingPlanEngine:
+    """获取全局配时方案引擎"""
+    global timing_plan_engine
+    if timing_plan_engine is None:
+        timing_plan_engine = TimingPlanEngine()
+    return timing_plan_engine
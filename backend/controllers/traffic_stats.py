@@ -0,0 +1,115 @@
+import numpy as np
+from typing import Dict, Iterable, Optional
+
+
+class RollingTrafficStats:
+    """
+    路口交通统计的定长环形缓冲
+
+    每次记录保存各车道的车流量和等待时间，存放在预分配的 (capacity, num_lanes)
+    数组中；对每个统计窗口维护滑动和，新记录写入时加上新行、减去移出窗口的
+    旧行，更新和查询都是 O(1)，不随历史长度增长，也不分配新数组。
+    """
+
+    def __init__(self, num_lanes: int, capacity: int = 100, windows: Iterable[int] = (20,),
+                 resync_interval: Optional[int] = None):
+        """
+        Args:
+            num_lanes: 车道数
+            capacity: 保留的最近记录条数
+            windows: 维护滑动和的窗口大小（条），不超过 capacity
+            resync_interval: 每隔多少次写入按窗口重新精确求和，消除浮点累积误差，
+                默认等于 capacity
+        """
+        self.windows = tuple(sorted(set(int(w) for w in windows)))
+        if not self.windows or self.windows[0] <= 0 or self.windows[-1] > capacity:
+            raise ValueError(f"Windows must be within 1..{capacity}")
+        self.capacity = capacity
+        self.num_lanes = num_lanes
+        self.resync_interval = resync_interval or capacity
+
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.phases = np.zeros(capacity, dtype=np.int64)
+        self.counts = np.zeros((capacity, num_lanes), dtype=np.float64)
+        self.waits = np.zeros((capacity, num_lanes), dtype=np.float64)
+
+        # 每个窗口的滑动和 (len(windows), num_lanes)
+        self._count_sums = np.zeros((len(self.windows), num_lanes), dtype=np.float64)
+        self._wait_sums = np.zeros((len(self.windows), num_lanes), dtype=np.float64)
+        self._window_index = {w: i for i, w in enumerate(self.windows)}
+        self.total = 0
+
+    def __len__(self) -> int:
+        return min(self.total, self.capacity)
+
+    def add(self, timestamp: float, phase: int, counts: np.ndarray, waits: np.ndarray):
+        """
+        写入一条记录
+
+        Args:
+            timestamp: 时间戳
+            phase: 当前相位
+            counts: 各车道车流量 (num_lanes,)
+            waits: 各车道等待时间 (num_lanes,)
+        """
+        # 先减去移出窗口的旧行（窗口等于容量时，旧行正是即将被覆盖的位置）
+        for i, window in enumerate(self.windows):
+            if self.total >= window:
+                expired = (self.total - window) % self.capacity
+                self._count_sums[i] -= self.counts[expired]
+                self._wait_sums[i] -= self.waits[expired]
+
+        position = self.total % self.capacity
+        self.timestamps[position] = timestamp
+        self.phases[position] = phase
+        self.counts[position] = counts
+        self.waits[position] = waits
+        self.total += 1
+
+        self._count_sums += self.counts[position]
+        self._wait_sums += self.waits[position]
+
+        if self.total % self.resync_interval == 0:
+            self._resync()
+
+    def _resync(self):
+        """按窗口重新精确求和"""
+        for i, window in enumerate(self.windows):
+            indices = self._recent_indices(window)
+            self._count_sums[i] = self.counts[indices].sum(axis=0)
+            self._wait_sums[i] = self.waits[indices].sum(axis=0)
+
+    def _recent_indices(self, window: int) -> np.ndarray:
+        """最近 window 条记录在环形数组中的下标（按时间顺序）"""
+        count = min(window, len(self))
+        return np.arange(self.total - count, self.total) % self.capacity
+
+    def window_size(self, window: int) -> int:
+        """窗口内实际的记录条数"""
+        return min(window, self.total)
+
+    def window_sums(self, window: int):
+        """
+        窗口内各车道车流量和等待时间的和（只读视图，不复制）
+
+        Returns:
+            tuple: (counts_sum, waits_sum)，形状均为 (num_lanes,)
+        """
+        i = self._window_index[window]
+        return self._count_sums[i], self._wait_sums[i]
+
+    def window_summary(self, window: int) -> Dict:
+        """窗口统计：总车流量、平均每条记录的总等待时间"""
+        n = self.window_size(window)
+        counts_sum, waits_sum = self.window_sums(window)
+        return {
+            'samples': n,
+            'total_vehicles': float(counts_sum.sum()),
+            'average_waiting_time': float(waits_sum.sum() / n) if n else 0.0
+        }
+
+    def clear(self):
+        """清空统计"""
+        self._count_sums[:] = 0.0
+        self._wait_sums[:] = 0.0
+        self.total = 0
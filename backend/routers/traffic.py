@@ -123,10 +123,13 @@ async def get_sensor_status():
 async def calculate_optimal_timing(traffic_status: IntersectionStatus):
     """计算最优信号灯配时"""
     try:
-        timing_plan = TrafficService.calculate_optimal_timing(traffic_status)
+        result = TrafficService.calculate_optimal_timing(traffic_status)
         return {
-            "timing_plan": timing_plan,
-            "total_vehicles": sum(lane.vehicle_count for lane in traffic_status.lanes)
+            "timing_plan": result['timing_plan'],
+            "total_vehicles": sum(lane.vehicle_count for lane in traffic_status.lanes),
+            "cycle_length": result['cycle_length'],
+            "critical_ratio": result['critical_ratio'],
+            "average_delay": result['average_delay']
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"计算最优配时失败: {str(e)}")
@@ -11,6 +11,23 @@ test_scripts = [
     'test_signals.py',
     'test_password_fix.py',
     'test_drl_import.py',
+    'test_batch_adaptive_control.py',
+    'test_drl_controller.py',
+    'test_timing_plans.py',
+    'test_drl_offline_training.py',
+    'test_signal_timing.py',
+    'test_green_wave.py',
+    'test_sensor_fusion.py',
+    'test_q_table_store.py',
+    'test_hyperparameter_sweep.py',
+    'test_control_history.py',
+    'test_numpy_policy.py',
+    'test_replay_buffer.py',
+    'test_quantized_policy.py',
+    'test_traffic_stats.py',
+    'test_latency_budget.py',
+    'test_dense_q_table.py',
+    'test_act_observe.py',
 ]
 
 backend_dir = os.path.dirname(os.path.abspath(__file__))
@@ -1,5 +1,6 @@
 ﻿import numpy as np
 import time
+import threading
 from typing import List, Dict, Tuple
 from collections import defaultdict
 import logging
@@ -10,8 +11,27 @@ from filterpy.common import Q_discrete_white_noise
 logger = logging.getLogger(__name__)
 
 class SensorFusion:
-    def __init__(self, intersection_id: str):
+    # 融合触发方式
+    FUSION_MODES = ('immediate', 'deferred', 'coalesced')
+    
+    def __init__(self, intersection_id: str, fusion_mode: str = 'immediate',
+                 max_fusion_rate: float = 10.0, resync_interval: int = 1000):
+        """
+        Args:
+            intersection_id: 路口ID
+            fusion_mode: 融合触发方式
+                'immediate' 每次传感器更新后立即融合；
+                'deferred' 更新只标记数据已变化，由 fuse() 或 get_fused_data() 触发融合；
+                'coalesced' 更新后由合并定时器触发融合，两次融合至少间隔 1/max_fusion_rate 秒
+            max_fusion_rate: 'coalesced' 模式下每秒最多融合次数
+            resync_interval: 每隔多少次融合按全部车道重新精确计算整体状态的累计量，
+                消除浮点累积误差
+        """
+        if fusion_mode not in self.FUSION_MODES:
+            raise ValueError(f"未知的融合方式: {fusion_mode}")
         self.intersection_id = intersection_id
+        self.fusion_mode = fusion_mode
+        self.max_fusion_rate = max_fusion_rate
         
         # 传感器数据缓存
         self.camera_data = {}
@@ -25,10 +45,39 @@ class SensorFusion:
             'overall_status': {}
         }
         
+        # 车道配置与 传感器 -> 受影响车道 的映射
+        self.lane_config = self._get_lane_configuration()
+        sensor_lanes = defaultdict(list)
+        for lane_id, lane_info in self.lane_config.items():
+            for sensor_id in lane_info['sensors']:
+                sensor_lanes[sensor_id].append(lane_id)
+        self.sensor_lanes = dict(sensor_lanes)
+        
+        # 需要重新融合的车道（首次融合覆盖全部车道）
+        self._dirty_lanes = set(self.lane_config)
+        
+        # 整体状态的累计量：车辆总数、占有率之和、有速度车道的速度之和与车道数
+        self._totals = {'vehicles': 0, 'occupancy': 0.0, 'speed_sum': 0.0, 'speed_lanes': 0}
+        self.resync_interval = resync_interval
+        
         # 卡尔曼滤波器用于跟踪
         self.trackers = {}  # lane_id -> {vehicle_id: kalman_filter}
         self.next_vehicle_id = 0
         
+        # 融合调度：等待融合的更新数、合并定时器和统计
+        self._lock = threading.RLock()
+        self._pending_updates = 0
+        self._fusion_timer = None
+        self._last_fusion = 0.0
+        self.fusion_stats = {
+            'updates': 0,
+            'fusions': 0,
+            'saved_fusions': 0,
+            'lane_fusions': 0,
+            'lanes_skipped': 0,
+            'fusion_time_total': 0.0
+        }
+        
         # 融合参数
         self.max_association_distance = 10.0  # 最大关联距离（米）
         self.confidence_weights = {
@@ -39,32 +88,109 @@ class SensorFusion:
     
     def update_sensor_data(self, sensor_type: str, sensor_id: str, data: Dict):
         """更新传感器数据"""
-        if sensor_type == 'camera':
-            self.camera_data[sensor_id] = data
-        elif sensor_type == 'radar':
-            self.radar_data[sensor_id] = data
-        elif sensor_type == 'magnetic':
-            self.magnetic_data[sensor_id] = data
+        with self._lock:
+            if sensor_type == 'camera':
+                self.camera_data[sensor_id] = data
+            elif sensor_type == 'radar':
+                self.radar_data[sensor_id] = data
+            elif sensor_type == 'magnetic':
+                self.magnetic_data[sensor_id] = data
+            
+            self._pending_updates += 1
+            self.fusion_stats['updates'] += 1
+            # 只有使用该传感器的车道需要重新融合
+            self._dirty_lanes.update(self.sensor_lanes.get(sensor_id, ()))
+            
+            # 触发数据融合
+            if self.fusion_mode == 'immediate':
+                self._run_fusion()
+            elif self.fusion_mode == 'coalesced' and self._fusion_timer is None:
+                delay = max(0.0, self._last_fusion + 1.0 / self.max_fusion_rate - time.time())
+                self._fusion_timer = threading.Timer(delay, self._on_fusion_timer)
+                self._fusion_timer.daemon = True
+                self._fusion_timer.start()
+    
+    def fuse(self, force: bool = False) -> bool:
+        """
+        融合所有尚未融合的传感器更新
         
-        # 触发数据融合
+        Args:
+            force: 没有新数据时也重新融合（全部车道）
+            
+        Returns:
+            bool: 是否执行了融合
+        """
+        with self._lock:
+            if self._pending_updates == 0 and not force:
+                return False
+            if force:
+                self._dirty_lanes.update(self.lane_config)
+            self._run_fusion()
+            return True
+    
+    def _on_fusion_timer(self):
+        """合并定时器到期：一次融合定时器等待期间到达的所有更新"""
+        with self._lock:
+            self._fusion_timer = None
+            if self._pending_updates > 0:
+                self._run_fusion()
+    
+    def _run_fusion(self):
+        """执行一次融合并更新统计（调用方持有锁）"""
+        start = time.perf_counter()
         self._fuse_sensor_data()
+        self.fusion_stats['fusion_time_total'] += time.perf_counter() - start
+        self.fusion_stats['fusions'] += 1
+        # 一次融合覆盖的多个更新中，除一个之外都省去了各自的融合
+        self.fusion_stats['saved_fusions'] += max(0, self._pending_updates - 1)
+        self._pending_updates = 0
+        self._last_fusion = time.time()
+    
+    def get_fusion_stats(self) -> Dict:
+        """融合调度统计"""
+        with self._lock:
+            stats = dict(self.fusion_stats)
+            stats['pending_updates'] = self._pending_updates
+        stats['fusion_mode'] = self.fusion_mode
+        stats['average_fusion_ms'] = (
+            stats['fusion_time_total'] / stats['fusions'] * 1000 if stats['fusions'] else 0.0
+        )
+        return stats
+    
+    def close(self):
+        """取消等待中的合并定时器"""
+        with self._lock:
+            if self._fusion_timer is not None:
+                self._fusion_timer.cancel()
+                self._fusion_timer = None
     
     def _fuse_sensor_data(self):
-        """融合多传感器数据"""
+        """融合多传感器数据：只重新融合数据有变化的车道，整体状态由累计量更新"""
         try:
             current_time = time.time()
             
-            # 获取所有车道信息
-            lanes = self._get_lane_configuration()
+            dirty_lanes = [lane_id for lane_id in self.lane_config if lane_id in self._dirty_lanes]
+            self._dirty_lanes.clear()
             
-            fused_lanes = {}
-            
-            for lane_id, lane_info in lanes.items():
-                lane_data = self._fuse_lane_data(lane_id, lane_info)
+            # 未变化的车道沿用上次的融合结果
+            fused_lanes = dict(self.fused_data['lanes'])
+            for lane_id in dirty_lanes:
+                lane_data = self._fuse_lane_data(lane_id, self.lane_config[lane_id])
+                old_lane = fused_lanes.get(lane_id)
+                if old_lane is not None:
+                    self._update_totals(old_lane, -1)
+                self._update_totals(lane_data, 1)
                 fused_lanes[lane_id] = lane_data
             
+            self.fusion_stats['lane_fusions'] += len(dirty_lanes)
+            self.fusion_stats['lanes_skipped'] += len(self.lane_config) - len(dirty_lanes)
+            
+            # 定期按全部车道重新精确计算累计量
+            if (self.fusion_stats['fusions'] + 1) % self.resync_interval == 0:
+                self._resync_totals(fused_lanes)
+            
             # 计算整体路口状态
-            overall_status = self._calculate_overall_status(fused_lanes)
+            overall_status = self._overall_status_from_totals(len(fused_lanes))
             
             self.fused_data = {
                 'timestamp': current_time,
@@ -75,6 +201,21 @@ class SensorFusion:
         except Exception as e:
             logger.error(f"传感器数据融合失败: {e}")
     
+    def _update_totals(self, lane: Dict, sign: int):
+        """把一个车道的融合结果加入（sign=1）或移出（sign=-1）整体状态累计量"""
+        totals = self._totals
+        totals['vehicles'] += sign * lane['queue_length']
+        totals['occupancy'] += sign * lane['occupancy_rate']
+        if lane['average_speed'] > 0:
+            totals['speed_sum'] += sign * lane['average_speed']
+            totals['speed_lanes'] += sign
+    
+    def _resync_totals(self, lanes: Dict):
+        """按全部车道重新计算累计量"""
+        self._totals = {'vehicles': 0, 'occupancy': 0.0, 'speed_sum': 0.0, 'speed_lanes': 0}
+        for lane in lanes.values():
+            self._update_totals(lane, 1)
+    
     def _get_lane_configuration(self) -> Dict:
         """获取路口车道配置"""
         # 这里应该从配置文件或数据库获取实际的车道配置
@@ -100,14 +241,16 @@ class SensorFusion:
         sensors = lane_info['sensors']
         
         # 从摄像头数据中提取该车道的车辆
-        for cam_id, cam_data in self.camera_data.items():
-            if cam_id in sensors and cam_data.get('vehicles'):
+        for cam_id in sensors:
+            cam_data = self.camera_data.get(cam_id)
+            if cam_data and cam_data.get('vehicles'):
                 # 过滤属于该车道的车辆（简化处理）
                 camera_vehicles.extend(cam_data['vehicles'])
         
         # 从雷达数据中提取该车道的目标
-        for radar_id, radar_data in self.radar_data.items():
-            if radar_id in sensors and radar_data.get('targets'):
+        for radar_id in sensors:
+            radar_data = self.radar_data.get(radar_id)
+            if radar_data and radar_data.get('targets'):
                 # 根据角度过滤属于该车道的目标
                 lane_angle_range = self._get_lane_angle_range(lane_info['direction'])
                 filtered_targets = [
@@ -117,9 +260,9 @@ class SensorFusion:
                 radar_targets.extend(filtered_targets)
         
         # 获取地磁传感器数据
-        for mag_id, mag_data in self.magnetic_data.items():
-            if mag_id in sensors:
-                magnetic_status = mag_data
+        for mag_id in sensors:
+            if mag_id in self.magnetic_data:
+                magnetic_status = self.magnetic_data[mag_id]
                 break
         
         # 执行数据关联和融合
@@ -254,6 +397,18 @@ class SensorFusion:
         total_occupancy = np.mean([lane['occupancy_rate'] for lane in lanes.values()])
         avg_speed = np.mean([lane['average_speed'] for lane in lanes.values() if lane['average_speed'] > 0])
         
+        return self._build_overall_status(total_vehicles, total_occupancy, avg_speed)
+    
+    def _overall_status_from_totals(self, num_lanes: int) -> Dict:
+        """由累计量计算路口整体状态（与 _calculate_overall_status 结果一致）"""
+        totals = self._totals
+        total_occupancy = totals['occupancy'] / num_lanes if num_lanes else float('nan')
+        avg_speed = totals['speed_sum'] / totals['speed_lanes'] if totals['speed_lanes'] else float('nan')
+        
+        return self._build_overall_status(totals['vehicles'], total_occupancy, avg_speed)
+    
+    def _build_overall_status(self, total_vehicles: int, total_occupancy: float, avg_speed: float) -> Dict:
+        """根据车辆总数、平均占有率和平均车速生成整体状态"""
         # 确定交通状态
         if total_vehicles < 5:
             traffic_status = 'free'
@@ -283,7 +438,9 @@ class SensorFusion:
         return levels.get(traffic_status, 0.0)
     
     def get_fused_data(self) -> Dict:
-        """获取融合后的数据"""
+        """获取融合后的数据（'deferred' 模式下先融合尚未融合的更新）"""
+        if self.fusion_mode == 'deferred':
+            self.fuse()
         return self.fused_data.copy()
     
     def reset_trackers(self):
@@ -23,7 +23,8 @@ class IntelligentTrafficService:
         self.magnetic_sensors = {}
         
         # 初始化融合和控制模块
-        self.sensor_fusion = SensorFusion(intersection_id)
+        # 传感器更新只标记数据变化，每个监控周期融合一次
+        self.sensor_fusion = SensorFusion(intersection_id, fusion_mode='deferred')
         self.traffic_classifier = TrafficStateClassifier()
         self.adaptive_controller = AdaptiveTrafficController(intersection_id)
         
@@ -155,15 +156,20 @@ class IntelligentTrafficService:
                 # 收集传感器数据
                 sensor_data = self._collect_sensor_data()
                 
-                # 更新传感器融合
+                # 更新传感器数据，本周期的所有更新（含MQTT收到的）只融合一次
                 for sensor_type, sensors in sensor_data.items():
                     for sensor_id, data in sensors.items():
                         self.sensor_fusion.update_sensor_data(sensor_type, sensor_id, data)
+                self.sensor_fusion.fuse()
                 
                 # 获取融合数据
                 fused_data = self.sensor_fusion.get_fused_data()
                 self.latest_fused_data = fused_data
                 
+                # 新的融合数据作为上一次控制动作的反馈
+                if self.adaptive_controller.has_pending_transition():
+                    self.adaptive_controller.observe(fused_data)
+                
                 # 交通状态分类
                 if fused_data.get('overall_status'):
                     overall_status = fused_data['overall_status']
@@ -236,9 +242,9 @@ class IntelligentTrafficService:
         """控制循环"""
         while self.is_running:
             try:
-                # 执行控制步骤
+                # 执行控制动作（Q更新由监控线程在下一次融合数据到达时完成）
                 if self.latest_fused_data:
-                    control_result = self.adaptive_controller.control_step(self.latest_fused_data)
+                    control_result = self.adaptive_controller.act(self.latest_fused_data)
                     self.control_status = self.adaptive_controller.get_control_status()
                     
                     logger.debug(f"控制步骤完成: {control_result.get('action', 'unknown')}")
@@ -293,6 +299,10 @@ class IntelligentTrafficService:
         for sensor in self.magnetic_sensors.values():
             sensor.stop_detection()
         
+        # 写出Q表的剩余更新和最终快照
+        self.adaptive_controller.close()
+        self.sensor_fusion.close()
+        
         # 断开MQTT连接
         if self.mqtt_client:
             self.mqtt_client.disconnect()
@@ -311,6 +321,7 @@ class IntelligentTrafficService:
             },
             'mqtt_connected': self.mqtt_client.get_connection_status() if self.mqtt_client else False,
             'latest_fused_data': self.latest_fused_data,
+            'fusion_stats': self.sensor_fusion.get_fusion_stats(),
             'latest_classification': self.latest_classification,
             'control_status': self.control_status
         }
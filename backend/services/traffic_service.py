@@ -5,6 +5,7 @@ import datetime
 from typing import Dict, Any
 from .intelligent_traffic_service import get_intelligent_traffic_service
 from .simulator import SimulatedHardware
+from algorithms.signal_timing import get_webster_optimizer, phase_flows_from_lanes, TWO_PHASE_DIRECTIONS
 
 import threading
 
@@ -293,8 +294,14 @@ class TrafficService:
             return {"message": "控制命令已发送", "command_id": "cmd_001", "log": log_entry}
     
     @staticmethod
-    def calculate_optimal_timing(traffic_status: IntersectionStatus):
-        """根据交通状态计算最优信号灯配时"""
+    def calculate_optimal_timing(traffic_status: IntersectionStatus) -> Dict[str, Any]:
+        """
+        根据交通状态计算最优信号灯配时
+        
+        Returns:
+            dict: timing_plan（车道 -> 绿灯时间）以及 Webster 方法的 cycle_length、
+                critical_ratio、average_delay（使用自适应控制器结果时为None）
+        """
         try:
             # 获取智能交通服务实例
             service = get_intelligent_traffic_service()
@@ -311,7 +318,12 @@ class TrafficService:
                     green_time = control_status.get(f'{direction}_green_time', 30)
                     timing_plan[lane_id] = green_time
                 
-                return timing_plan
+                return {
+                    'timing_plan': timing_plan,
+                    'cycle_length': None,
+                    'critical_ratio': None,
+                    'average_delay': None
+                }
             else:
                 # 服务未运行，使用传统算法
                 return TrafficService._calculate_traditional_timing(traffic_status)
@@ -322,24 +334,25 @@ class TrafficService:
     
     @staticmethod
     def _calculate_traditional_timing(traffic_status: IntersectionStatus):
-        """传统算法计算最优信号灯配时"""
-        total_vehicles = sum(lane.vehicle_count for lane in traffic_status.lanes)
+        """传统算法计算最优信号灯配时（Webster 最佳周期与绿信比）"""
+        optimizer = get_webster_optimizer()
+        flows = phase_flows_from_lanes(traffic_status.lanes)
+        result = optimizer.optimize(flows)
         
-        if total_vehicles == 0:
-            # 如果没有车辆，给每个方向相同的最短时间
-            timing_plan = {
-                lane.id: 15 for lane in traffic_status.lanes
-            }
-        else:
-            # 根据车流量比例分配时间
-            timing_plan = {}
-            for lane in traffic_status.lanes:
-                proportion = lane.vehicle_count / total_vehicles
-                # 基础时间 + 按比例增加的时间（最多60秒）
-                green_time = 15 + int(proportion * 45)
-                timing_plan[lane.id] = min(green_time, 60)
+        # 每条车道取其所属相位的绿灯时间
+        green_times = result['green']
+        timing_plan = {}
+        for lane in traffic_status.lanes:
+            phase = next((p for p, directions in enumerate(TWO_PHASE_DIRECTIONS)
+                          if lane.direction in directions), None)
+            timing_plan[lane.id] = int(green_times[phase]) if phase is not None else optimizer.min_green
         
-        return timing_plan
+        return {
+            'timing_plan': timing_plan,
+            'cycle_length': int(result['cycle_length']),
+            'critical_ratio': round(float(result['critical_ratio']), 3),
+            'average_delay': round(float(result['average_delay']), 1)
+        }
     
     @staticmethod
     def get_intelligent_status(intersection_id: str) -> Dict[str, Any]:
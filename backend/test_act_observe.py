@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""测试自适应控制器 act/observe 的转移配对"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from controllers.adaptive_control import AdaptiveTrafficController
+
+
+def _observation(north: float, south: float, east: float, west: float,
+                 vehicles: int = 20, speed: float = 30.0) -> dict:
+    """传感器融合数据：每个方向一条车道"""
+    congestion = {'north': north, 'south': south, 'east': east, 'west': west}
+    return {
+        'lanes': {f'{d}_1': {'direction': d, 'congestion_level': c} for d, c in congestion.items()},
+        'overall_status': {'total_vehicles': vehicles, 'average_speed': speed}
+    }
+
+
+QUIET = _observation(0.1, 0.1, 0.2, 0.1, vehicles=5, speed=45.0)
+BUSY = _observation(0.9, 0.8, 0.5, 0.9, vehicles=40, speed=15.0)
+
+
+def _controller(model_path: str) -> AdaptiveTrafficController:
+    random.seed(0)
+    controller = AdaptiveTrafficController('act_observe_test', model_path=model_path)
+    controller.epsilon = 0.0
+    return controller
+
+
+def _expected_q(controller, state: int, action: int, observation: dict) -> float:
+    """按下一次观测计算的Q更新结果（在 observe 之前调用）"""
+    new_state = controller.get_state_index(observation)
+    reward = controller.calculate_reward(state, action, new_state, observation)
+    old_q = controller.q_table.get(state, action)
+    max_new_q = controller.q_table.max_value(new_state)
+    return old_q + controller.alpha * (reward + controller.gamma * max_new_q - old_q)
+
+
+def test_observe_completes_pending_action():
+    """act 不阻塞也不更新Q表；observe 用下一次观测的状态和奖励完成更新"""
+    with tempfile.TemporaryDirectory() as model_path:
+        controller = _controller(model_path)
+        try:
+            start = time.perf_counter()
+            result = controller.act(BUSY)
+            # 原来的 control_step 在动作和更新之间固定等待0.1秒
+            assert time.perf_counter() - start < 0.1
+            assert controller.has_pending_transition()
+            assert len(controller.q_table) == 0 and controller.completed_updates == 0
+
+            state = controller.state_space.index(result['state'])
+            action = controller.action_space.index(result['action'])
+            expected = _expected_q(controller, state, action, QUIET)
+            feedback = controller.observe(QUIET)
+            assert feedback['state'] == result['state'] and feedback['action'] == result['action']
+            assert feedback['new_state'] == controller.get_current_state(QUIET)
+            assert feedback['reward'] == controller.calculate_reward(
+                state, action, feedback['new_state'], QUIET
+            )
+            assert feedback['action_time'] == result['timestamp']
+            assert controller.q_table.get(state, action) == expected
+            assert controller.completed_updates == 1
+
+            # 没有待更新的动作时 observe 什么都不做
+            assert not controller.has_pending_transition()
+            assert controller.observe(BUSY) == {}
+            assert controller.completed_updates == 1
+        finally:
+            controller.close()
+
+
+def test_act_without_observe_completes_previous():
+    """连续两次 act 时，第二次的观测作为第一次动作的结果"""
+    with tempfile.TemporaryDirectory() as model_path:
+        controller = _controller(model_path)
+        try:
+            first = controller.act(BUSY)
+            state = controller.state_space.index(first['state'])
+            action = controller.action_space.index(first['action'])
+            expected = _expected_q(controller, state, action, QUIET)
+            expected_state = controller.get_current_state(QUIET)
+            second = controller.act(QUIET)
+            assert controller.q_table.get(state, action) == expected
+            assert controller.completed_updates == 1
+            assert second['state'] == expected_state
+            assert controller.has_pending_transition()
+        finally:
+            controller.close()
+
+
+def test_control_step_reports_previous_feedback():
+    with tempfile.TemporaryDirectory() as model_path:
+        controller = _controller(model_path)
+        try:
+            first = controller.control_step(BUSY)
+            assert first['feedback'] == {}
+            second = controller.control_step(QUIET)
+            assert second['feedback']['state'] == first['state']
+            assert second['feedback']['action'] == first['action']
+            assert second['feedback']['action_time'] == first['timestamp']
+            assert controller.completed_updates == 1
+
+            controller.reset_controller()
+            assert not controller.has_pending_transition()
+            assert controller.control_step(BUSY)['feedback'] == {}
+        finally:
+            controller.close()
+
+
+def test_concurrent_act_and_observe():
+    """act 和 observe 来自不同线程时，每个动作恰好完成一次Q更新"""
+    with tempfile.TemporaryDirectory() as model_path:
+        controller = _controller(model_path)
+        controller.epsilon = 0.5
+        acts = 200
+        done = threading.Event()
+
+        def observe_loop():
+            observations = [QUIET, BUSY]
+            k = 0
+            while not done.is_set():
+                controller.observe(observations[k % 2])
+                k += 1
+
+        observer = threading.Thread(target=observe_loop)
+        observer.start()
+        try:
+            for k in range(acts):
+                assert 'error' not in controller.act(BUSY if k % 3 else QUIET)
+        finally:
+            done.set()
+            observer.join()
+        try:
+            controller.observe(QUIET)
+            assert controller.completed_updates == acts
+            assert not controller.has_pending_transition()
+        finally:
+            controller.close()
+
+
+if __name__ == '__main__':
+    test_observe_completes_pending_action()
+    test_act_without_observe_completes_previous()
+    test_control_step_reports_previous_feedback()
+    test_concurrent_act_and_observe()
+    print("act/observe转移配对测试通过")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""测试批量Q-Learning控制器的Q表更新"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from controllers.batch_adaptive_control import BatchAdaptiveTrafficController
+
+
+def _run(shared_q_table: bool, num_intersections: int = 1000, steps: int = 30):
+    """以随机拥堵输入运行若干步，返回控制器和出现过的最大奖励绝对值"""
+    rng = np.random.default_rng(0)
+    lane_directions = [0, 0, 1, 1, 2, 2, 3, 3]
+    controller = BatchAdaptiveTrafficController(
+        [f'i{i}' for i in range(num_intersections)], lane_directions,
+        shared_q_table=shared_q_table, seed=0
+    )
+    controller.epsilon[:] = 0.0
+    max_reward = 0.0
+    for _ in range(steps):
+        congestion = rng.random((num_intersections, len(lane_directions)))
+        result = controller.control_step(congestion)
+        if result['feedback'] is not None:
+            max_reward = max(max_reward, float(np.abs(result['feedback']['rewards']).max()))
+    return controller, max_reward
+
+
+def _assert_bounded(controller, max_reward):
+    """Q值不应超过 max|r| / (1 - γ)"""
+    q = controller.q_values[np.isfinite(controller.q_values)]
+    bound = max_reward / (1 - controller.gamma) + 1e-6
+    assert q.size > 0
+    assert np.abs(q).max() <= bound, (np.abs(q).max(), bound)
+
+
+def test_shared_q_table_stays_bounded():
+    """共享Q表：同一步多个路口更新同一 (状态, 动作) 时不能累加成 N×alpha"""
+    controller, max_reward = _run(shared_q_table=True)
+    _assert_bounded(controller, max_reward)
+
+
+def test_per_intersection_q_tables_stay_bounded():
+    """每个路口一张Q表"""
+    controller, max_reward = _run(shared_q_table=False)
+    _assert_bounded(controller, max_reward)
+
+
+def test_shared_update_is_mean_of_deltas():
+    """共享Q表的一次更新等于各路口 TD 更新的平均值"""
+    controller = BatchAdaptiveTrafficController(['a', 'b', 'c'], [0, 1, 2, 3], shared_q_table=True)
+    states = np.array([5, 5, 5])
+    actions = np.array([2, 2, 2])
+    rewards = np.array([1.0, 2.0, 6.0])
+    controller.update_q_tables(states, actions, rewards, np.array([7, 7, 7]))
+    expected = controller.alpha * rewards.mean()
+    assert np.isclose(controller.q_values[0, 5, 2], expected)
+
+
+def test_save_after_load_overwrites_same_file():
+    """加载后的Q表是普通的可写数组，可以再次原子地保存到同一路径"""
+    controller, _ = _run(shared_q_table=False, num_intersections=20, steps=10)
+    with tempfile.TemporaryDirectory() as directory:
+        filepath = os.path.join(directory, 'q_tables.npy')
+        controller.save(filepath)
+
+        loaded = BatchAdaptiveTrafficController(
+            controller.intersection_ids, [0, 0, 1, 1, 2, 2, 3, 3], shared_q_table=False
+        )
+        loaded.load(filepath)
+        assert type(loaded.q_values) is np.ndarray and loaded.q_values.flags.writeable
+        assert np.array_equal(loaded.q_values, controller.q_values)
+
+        loaded.q_values[0, 0, 0] = 1.5
+        loaded.save(filepath)
+        assert np.load(filepath)[0, 0, 0] == 1.5
+
+
+if __name__ == '__main__':
+    test_shared_q_table_stays_bounded()
+    test_per_intersection_q_tables_stay_bounded()
+    test_shared_update_is_mean_of_deltas()
+    test_save_after_load_overwrites_same_file()
+    print("批量Q表更新测试通过")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""测试控制历史的磁盘日志、索引和跨磁盘/内存的查询"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from controllers.control_history import ControlHistory, INDEX_RECORD_DTYPE
+
+
+def _fill(history: ControlHistory, count: int, start: int = 0):
+    for t in range(start, start + count):
+        history.append({'timestamp': float(t), 'action': t % 4, 'reward': -t / 10})
+
+
+def test_log_and_index_format():
+    """数据文件每行一条JSON记录，索引为 (时间戳, 行偏移) 定长记录"""
+    with tempfile.TemporaryDirectory() as directory:
+        history = ControlHistory(directory, 'h', capacity=10, spill_batch=4)
+        _fill(history, 30)
+        # 30 条中最近 10 条在内存，其余按 4 条一批写盘，剩下的在溢出缓冲
+        assert history._disk_count == 20 and len(history._spill) == 0 and len(history) == 30
+
+        index = np.fromfile(history.index_path, dtype=INDEX_RECORD_DTYPE)
+        assert os.path.getsize(history.index_path) == 20 * INDEX_RECORD_DTYPE.itemsize
+        assert index['timestamp'].tolist() == [float(t) for t in range(20)]
+        with open(history.data_path, 'rb') as f:
+            data = f.read()
+        lines = data.splitlines(keepends=True)
+        assert len(lines) == 20
+        assert index['offset'].tolist() == list(np.cumsum([0] + [len(line) for line in lines[:-1]]))
+        for t, offset in enumerate(index['offset']):
+            line = data[offset:data.index(b'\n', offset)]
+            assert json.loads(line) == {'timestamp': float(t), 'action': t % 4, 'reward': -t / 10}
+
+
+def test_torn_index_is_truncated():
+    """写入中断留下的不完整索引记录在重新打开时被截掉，之后的写入和查询正常"""
+    with tempfile.TemporaryDirectory() as directory:
+        history = ControlHistory(directory, 'h', capacity=4, spill_batch=4)
+        _fill(history, 12)
+        history.flush()
+        with open(history.index_path, 'ab') as f:
+            f.write(b'\x01' * (INDEX_RECORD_DTYPE.itemsize // 2))
+        # 数据文件尾部也有一行没写完
+        with open(history.data_path, 'ab') as f:
+            f.write(b'{"timestamp":12.0,"act')
+
+        reopened = ControlHistory(directory, 'h', capacity=4, spill_batch=4)
+        assert len(reopened) == 12
+        assert os.path.getsize(reopened.index_path) == 12 * INDEX_RECORD_DTYPE.itemsize
+
+        _fill(reopened, 10, start=12)
+        assert reopened._disk_count > 12
+        assert [e['timestamp'] for e in reopened.query()] == [float(t) for t in range(22)]
+        assert [e['timestamp'] for e in reopened.query(10, 16)] == [float(t) for t in range(10, 16)]
+
+
+def test_query_across_disk_and_memory():
+    with tempfile.TemporaryDirectory() as directory:
+        history = ControlHistory(directory, 'h', capacity=8, spill_batch=5)
+        _fill(history, 40)
+        assert history._disk_count > 0 and history._spill and history._recent
+
+        def timestamps(*args, **kwargs):
+            return [e['timestamp'] for e in history.query(*args, **kwargs)]
+
+        assert timestamps() == [float(t) for t in range(40)]
+        for start, end in [(0, 40), (3, 37), (29, 34), (31, 40), (35, 36), (20, 20), (50, 60)]:
+            assert timestamps(start, end) == [float(t) for t in range(start, min(end, 40))], (start, end)
+        # limit 取时间上最新的若干条，可能一部分在磁盘、一部分在内存
+        assert timestamps(limit=12) == [float(t) for t in range(28, 40)]
+        assert timestamps(0, 33, limit=6) == [float(t) for t in range(27, 33)]
+        assert timestamps(limit=3) == [37.0, 38.0, 39.0]
+
+
+def test_failed_writes_keep_memory_bounded():
+    """磁盘写入反复失败时丢弃溢出缓冲；flush 失败不丢弃内存中的记录"""
+    with tempfile.TemporaryDirectory() as directory:
+        history = ControlHistory(directory, 'h', capacity=4, spill_batch=4, max_write_failures=3)
+        # 数据文件路径被目录占用，写入必然失败
+        os.makedirs(history.data_path)
+        _fill(history, 200)
+        assert len(history._spill) < 4 * 3
+        assert history.dropped > 0
+        assert history.dropped + len(history._spill) + len(history._recent) == 200
+
+        assert not history.flush()
+        assert len(history._recent) == 4
+        kept = [e['timestamp'] for e in history.query()]
+
+        shutil.rmtree(history.data_path)
+        assert history.flush()
+        assert len(history._recent) == 0 and len(history._spill) == 0
+        assert [e['timestamp'] for e in history.query()] == kept
+
+
+if __name__ == '__main__':
+    test_log_and_index_format()
+    test_torn_index_is_truncated()
+    test_query_across_disk_and_memory()
+    test_failed_writes_keep_memory_bounded()
+    print("控制历史测试通过")
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""测试稠密Q表与原JSON格式的相互转换"""
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from controllers.adaptive_control import AdaptiveTrafficController
+from controllers.q_table import DenseQTable
+
+STATES = [f's{i}' for i in range(20)]
+ACTIONS = [f'a{i}' for i in range(5)]
+
+
+def _random_dict(rng, states, actions, count: int) -> dict:
+    """原 defaultdict 实现保存的格式：只包含访问过的 (状态, 动作)"""
+    data = {}
+    for _ in range(count):
+        state = states[int(rng.integers(len(states)))]
+        action = actions[int(rng.integers(len(actions)))]
+        data.setdefault(state, {})[action] = float(rng.normal(0, 10))
+    return data
+
+
+def test_dict_round_trip():
+    rng = np.random.default_rng(0)
+    data = _random_dict(rng, STATES, ACTIONS, 40)
+    table = DenseQTable(STATES, ACTIONS)
+    assert table.update_from_dict(data) == sum(len(actions) for actions in data.values())
+    assert table.to_dict() == data
+    assert len(table) == len(data)
+
+    for s, state in enumerate(STATES):
+        actions = data.get(state, {})
+        assert table[state] == actions
+        if actions:
+            best = max(actions.values())
+            assert table.max_value(s) == best
+            assert ACTIONS[table.best_action(s)] == min(
+                (a for a, v in actions.items() if v == best), key=ACTIONS.index
+            )
+        else:
+            # 未访问的状态：最大Q值为0，没有最优动作，未访问的动作Q值为0
+            assert table.max_value(s) == 0.0 and table.best_action(s) == -1
+        assert table.get(s, 0) == actions.get('a0', 0.0)
+    assert np.array_equal(table.max_values(np.arange(len(STATES))),
+                          [table.max_value(s) for s in range(len(STATES))])
+
+
+def test_unknown_entries_are_skipped():
+    table = DenseQTable(STATES, ACTIONS)
+    loaded = table.update_from_dict({
+        's1': {'a2': 1.5, 'unknown_action': 3.0},
+        'unknown_state': {'a0': 2.0},
+        's3': {}
+    })
+    assert loaded == 1
+    assert table.to_dict() == {'s1': {'a2': 1.5}}
+
+
+def test_cache_follows_updates():
+    """最优动作的Q值下降时重新选择；Q值相同时取下标最小的动作"""
+    table = DenseQTable(STATES, ACTIONS)
+    table.set(0, 3, 2.0)
+    table.set(0, 1, 2.0)
+    assert table.best_action(0) == 1
+    table.set(0, 1, -1.0)
+    assert table.best_action(0) == 3 and table.max_value(0) == 2.0
+    table.set(0, 3, -5.0)
+    assert table.best_action(0) == 1 and table.max_value(0) == -1.0
+
+    # 直接修改数组后 refresh 重建缓存
+    table.values[0, 4] = 7.0
+    table.refresh()
+    assert table.best_action(0) == 4
+    table.clear()
+    assert table.to_dict() == {} and table.best_action(0) == -1
+
+
+def test_controller_json_round_trip():
+    """控制器读入原格式JSON后迁移为二进制快照，重新打开和导出的Q表与原文件相同"""
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as scratch:
+        controller = AdaptiveTrafficController('json_test', model_path=scratch)
+        data = _random_dict(rng, controller.state_space, controller.action_space, 300)
+        controller.close()
+
+    with tempfile.TemporaryDirectory() as model_path:
+        with open(os.path.join(model_path, 'q_table_json_test.json'), 'w') as f:
+            json.dump(data, f, indent=2)
+
+        controller = AdaptiveTrafficController('json_test', model_path=model_path)
+        try:
+            assert controller.q_table.to_dict() == data
+            controller.epsilon = 0.0
+            for state, values in data.items():
+                best = max(values.values())
+                assert values[controller.choose_action(state)] == best
+        finally:
+            controller.close()
+
+        # JSON文件删除后从二进制快照加载
+        os.remove(os.path.join(model_path, 'q_table_json_test.json'))
+        reopened = AdaptiveTrafficController('json_test', model_path=model_path)
+        try:
+            assert reopened.q_table.to_dict() == data
+            exported = reopened.export_json(os.path.join(model_path, 'exported.json'))
+            with open(exported) as f:
+                assert json.load(f) == data
+        finally:
+            reopened.close()
+
+
+if __name__ == '__main__':
+    test_dict_round_trip()
+    test_unknown_entries_are_skipped()
+    test_cache_follows_updates()
+    test_controller_json_round_trip()
+    print("稠密Q表测试通过")
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""测试DRLTrafficController的共享策略、状态布局和学习步骤"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from controllers.drl_traffic_controller import DRLTrafficController
+from controllers.numpy_policy import NumpyPolicy
+from controllers.quantized_policy import QuantizedPolicy
+
+
+def _traffic_data(rng) -> dict:
+    """随机生成一次交通数据"""
+    data = {}
+    for lane in DRLTrafficController.LANES:
+        data[lane] = float(rng.integers(0, 30))
+        data[f'{lane}_wait'] = float(rng.uniform(0, 60))
+    return data
+
+
+def test_shared_policy_does_not_explore_or_store_experience():
+    """共享策略（非仅推理）的控制器不在线训练：使用最低探索率，也不分配经验回放"""
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as model_path:
+        controllers = [
+            DRLTrafficController(f'shared_{i}', model_path=model_path, policy_name='test_shared')
+            for i in range(2)
+        ]
+        try:
+            assert controllers[0].shared_policy is controllers[1].shared_policy
+            for _ in range(100):
+                for controller in controllers:
+                    controller.get_next_phase(_traffic_data(rng))
+            for controller in controllers:
+                assert controller.epsilon == controller.epsilon_min
+                assert controller.memory is None
+                assert controller.get_performance_metrics()['memory_size'] == 0
+        finally:
+            for controller in controllers:
+                controller.close()
+
+
+def test_inference_only_has_no_replay_memory():
+    rng = np.random.default_rng(4)
+    with tempfile.TemporaryDirectory() as model_path:
+        trainer = DRLTrafficController('inference', model_path=model_path)
+        trainer.export_policy()
+        trainer.close()
+
+        controller = DRLTrafficController('inference', model_path=model_path, inference_only=True)
+        try:
+            assert controller.memory is None
+            assert controller.numpy_policy is not None
+            for _ in range(10):
+                controller.get_next_phase(_traffic_data(rng))
+            assert not controller._replay()
+        finally:
+            controller.close()
+
+
+def test_state_layout_round_trip():
+    """_get_state 与 _simulate_next_state 使用同一状态布局：流量、等待时间、相位one-hot、时间"""
+    rng = np.random.default_rng(1)
+    num_lanes = len(DRLTrafficController.LANES)
+    with tempfile.TemporaryDirectory() as model_path:
+        controller = DRLTrafficController('layout', model_path=model_path)
+        try:
+            num_phases = len(controller.phases)
+            phase_slice = controller._phase_slice()
+            assert phase_slice == slice(2 * num_lanes, 2 * num_lanes + num_phases)
+            assert controller._get_state_size() == 2 * num_lanes + num_phases + 1
+
+            data = _traffic_data(rng)
+            for phase in range(num_phases):
+                controller.current_phase = phase
+                state = controller._get_state(data, timestamp=1800.0)
+                assert state.shape == (controller._get_state_size(),)
+                flows = [data[f'{d}_{t}'] for d in ('north', 'south', 'east', 'west') for t in ('straight', 'left')]
+                waits = [data[f'{d}_{t}_wait'] for d in ('north', 'south', 'east', 'west') for t in ('straight', 'left')]
+                assert np.allclose(state[:num_lanes], flows)
+                assert np.allclose(state[num_lanes:2 * num_lanes], waits)
+                assert np.array_equal(state[phase_slice], np.eye(num_phases)[phase])
+                assert np.isclose(state[-1], 0.5)
+
+                for action in range(num_phases):
+                    next_state = controller._simulate_next_state(state, action, data)
+                    # 只修改车流量和相位，等待时间与时间特征保持不变
+                    assert np.allclose(next_state[:num_lanes], state[:num_lanes] * 0.9)
+                    assert np.array_equal(next_state[num_lanes:2 * num_lanes], state[num_lanes:2 * num_lanes])
+                    assert np.array_equal(next_state[phase_slice], np.eye(num_phases)[action])
+                    assert next_state[-1] == state[-1]
+
+                    # 以动作作为当前相位重新编码，相位部分与模拟结果一致
+                    controller.current_phase = action
+                    assert np.array_equal(controller._get_state(data)[phase_slice], next_state[phase_slice])
+                    controller.current_phase = phase
+        finally:
+            controller.close()
+
+
+def _fill_memory(controller, rng, n: int):
+    size = controller._get_state_size()
+    controller.memory.add_batch(
+        rng.random((n, size), dtype=np.float32) * 20, rng.integers(0, len(controller.phases), n),
+        rng.random(n, dtype=np.float32), rng.random((n, size), dtype=np.float32) * 20, np.zeros(n, dtype=bool)
+    )
+
+
+def _capture_training_batch(controller):
+    """让 _replay 采样到固定的一批经验，并记录送入 train_on_batch 的目标值"""
+    batch = controller.memory.get(np.arange(controller.batch_size))
+    indices = np.arange(controller.batch_size)
+    weights = np.linspace(0.5, 1.0, controller.batch_size).astype(np.float32)
+    controller.memory.sample = lambda batch_size: batch
+    controller.memory.sample_with_weights = lambda batch_size: batch + (indices, weights)
+    captured = {}
+    train_on_batch = controller.q_network.train_on_batch
+
+    def capture(x, y, sample_weight=None):
+        captured.update(x=np.array(x), y=np.array(y), sample_weight=sample_weight)
+        return train_on_batch(x, y, sample_weight=sample_weight)
+
+    controller.q_network.train_on_batch = capture
+    return batch, captured
+
+
+def test_replay_targets_match_per_sample_bellman():
+    """向量化的Bellman目标与逐条计算的结果一致（含终止状态）；优先回放时用同一TD误差更新优先级"""
+    for prioritized in (False, True):
+        rng = np.random.default_rng(5)
+        with tempfile.TemporaryDirectory() as model_path:
+            controller = DRLTrafficController('replay_targets', model_path=model_path,
+                                              prioritized_replay=prioritized)
+            try:
+                _fill_memory(controller, rng, controller.batch_size)
+                controller.memory.dones[::3] = True
+                (states, actions, rewards, next_states, dones), captured = _capture_training_batch(controller)
+
+                q_values = np.asarray(controller.q_network.predict_on_batch(states))
+                next_q_values = np.asarray(controller.target_network.predict_on_batch(next_states))
+                expected = q_values.copy()
+                td_errors = np.empty(len(actions))
+                for i in range(len(actions)):
+                    target = rewards[i] if dones[i] else rewards[i] + controller.gamma * next_q_values[i].max()
+                    td_errors[i] = target - q_values[i, actions[i]]
+                    expected[i, actions[i]] = target
+
+                assert controller._replay()
+                assert np.array_equal(captured['x'], states)
+                assert np.allclose(captured['y'], expected, rtol=1e-5, atol=1e-5)
+                if prioritized:
+                    assert captured['sample_weight'] is not None
+                    priorities = (np.abs(td_errors) + controller.memory.priority_epsilon) ** controller.memory.alpha
+                    assert np.allclose(controller.memory.tree.get(np.arange(len(actions))), priorities, rtol=1e-4)
+                else:
+                    assert captured['sample_weight'] is None
+            finally:
+                controller.close()
+
+
+def test_soft_target_update_defaults_to_every_step():
+    """软更新默认每个学习步做一次；硬同步默认间隔不变"""
+    rng = np.random.default_rng(2)
+    with tempfile.TemporaryDirectory() as model_path:
+        controller = DRLTrafficController('target_sync', model_path=model_path)
+        try:
+            controller.set_target_update('hard')
+            assert controller.target_update_interval == 100
+            controller.set_target_update('soft', tau=0.5)
+            assert controller.target_update_interval == 1
+
+            _fill_memory(controller, rng, controller.batch_size * 2)
+            before = controller.target_updates
+            for _ in range(3):
+                assert controller._replay()
+            assert controller.target_updates - before == 3
+            controller._update_target_network()
+            assert controller.target_updates - before == 4
+            for online, target in zip(controller.q_network.get_weights(), controller.target_network.get_weights()):
+                assert np.allclose(online, target)
+        finally:
+            controller.close()
+
+
+def test_background_learner_keeps_policy_type():
+    """学习线程发布的快照沿用控制器配置的策略类型，停止后也不回退到Keras网络"""
+    rng = np.random.default_rng(3)
+    with tempfile.TemporaryDirectory() as model_path:
+        controller = DRLTrafficController('learner_policy', model_path=model_path)
+        try:
+            _fill_memory(controller, rng, controller.batch_size * 4)
+            controller.quantize_policy(validation_size=64)
+            first = controller.numpy_policy
+            learner = controller.start_background_learner(publish_interval=0.0)
+            assert learner.quantize
+            deadline = time.time() + 60
+            while learner.policy_version < 3 and time.time() < deadline:
+                time.sleep(0.05)
+            assert learner.policy_version >= 3
+            assert isinstance(controller.numpy_policy, QuantizedPolicy)
+            assert controller.numpy_policy is not first
+
+            controller.stop_background_learner()
+            assert isinstance(controller.numpy_policy, QuantizedPolicy)
+            controller.get_next_phase(_traffic_data(rng))
+
+            # 浮点策略同样保持为浮点快照
+            controller.numpy_policy = NumpyPolicy.from_keras(controller.q_network)
+            learner = controller.start_background_learner(publish_interval=0.0)
+            assert not learner.quantize
+            controller.stop_background_learner()
+            assert type(controller.numpy_policy) is NumpyPolicy
+        finally:
+            controller.close()
+
+
+if __name__ == '__main__':
+    test_shared_policy_does_not_explore_or_store_experience()
+    test_inference_only_has_no_replay_memory()
+    test_state_layout_round_trip()
+    test_replay_targets_match_per_sample_bellman()
+    test_soft_target_update_defaults_to_every_step()
+    test_background_learner_keeps_policy_type()
+    print("DRL控制器测试通过")
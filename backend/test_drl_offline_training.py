@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""测试离线DRL训练的经验生成"""
+import glob
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from controllers import drl_offline_training
+from controllers.drl_offline_training import (
+    build_transitions, chunk_with_lookahead, join_phase_log, _group_rows, _init_worker
+)
+
+
+def _snapshots():
+    """两段连续轨迹（中间间隔两小时），每个快照记录当时的相位"""
+    rng = np.random.default_rng(0)
+    lanes = drl_offline_training.DRLTrafficController.LANES
+    snapshots = []
+    timestamp = 1_700_000_000.0
+    for i in range(10):
+        timestamp += 7200.0 if i == 5 else 60.0
+        snapshot = {'timestamp': timestamp, 'current_phase': int(rng.integers(0, 4))}
+        for lane in lanes:
+            snapshot[lane] = float(rng.integers(0, 20))
+            snapshot[f'{lane}_wait'] = float(rng.uniform(0, 40))
+        snapshots.append(snapshot)
+    return snapshots
+
+
+def test_transitions_use_recorded_next_state():
+    _init_worker('offline_test')
+    controller = drl_offline_training._worker_controller
+    snapshots = _snapshots()
+    states, actions, rewards, next_states, dones = build_transitions(
+        (snapshots, None, drl_offline_training.MAX_SNAPSHOT_GAP)
+    )
+
+    # 最后一个快照没有下一状态；间隔超过 max_gap 处轨迹结束，没有记录的动作，不生成经验
+    kept = [i for i in range(len(snapshots) - 1) if i != 4]
+    assert len(states) == len(kept)
+    assert not dones.any()
+
+    for j, i in enumerate(kept):
+        controller.current_phase = snapshots[i]['current_phase']
+        assert np.allclose(states[j], controller._get_state(snapshots[i], timestamp=snapshots[i]['timestamp']))
+        # 动作为下一个快照记录的相位，下一状态为记录的下一个快照
+        nxt = snapshots[i + 1]
+        assert actions[j] == nxt['current_phase']
+        controller.current_phase = nxt['current_phase']
+        assert np.allclose(next_states[j], controller._get_state(nxt, timestamp=nxt['timestamp']))
+
+
+def test_recorded_action_ends_trajectory():
+    """快照记录了 action 时，轨迹结束处也生成 done 经验"""
+    _init_worker('offline_test')
+    snapshots = _snapshots()
+    snapshots[4]['action'] = 3
+    states, actions, rewards, next_states, dones = build_transitions(
+        (snapshots, None, drl_offline_training.MAX_SNAPSHOT_GAP)
+    )
+    assert len(states) == len(snapshots) - 1
+    assert dones.tolist() == [i == 4 for i in range(len(states))]
+    assert actions[4] == 3
+    assert np.array_equal(next_states[4], states[4])
+
+
+def test_rejects_snapshots_without_phase():
+    """没有记录动作或相位的数据源不能用于训练（不合成随机动作）"""
+    _init_worker('offline_test')
+    snapshots = _snapshots()
+    for snapshot in snapshots:
+        del snapshot['current_phase']
+    try:
+        build_transitions((snapshots, None, drl_offline_training.MAX_SNAPSHOT_GAP))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("snapshots without a recorded phase must be rejected")
+
+
+def test_join_phase_log():
+    snapshots = _snapshots()
+    for snapshot in snapshots:
+        del snapshot['current_phase']
+    t = [snapshot['timestamp'] for snapshot in snapshots]
+    # 第一条相位记录在第二个快照之前
+    phases = [(t[1] - 1, 2), (t[3], 1), (t[3] + 30, 0), (t[8] + 1, 3)]
+    joined = list(join_phase_log(iter(snapshots), iter(phases)))
+    assert [s['timestamp'] for s in joined] == t[1:]
+    assert [s['current_phase'] for s in joined] == [2, 2, 1, 0, 0, 0, 0, 0, 3]
+
+
+def test_group_rows_with_timestamp_jitter():
+    """同一采样周期内各车道的写入时间略有差异，仍合并为一个快照"""
+    base = 1_700_000_000.0
+    rows = []
+    for cycle in range(3):
+        for k, lane in enumerate(('lane_north_1', 'lane_south_1', 'lane_east_1', 'lane_west_1')):
+            rows.append({'lane_id': lane, 'vehicle_count': cycle + k, 'queue_length': 1,
+                         'timestamp': base + cycle * 60 + k * 0.37})
+    snapshots = list(_group_rows(rows))
+    assert len(snapshots) == 3
+    for cycle, snapshot in enumerate(snapshots):
+        assert snapshot['timestamp'] == base + cycle * 60
+        assert snapshot['north_straight'] == cycle and snapshot['west_straight'] == cycle + 3
+
+    # 同一车道在容差内再次出现，说明已进入下一个采样周期
+    rows = [{'lane_id': 'lane_north_1', 'vehicle_count': 1, 'queue_length': 0, 'timestamp': base + dt}
+            for dt in (0.0, 1.0)]
+    assert len(list(_group_rows(rows))) == 2
+
+
+def test_chunked_transitions_match_unchunked():
+    """分块生成的经验与整段生成的一致（块尾的下一状态来自下一块）"""
+    _init_worker('offline_test')
+    snapshots = _snapshots()
+    max_gap = drl_offline_training.MAX_SNAPSHOT_GAP
+    full = build_transitions((snapshots, None, max_gap))
+    parts = [build_transitions((chunk, lookahead, max_gap))
+             for chunk, lookahead in chunk_with_lookahead(iter(snapshots), 3)]
+    chunked = [np.concatenate(arrays) for arrays in zip(*parts)]
+
+    states, actions, rewards, next_states, dones = full
+    assert np.array_equal(chunked[0], states)
+    assert np.array_equal(chunked[1], actions)
+    assert np.array_equal(chunked[2], rewards)
+    assert np.array_equal(chunked[3], next_states)
+    assert np.array_equal(chunked[4], dones)
+
+
+def test_worker_does_not_leave_temp_dirs():
+    pattern = os.path.join(tempfile.gettempdir(), 'drl_offline_*')
+    before = set(glob.glob(pattern))
+    _init_worker('offline_test')
+    assert set(glob.glob(pattern)) == before
+
+
+if __name__ == '__main__':
+    test_transitions_use_recorded_next_state()
+    test_recorded_action_ends_trajectory()
+    test_rejects_snapshots_without_phase()
+    test_join_phase_log()
+    test_group_rows_with_timestamp_jitter()
+    test_chunked_transitions_match_unchunked()
+    test_worker_does_not_leave_temp_dirs()
+    print("离线经验生成测试通过")
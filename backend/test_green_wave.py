@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""测试干线绿波相位差优化"""
+import itertools
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from algorithms.green_wave import Corridor, GreenWaveOptimizer, band_width
+
+
+def _random_corridor(rng, n: int, cycle: float = 90.0) -> Corridor:
+    greens = rng.uniform(25, 50, size=n)
+    return Corridor(
+        [f'c{i}' for i in range(n)], rng.uniform(200, 800, size=n - 1), rng.uniform(40, 60),
+        cycle, green_starts=rng.uniform(0, cycle, size=n), green_times=greens
+    )
+
+
+def test_band_width_hand_example():
+    """两个路口，行程时间10秒，下游绿灯晚10秒开始：正向带宽为整个绿灯，反向为0"""
+    green = np.array([30.0, 30.0])
+    forward = band_width(np.array([0.0, 10.0]), green, -np.array([0.0, 10.0]), 60.0)
+    reverse = band_width(np.array([0.0, 10.0]), green, np.array([0.0, 10.0]), 60.0)
+    assert np.isclose(forward, 30.0)
+    assert np.isclose(reverse, 10.0)
+
+
+def test_reported_bandwidth_matches_evaluate():
+    """optimize 报告的带宽与按其相位差重新 evaluate 的带宽一致"""
+    rng = np.random.default_rng(0)
+    optimizer = GreenWaveOptimizer()
+    for n in (2, 3, 5, 12):
+        corridor = _random_corridor(rng, n)
+        result = optimizer.optimize(corridor)
+        evaluated = optimizer.evaluate(corridor, result['offsets'])
+        assert np.isclose(evaluated['forward_bandwidth'], result['forward_bandwidth'])
+        assert np.isclose(evaluated['reverse_bandwidth'], result['reverse_bandwidth'])
+        assert np.all((result['offsets'] >= 0) & (result['offsets'] < corridor.cycle_length))
+
+
+def test_not_worse_than_offset_grid():
+    """三个路口：双向较小带宽不低于相位差网格穷举的最优值（容差为搜索步长）"""
+    rng = np.random.default_rng(1)
+    optimizer = GreenWaveOptimizer(resolution=0.5)
+    step = 2.0
+    for _ in range(5):
+        corridor = _random_corridor(rng, 3)
+        result = optimizer.optimize(corridor)
+        achieved = min(result['forward_bandwidth'], result['reverse_bandwidth'])
+
+        grid = np.arange(0.0, corridor.cycle_length, step)
+        offsets = np.array([(0.0, a, b) for a, b in itertools.product(grid, grid)])
+        evaluated = optimizer.evaluate(corridor, offsets)
+        best = np.minimum(evaluated['forward_bandwidth'], evaluated['reverse_bandwidth']).max()
+        assert achieved >= best - optimizer.resolution, (achieved, best)
+
+
+if __name__ == '__main__':
+    test_band_width_hand_example()
+    test_reported_bandwidth_matches_evaluate()
+    test_not_worse_than_offset_grid()
+    print("绿波优化测试通过")
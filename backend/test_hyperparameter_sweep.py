@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""测试超参数搜索的断点续跑"""
+import glob
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from controllers.hyperparameter_sweep import HyperparameterSweep, grid_trials, run_drl_trial
+
+
+def _sweep(checkpoint_path: str) -> HyperparameterSweep:
+    trials = grid_trials({'alpha': [0.05, 0.2], 'gamma': [0.8, 0.95]})
+    return HyperparameterSweep('adaptive', trials, checkpoint_path, scenarios=2,
+                               train_steps=20, eval_steps=10, workers=0)
+
+
+def _checkpoint_rows(checkpoint_path: str):
+    """读取检查点中完整的行（跳过中断时写了一半的行）"""
+    rows = []
+    with open(checkpoint_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return rows
+
+
+def test_resume_from_checkpoint():
+    """中断后重新运行只执行未完成的试验，结果与一次跑完的一致"""
+    with tempfile.TemporaryDirectory() as directory:
+        full_path = os.path.join(directory, 'full.jsonl')
+        full = {row['trial_id']: row for row in _sweep(full_path).run()}
+        assert sorted(full) == [0, 1, 2, 3]
+
+        # 模拟在第三个试验写到一半时中断
+        resumed_path = os.path.join(directory, 'resumed.jsonl')
+        with open(full_path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+        with open(resumed_path, 'w', encoding='utf-8') as f:
+            f.writelines(lines[:2])
+            f.write(lines[2][:len(lines[2]) // 2])
+
+        sweep = _sweep(resumed_path)
+        assert sorted(sweep.load_checkpoint()) == sorted(json.loads(line)['trial_id'] for line in lines[:2])
+        resumed = {row['trial_id']: row for row in sweep.run()}
+
+        # 只追加了剩下的两个试验，写了一半的行没有与新结果拼接
+        assert len(_checkpoint_rows(resumed_path)) == 4
+        assert sorted(resumed) == sorted(full)
+        for trial_id, row in full.items():
+            for metric in ('average_delay', 'throughput_per_hour', 'average_queue'):
+                assert resumed[trial_id][metric] == row[metric], (trial_id, metric)
+
+        # 全部完成后再次运行不执行任何试验
+        size = os.path.getsize(resumed_path)
+        _sweep(resumed_path).run()
+        assert os.path.getsize(resumed_path) == size
+
+
+def test_changed_params_are_rerun():
+    """检查点中同一 trial_id 的参数与当前试验不一致时重新运行"""
+    with tempfile.TemporaryDirectory() as directory:
+        checkpoint_path = os.path.join(directory, 'sweep.jsonl')
+        _sweep(checkpoint_path).run()
+        sweep = _sweep(checkpoint_path)
+        sweep.trials[0] = {'alpha': 0.1, 'gamma': 0.9}
+        rows = sweep.run()
+        assert len(_checkpoint_rows(checkpoint_path)) == 5
+        assert [row['params'] for row in rows if row['trial_id'] == 0] == [sweep.trials[0]]
+
+
+def test_drl_trial_removes_model_dir():
+    pattern = os.path.join(tempfile.gettempdir(), 'drl_sweep_*')
+    before = set(glob.glob(pattern))
+    metrics = run_drl_trial({'batch_size': 4}, [0], train_steps=6, eval_steps=3, seed=0)
+    assert metrics['throughput_per_hour'] >= 0
+    assert set(glob.glob(pattern)) == before
+
+
+if __name__ == '__main__':
+    test_resume_from_checkpoint()
+    test_changed_params_are_rerun()
+    test_drl_trial_removes_model_dir()
+    print("超参数搜索测试通过")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""测试决策延迟预算：超时回退到缓存动作或规则方案"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from controllers.drl_traffic_controller import DRLTrafficController
+
+# 规则方案选择 east_straight/west_straight 所在的相位
+TRAFFIC = {
+    'north_straight': 2, 'south_straight': 1, 'east_straight': 25, 'west_straight': 20,
+    'east_straight_wait': 60.0, 'west_straight_wait': 45.0
+}
+
+
+class SlowPolicy:
+    """替换 _choose_action：在 release 之前阻塞，模拟卡住的推理"""
+
+    def __init__(self, action: int):
+        self.action = action
+        self.release = threading.Event()
+        self.finished = threading.Event()
+        self.calls = 0
+
+    def __call__(self, state):
+        self.calls += 1
+        self.release.wait(timeout=5.0)
+        self.finished.set()
+        return self.action
+
+
+def _controller(model_path: str) -> DRLTrafficController:
+    controller = DRLTrafficController('latency_test', model_path=model_path, inference_only=True)
+    controller.epsilon = 0.0
+    return controller
+
+
+def _wait_for_late_result(controller: DRLTrafficController, policy: SlowPolicy):
+    policy.release.set()
+    assert policy.finished.wait(timeout=5.0)
+    controller._pending_decision.result(timeout=5.0)
+
+
+def test_decision_within_budget():
+    with tempfile.TemporaryDirectory() as model_path:
+        controller = _controller(model_path)
+        try:
+            controller._choose_action = lambda state: 2
+            controller.set_latency_budget(1000.0)
+            phase, duration = controller.get_next_phase(TRAFFIC)
+            assert phase == 2 and controller.min_green_time <= duration <= controller.max_green_time
+            assert controller._cached_action == 2
+            assert controller.deadline_misses == 0
+            stats = controller.get_decision_latency_stats()
+            assert stats['count'] == 1 and stats['budget_ms'] == 1000.0
+        finally:
+            controller.close()
+
+
+def test_cached_fallback_uses_late_result():
+    """没有缓存时回退到规则方案；迟到的推理结果写入缓存，之后的超时使用它"""
+    with tempfile.TemporaryDirectory() as model_path:
+        controller = _controller(model_path)
+        try:
+            rule_phase = controller._rule_based_action(TRAFFIC)
+            late_action = (rule_phase + 1) % len(controller.phases)
+            policy = SlowPolicy(late_action)
+            controller._choose_action = policy
+            controller.set_latency_budget(20.0, fallback='cached')
+
+            assert controller.get_next_phase(TRAFFIC)[0] == rule_phase
+            assert controller.fallback_counts == {'cached': 0, 'rule': 1}
+            _wait_for_late_result(controller, policy)
+            # 完成回调在 result() 返回之后才可能执行
+            deadline = time.time() + 5.0
+            while controller._cached_action != late_action and time.time() < deadline:
+                time.sleep(0.01)
+            assert controller._cached_action == late_action
+
+            # 推理再次超时，回退到上一次迟到的结果
+            policy.release.clear()
+            policy.finished.clear()
+            assert controller.get_next_phase(TRAFFIC)[0] == late_action
+            assert controller.fallback_counts == {'cached': 1, 'rule': 1}
+            stats = controller.get_decision_latency_stats()
+            assert stats['deadline_misses'] == 2
+            assert stats['fallback_cached'] == 1 and stats['fallback_rule'] == 1
+            _wait_for_late_result(controller, policy)
+        finally:
+            controller.close()
+
+
+def test_pending_decision_is_not_queued():
+    """上一次推理仍未结束时直接回退，不再提交新的推理"""
+    with tempfile.TemporaryDirectory() as model_path:
+        controller = _controller(model_path)
+        try:
+            policy = SlowPolicy(0)
+            controller._choose_action = policy
+            controller.set_latency_budget(10.0)
+            for _ in range(5):
+                controller.get_next_phase(TRAFFIC)
+            assert policy.calls == 1
+            assert controller.deadline_misses == 5
+            _wait_for_late_result(controller, policy)
+        finally:
+            controller.close()
+
+
+def test_rule_fallback_ignores_cache():
+    with tempfile.TemporaryDirectory() as model_path:
+        controller = _controller(model_path)
+        try:
+            rule_phase = controller._rule_based_action(TRAFFIC)
+            controller._cached_action = (rule_phase + 1) % len(controller.phases)
+            policy = SlowPolicy(controller._cached_action)
+            controller._choose_action = policy
+            controller.set_latency_budget(10.0, fallback='rule')
+            assert controller.get_next_phase(TRAFFIC)[0] == rule_phase
+            assert controller.fallback_counts == {'cached': 0, 'rule': 1}
+            _wait_for_late_result(controller, policy)
+
+            try:
+                controller.set_latency_budget(10.0, fallback='random')
+            except ValueError:
+                pass
+            else:
+                raise AssertionError("unknown fallback mode should be rejected")
+        finally:
+            controller.close()
+
+
+if __name__ == '__main__':
+    test_decision_within_budget()
+    test_cached_fallback_uses_late_result()
+    test_pending_decision_is_not_queued()
+    test_rule_fallback_ignores_cache()
+    print("决策延迟预算测试通过")
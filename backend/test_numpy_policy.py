@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""测试NumPy推理引擎与Keras Q网络的一致性"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from controllers.drl_traffic_controller import DRLTrafficController
+from controllers.numpy_policy import NumpyPolicy, load_policy
+
+
+def _randomize_batch_norm(q_network, rng):
+    """训练步数很少时移动均值/方差接近初始值，随机设置以覆盖BatchNormalization的折算"""
+    for layer in q_network.layers:
+        if layer.__class__.__name__ == 'BatchNormalization':
+            layer.set_weights([
+                rng.uniform(0.5, 2.0, w.shape).astype(np.float32) if i in (0, 3)
+                else rng.normal(0, 0.5, w.shape).astype(np.float32)
+                for i, w in enumerate(layer.get_weights())
+            ])
+
+
+def test_numpy_policy_matches_keras():
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as model_path:
+        controller = DRLTrafficController('numpy_parity', model_path=model_path)
+        try:
+            _randomize_batch_norm(controller.q_network, rng)
+            states = (rng.random((256, controller._get_state_size())) * 40).astype(np.float32)
+            expected = np.asarray(controller.q_network.predict_on_batch(states))
+
+            policy = NumpyPolicy.from_keras(controller.q_network)
+            assert np.allclose(policy.predict_on_batch(states), expected, rtol=1e-4, atol=1e-4)
+            assert np.array_equal(np.argmax(policy.predict_on_batch(states), axis=1), np.argmax(expected, axis=1))
+            # 单个状态与批量结果一致
+            assert np.allclose(policy.predict(states[0]), expected[0], rtol=1e-4, atol=1e-4)
+            assert policy.act(states[0]) == int(np.argmax(expected[0]))
+
+            # 导出文件加载后结果相同
+            loaded = load_policy(controller.export_policy())
+            assert isinstance(loaded, NumpyPolicy)
+            assert np.array_equal(loaded.predict_on_batch(states), policy.predict_on_batch(states))
+        finally:
+            controller.close()
+
+
+def test_inference_only_controller_uses_exported_policy():
+    """仅推理的控制器不需要TensorFlow模型，决策结果与原Keras网络的贪婪动作一致"""
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as model_path:
+        trainer = DRLTrafficController('numpy_inference', model_path=model_path)
+        _randomize_batch_norm(trainer.q_network, rng)
+        trainer.export_policy()
+        states = (rng.random((64, trainer._get_state_size())) * 40).astype(np.float32)
+        expected = np.argmax(np.asarray(trainer.q_network.predict_on_batch(states)), axis=1)
+        trainer.close()
+
+        controller = DRLTrafficController('numpy_inference', model_path=model_path, inference_only=True)
+        try:
+            assert controller.q_network is None
+            assert [controller.numpy_policy.act(state) for state in states] == expected.tolist()
+        finally:
+            controller.close()
+
+
+if __name__ == '__main__':
+    test_numpy_policy_matches_keras()
+    test_inference_only_controller_uses_exported_policy()
+    print("NumPy推理引擎测试通过")
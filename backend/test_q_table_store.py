@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""测试Q表的二进制快照与更新日志持久化"""
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from controllers.q_table import DenseQTable
+from controllers.q_table_store import QTableStore, LOG_RECORD_DTYPE, get_q_table_writer
+
+STATES = [f's{i}' for i in range(50)]
+ACTIONS = [f'a{i}' for i in range(6)]
+
+
+def _update(table: DenseQTable, store: QTableStore, rng, count: int):
+    """随机写入Q值，同时记录到持久化队列"""
+    for _ in range(count):
+        state, action = int(rng.integers(len(STATES))), int(rng.integers(len(ACTIONS)))
+        value = float(rng.normal())
+        table.set(state, action, value)
+        store.record(state, action, value)
+
+
+def _reload(directory: str, name: str = 'q') -> DenseQTable:
+    table = DenseQTable(STATES, ACTIONS)
+    QTableStore(directory, name).load(table)
+    return table
+
+
+def _same(a: DenseQTable, b: DenseQTable) -> bool:
+    return (np.array_equal(a.values, b.values)
+            and np.array_equal(a.best_action_cache, b.best_action_cache)
+            and np.array_equal(a.best_value_cache, b.best_value_cache))
+
+
+def test_snapshot_and_log_round_trip():
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as directory:
+        table = DenseQTable(STATES, ACTIONS)
+        store = QTableStore(directory, 'q', snapshot_every=100)
+        store.attach(table)
+        _update(table, store, rng, 250)
+        store._write(snapshot=False)
+        assert os.path.getsize(store.log_path) == 250 * LOG_RECORD_DTYPE.itemsize
+        store._write(snapshot=True)
+        assert os.path.getsize(store.log_path) == 0
+        # 快照之后的更新只在日志中
+        _update(table, store, rng, 40)
+        store._write(snapshot=False)
+
+        loaded = DenseQTable(STATES, ACTIONS)
+        reader = QTableStore(directory, 'q')
+        assert reader.load(loaded)
+        assert _same(loaded, table)
+        # 加载后是普通数组，不再映射快照文件，之后的快照可以覆盖它
+        assert type(loaded.values) is np.ndarray
+        assert reader._seq == 290
+        reader._write_snapshot(loaded.values.copy(), reader._seq)
+        assert _same(_reload(directory), table)
+
+
+def test_truncated_log_tail_is_dropped():
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as directory:
+        table = DenseQTable(STATES, ACTIONS)
+        store = QTableStore(directory, 'q')
+        store.attach(table)
+        _update(table, store, rng, 30)
+        store._write(snapshot=False)
+        expected = table.values.copy()
+        # 写最后一条记录时崩溃：日志末尾只有半条记录
+        with open(store.log_path, 'ab') as f:
+            f.write(np.zeros(1, dtype=LOG_RECORD_DTYPE).tobytes()[:LOG_RECORD_DTYPE.itemsize // 2])
+
+        loaded = DenseQTable(STATES, ACTIONS)
+        reader = QTableStore(directory, 'q')
+        reader.load(loaded)
+        assert np.array_equal(loaded.values, expected)
+        assert os.path.getsize(store.log_path) == 30 * LOG_RECORD_DTYPE.itemsize
+
+        # 截断后追加的记录仍然对齐
+        reader.attach(loaded)
+        _update(loaded, reader, rng, 10)
+        reader._write(snapshot=False)
+        assert _same(_reload(directory), loaded)
+
+
+def test_crash_between_replace_and_truncate():
+    """快照 rename 之后、日志截断之前崩溃：序号不大于快照的日志记录不再重放"""
+    rng = np.random.default_rng(2)
+    with tempfile.TemporaryDirectory() as directory:
+        table = DenseQTable(STATES, ACTIONS)
+        store = QTableStore(directory, 'q')
+        store.attach(table)
+        _update(table, store, rng, 60)
+        store._write(snapshot=False)
+        stale_log = os.path.join(directory, 'stale.qlog')
+        shutil.copyfile(store.log_path, stale_log)
+        store._write(snapshot=True)
+        # 恢复截断前的日志，模拟截断前崩溃
+        shutil.copyfile(stale_log, store.log_path)
+        os.remove(stale_log)
+
+        # 再写一条序号不大于快照、但值不同的记录：如果被重放会覆盖快照里的值
+        stale = np.array([(1, 0, 0, 123.0)], dtype=LOG_RECORD_DTYPE)
+        with open(store.log_path, 'ab') as f:
+            f.write(stale.tobytes())
+
+        loaded = DenseQTable(STATES, ACTIONS)
+        reader = QTableStore(directory, 'q')
+        reader.load(loaded)
+        assert _same(loaded, table)
+        assert reader._seq == 60
+
+        # 重启后的更新序号接着快照往后编号，再次加载时都会被重放
+        reader.attach(loaded)
+        _update(loaded, reader, rng, 20)
+        reader._write(snapshot=False)
+        again = _reload(directory)
+        assert _same(again, loaded)
+
+
+def test_stores_share_one_writer_thread():
+    with tempfile.TemporaryDirectory() as directory:
+        stores = [QTableStore(directory, f'q{i}', flush_interval=0.05) for i in range(5)]
+        tables = [DenseQTable(STATES, ACTIONS) for _ in stores]
+        for store, table in zip(stores, tables):
+            store.attach(table)
+            store.start()
+        writer = get_q_table_writer()
+        assert all(store._writer is writer for store in stores)
+        assert writer._thread is not None and writer._thread.is_alive()
+
+        tables[0].set(1, 2, 3.5)
+        stores[0].record(1, 2, 3.5)
+        stores[0].request_snapshot()
+        for _ in range(100):
+            if os.path.exists(stores[0].snapshot_path):
+                break
+            writer._thread.join(0.05)
+        assert _reload(directory, 'q0').get(1, 2) == 3.5
+
+        for store in stores:
+            store.close()
+        assert not writer._stores
+
+
+if __name__ == '__main__':
+    test_snapshot_and_log_round_trip()
+    test_truncated_log_tail_is_dropped()
+    test_crash_between_replace_and_truncate()
+    test_stores_share_one_writer_thread()
+    print("Q表持久化测试通过")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""测试int8量化策略与浮点策略的误差"""
+import os
+import random
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from controllers.drl_traffic_controller import DRLTrafficController
+from controllers.drl_vec_env import VectorizedTrafficEnv
+from controllers.numpy_policy import NumpyPolicy, compare_policies, load_policy
+from controllers.quantized_policy import QuantizedPolicy
+
+
+def _trained_controller(model_path: str, steps: int = 200) -> DRLTrafficController:
+    """训练到浮点策略在不同状态下会选择不同动作（未训练的网络几乎总选同一个动作）"""
+    import tensorflow as tf
+
+    # 固定网络初始化和经验采集，使误差界不随训练结果波动
+    random.seed(0)
+    np.random.seed(0)
+    tf.random.set_seed(0)
+    controller = DRLTrafficController('int8_test', model_path=model_path, memory_size=50000)
+    controller.gather_experience(VectorizedTrafficEnv(64, seed=0), steps)
+    for _ in range(steps):
+        controller._replay()
+    return controller
+
+
+def test_quantized_error_bounds():
+    """在与校准无关的随机状态和另一组仿真状态上检查动作不一致率和Q值误差"""
+    with tempfile.TemporaryDirectory() as model_path:
+        controller = _trained_controller(model_path)
+        try:
+            float_policy = NumpyPolicy.from_keras(controller.q_network)
+            report = controller.quantize_policy(validation_size=4096)
+            quantized = controller.numpy_policy
+            assert isinstance(quantized, QuantizedPolicy)
+            assert report['quantized_parameter_bytes'] < report['float_parameter_bytes']
+
+            # 精度检查状态覆盖多种动作，避免不一致率因只选一个动作而恒为0
+            assert report['distinct_actions'] > 1
+            assert report['relative_q_error'] < 0.03, report
+            # 不一致的动作来自Q值几乎相等的状态（动作间差距小于量化误差）
+            assert report['action_mismatch_rate'] < 0.06, report
+
+            # 激活按张量量化，绝对误差以校准数据的Q值幅度为尺度
+            q_scale = np.abs(float_policy.predict_on_batch(controller._calibration_states(2048))).max()
+            env = VectorizedTrafficEnv(32, seed=1)
+            heldout = np.concatenate([env.step(np.random.randint(0, env.num_phases, env.num_envs))[0]
+                                      for _ in range(50)])
+            heldout_report = compare_policies(float_policy, quantized, heldout)
+            assert heldout_report['distinct_actions'] > 1
+            assert heldout_report['action_mismatch_rate'] < 0.03, heldout_report
+            assert heldout_report['mean_abs_q_error'] < 0.005 * q_scale, heldout_report
+            assert heldout_report['max_abs_q_error'] < 0.02 * q_scale, heldout_report
+        finally:
+            controller.close()
+
+
+def test_quantized_batches_are_row_independent():
+    """批大小变化时重新分配张量，每行结果与单独推理相同"""
+    with tempfile.TemporaryDirectory() as model_path:
+        controller = _trained_controller(model_path, steps=20)
+        try:
+            controller.quantize_policy(validation_size=256)
+            quantized = controller.numpy_policy
+            states = controller._sample_states(40, max_flow=30.0, max_wait=120.0)
+            batched = quantized.predict_on_batch(states)
+            for size in (1, 7, 32, 1, 40):
+                assert np.array_equal(quantized.predict_on_batch(states[:size]), batched[:size])
+            assert np.array_equal(quantized.predict(states[3]), batched[3])
+            assert quantized.predict_on_batch(states[:0]).shape == (0, quantized.output_size)
+        finally:
+            controller.close()
+
+
+def test_quantized_policy_round_trip():
+    """保存后由仅推理的量化控制器加载，结果与量化时一致"""
+    with tempfile.TemporaryDirectory() as model_path:
+        controller = _trained_controller(model_path, steps=20)
+        try:
+            report = controller.quantize_policy(validation_size=256, filepath='default')
+            quantized = controller.numpy_policy
+        finally:
+            controller.close()
+
+        states = controller._sample_states(64, max_flow=30.0, max_wait=120.0)
+        loaded = load_policy(report['filepath'])
+        assert isinstance(loaded, QuantizedPolicy)
+        assert np.array_equal(loaded.predict_on_batch(states), quantized.predict_on_batch(states))
+
+        edge = DRLTrafficController('int8_test', model_path=model_path, inference_only=True, quantized=True)
+        try:
+            assert isinstance(edge.numpy_policy, QuantizedPolicy)
+            assert [edge.numpy_policy.act(state) for state in states] == \
+                np.argmax(quantized.predict_on_batch(states), axis=1).tolist()
+        finally:
+            edge.close()
+
+
+if __name__ == '__main__':
+    test_quantized_error_bounds()
+    test_quantized_batches_are_row_independent()
+    test_quantized_policy_round_trip()
+    print("int8量化策略测试通过")
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""测试经验回放环形缓冲区与优先经验回放的求和树"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from controllers.replay_buffer import PrioritizedReplayBuffer, ReplayBuffer, SumTree
+
+STATE_SIZE = 3
+
+
+def _transitions(start: int, count: int):
+    """第 k 条经验的各字段都由 k 决定，便于检查写入位置"""
+    k = np.arange(start, start + count)
+    states = np.repeat(k[:, None], STATE_SIZE, axis=1).astype(np.float32)
+    return states, k, k.astype(np.float32) / 10, states + 0.5, k % 2 == 0
+
+
+def _stored_ids(buffer: ReplayBuffer) -> list:
+    """按写入顺序（从最旧到最新）列出缓冲区中的经验编号"""
+    order = (buffer.position - len(buffer) + np.arange(len(buffer))) % buffer.capacity
+    return buffer.actions[order].tolist()
+
+
+def _check_consistent(buffer: ReplayBuffer):
+    """每个槽位的五个字段属于同一条经验"""
+    n = len(buffer)
+    states, actions, rewards, next_states, dones = buffer.get(np.arange(n))
+    assert np.array_equal(states[:, 0], actions.astype(np.float32))
+    assert np.allclose(rewards, actions / 10)
+    assert np.array_equal(next_states, states + 0.5)
+    assert np.array_equal(dones, actions % 2 == 0)
+
+
+def test_add_wraps_around():
+    buffer = ReplayBuffer(5, STATE_SIZE)
+    for k in range(12):
+        states, actions, rewards, next_states, dones = _transitions(k, 1)
+        buffer.add(states[0], actions[0], rewards[0], next_states[0], dones[0])
+        assert len(buffer) == min(k + 1, 5)
+        assert buffer.position == (k + 1) % 5
+    assert _stored_ids(buffer) == [7, 8, 9, 10, 11]
+    _check_consistent(buffer)
+
+
+def test_add_batch_wraps_around():
+    """批量写入跨过数组末尾时环绕；一批超过容量时只保留最新的 capacity 条"""
+    buffer = ReplayBuffer(7, STATE_SIZE)
+    written = []
+    for start, count in [(0, 4), (4, 5), (9, 3), (12, 10), (22, 7), (29, 1)]:
+        indices = buffer.add_batch(*_transitions(start, count))
+        written.extend(range(start, start + count))
+        assert np.array_equal(buffer.actions[indices], np.arange(start, start + count)[-buffer.capacity:])
+        assert _stored_ids(buffer) == written[-buffer.capacity:]
+        _check_consistent(buffer)
+
+
+def test_add_and_add_batch_interleave():
+    buffer = ReplayBuffer(6, STATE_SIZE)
+    k = 0
+    for step in range(20):
+        if step % 3 == 0:
+            buffer.add_batch(*_transitions(k, 4))
+            k += 4
+        else:
+            states, actions, rewards, next_states, dones = _transitions(k, 1)
+            buffer.add(states[0], actions[0], rewards[0], next_states[0], dones[0])
+            k += 1
+        assert _stored_ids(buffer) == list(range(max(0, k - 6), k))
+    _check_consistent(buffer)
+
+
+def test_sample_only_returns_stored_transitions():
+    np.random.seed(0)
+    buffer = ReplayBuffer(100, STATE_SIZE)
+    buffer.add_batch(*_transitions(0, 10))
+    states, actions, rewards, next_states, dones = buffer.sample(500)
+    assert set(actions.tolist()) == set(range(10))
+    assert np.array_equal(states[:, 0], actions.astype(np.float32))
+
+
+def test_mapped_buffer_survives_reopen():
+    """内存映射存储的缓冲区在重新打开后保留环绕后的内容和写入位置"""
+    with tempfile.TemporaryDirectory() as directory:
+        buffer = ReplayBuffer(5, STATE_SIZE, filepath=directory)
+        buffer.add_batch(*_transitions(0, 4))
+        buffer.add_batch(*_transitions(4, 4))
+        buffer.flush()
+        expected = _stored_ids(buffer)
+        del buffer
+
+        reopened = ReplayBuffer(5, STATE_SIZE, filepath=directory, readonly=True)
+        assert len(reopened) == 5 and reopened.position == 3
+        assert _stored_ids(reopened) == expected == [3, 4, 5, 6, 7]
+        _check_consistent(reopened)
+
+
+def test_sum_tree_sums_and_find():
+    """内部节点等于子节点之和；find 与对累积和做二分查找的结果一致"""
+    rng = np.random.default_rng(0)
+    for capacity in (1, 5, 8, 37):
+        tree = SumTree(capacity)
+        priorities = np.zeros(capacity)
+        for _ in range(20):
+            # 含重复索引的批量更新，后写入的值生效
+            indices = rng.integers(0, capacity, size=rng.integers(1, 10))
+            values = rng.uniform(0.01, 5.0, size=len(indices))
+            tree.update(indices, values)
+            priorities[indices] = values
+            internal = np.arange(1, tree.leaf_offset)
+            assert np.allclose(tree.tree[internal], tree.tree[2 * internal] + tree.tree[2 * internal + 1])
+            assert np.isclose(tree.total, priorities.sum())
+
+        queries = rng.uniform(0, tree.total, size=1000)
+        expected = np.searchsorted(np.cumsum(priorities), queries, side='right')
+        assert np.array_equal(tree.find(queries), expected)
+
+
+def test_prioritized_sampling_is_proportional():
+    """采样频率与 p^alpha 成正比（容量不是2的幂）"""
+    np.random.seed(1)
+    buffer = PrioritizedReplayBuffer(6, STATE_SIZE, alpha=0.6)
+    buffer.add_batch(*_transitions(0, 6))
+    td_errors = np.array([0.0, 0.5, 1.0, 2.0, 4.0, 8.0])
+    buffer.update_priorities(np.arange(6), td_errors)
+
+    priorities = (np.abs(td_errors) + buffer.priority_epsilon) ** buffer.alpha
+    expected = priorities / priorities.sum()
+    samples = np.concatenate([buffer.sample_indices(64) for _ in range(4000)])
+    frequencies = np.bincount(samples, minlength=6) / len(samples)
+    assert np.allclose(frequencies, expected, atol=0.005), (frequencies, expected)
+
+
+def test_importance_sampling_weights():
+    """w_i = (N·P(i))^-beta / max_j w_j，beta 每次采样后增加"""
+    np.random.seed(2)
+    buffer = PrioritizedReplayBuffer(10, STATE_SIZE, beta=0.4, beta_increment=0.1)
+    buffer.add_batch(*_transitions(0, 10))
+    buffer.update_priorities(np.arange(10), np.linspace(0.1, 5.0, 10))
+
+    for step in range(8):
+        beta = buffer.beta
+        states, actions, _, _, _, indices, weights = buffer.sample_with_weights(32)
+        assert np.array_equal(actions, indices)
+        probabilities = buffer.tree.get(indices) / buffer.tree.total
+        expected = (len(buffer) * probabilities) ** (-beta)
+        assert np.allclose(weights, expected / expected.max(), rtol=1e-6)
+        assert weights.dtype == np.float32 and weights.max() == 1.0
+        # 优先级越高，权重越小
+        order = np.argsort(probabilities)
+        assert np.all(np.diff(weights[order]) <= 1e-7)
+        assert np.isclose(buffer.beta, min(1.0, 0.4 + 0.1 * (step + 1)))
+
+
+def test_new_transitions_get_max_priority():
+    buffer = PrioritizedReplayBuffer(8, STATE_SIZE)
+    buffer.add_batch(*_transitions(0, 4))
+    buffer.update_priorities(np.arange(4), np.array([0.1, 10.0, 0.2, 0.3]))
+    buffer.add_batch(*_transitions(4, 2))
+    states, actions, rewards, next_states, dones = _transitions(6, 1)
+    buffer.add(states[0], actions[0], rewards[0], next_states[0], dones[0])
+    assert np.allclose(buffer.tree.get([4, 5, 6]), buffer.max_priority)
+    assert np.isclose(buffer.max_priority, buffer.tree.get([1])[0])
+
+
+if __name__ == '__main__':
+    test_add_wraps_around()
+    test_add_batch_wraps_around()
+    test_add_and_add_batch_interleave()
+    test_sample_only_returns_stored_transitions()
+    test_mapped_buffer_survives_reopen()
+    test_sum_tree_sums_and_find()
+    test_prioritized_sampling_is_proportional()
+    test_importance_sampling_weights()
+    test_new_transitions_get_max_priority()
+    print("经验回放缓冲区测试通过")
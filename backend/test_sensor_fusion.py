@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""测试传感器融合的按车道增量融合与融合调度"""
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sensors.sensor_fusion import SensorFusion
+
+DIRECTIONS = ('north', 'south', 'east', 'west')
+SENSORS = [(sensor_type, f'{prefix}_{direction}')
+           for sensor_type, prefix in (('camera', 'cam'), ('radar', 'radar'), ('magnetic', 'mag'))
+           for direction in DIRECTIONS]
+
+
+def _sensor_data(rng: random.Random, sensor_type: str) -> dict:
+    if sensor_type == 'camera':
+        return {'vehicles': [{'class': 'car', 'bbox': [0, 0, 1, 1], 'confidence': 0.9,
+                              'speed': rng.uniform(10, 50)} for _ in range(rng.randint(0, 8))]}
+    if sensor_type == 'radar':
+        return {'targets': [{'angle': rng.uniform(-180, 180), 'speed': rng.uniform(10, 50), 'distance': 1}
+                            for _ in range(rng.randint(0, 10))]}
+    return {'occupancy_rate': rng.random()}
+
+
+def _without_vehicle_ids(lanes: dict) -> dict:
+    """车辆ID按融合次数递增分配，比较时忽略"""
+    return {
+        lane_id: ({k: v for k, v in lane.items() if k != 'vehicles'},
+                  [{k: v for k, v in vehicle.items() if k != 'id'} for vehicle in lane['vehicles']])
+        for lane_id, lane in lanes.items()
+    }
+
+
+def _same_status(a: dict, b: dict) -> bool:
+    for key, x in a.items():
+        y = b[key]
+        if isinstance(x, float) and math.isnan(x):
+            if not (isinstance(y, float) and math.isnan(y)):
+                return False
+        elif isinstance(x, float):
+            if not math.isclose(x, y, rel_tol=1e-9, abs_tol=1e-9):
+                return False
+        elif x != y:
+            return False
+    return True
+
+
+def test_incremental_fusion_matches_full_fusion():
+    """逐个传感器更新后的增量融合结果与全部车道重新融合的结果一致"""
+    rng = random.Random(0)
+    incremental = SensorFusion('test', fusion_mode='immediate', resync_interval=50)
+    full = SensorFusion('test', fusion_mode='deferred')
+    for step in range(600):
+        sensor_type, sensor_id = rng.choice(SENSORS + [('camera', 'cam_unknown')])
+        data = _sensor_data(rng, sensor_type)
+        incremental.update_sensor_data(sensor_type, sensor_id, data)
+        full.update_sensor_data(sensor_type, sensor_id, data)
+        full.fuse(force=True)
+
+        lanes = incremental.fused_data['lanes']
+        assert _without_vehicle_ids(lanes) == _without_vehicle_ids(full.fused_data['lanes']), step
+        assert _same_status(incremental.fused_data['overall_status'], full.fused_data['overall_status']), step
+        assert _same_status(incremental.fused_data['overall_status'],
+                            incremental._calculate_overall_status(lanes)), step
+
+
+def test_only_affected_lanes_are_refused():
+    rng = random.Random(1)
+    fusion = SensorFusion('test', fusion_mode='immediate')
+    for sensor_type, sensor_id in SENSORS:
+        fusion.update_sensor_data(sensor_type, sensor_id, _sensor_data(rng, sensor_type))
+
+    before = fusion.get_fusion_stats()['lane_fusions']
+    fusion.update_sensor_data('radar', 'radar_north', _sensor_data(rng, 'radar'))
+    assert fusion.get_fusion_stats()['lane_fusions'] - before == len(fusion.sensor_lanes['radar_north']) == 2
+
+    # 不属于任何车道的传感器不触发车道融合
+    before = fusion.get_fusion_stats()['lane_fusions']
+    fusion.update_sensor_data('camera', 'cam_unknown', _sensor_data(rng, 'camera'))
+    assert fusion.get_fusion_stats()['lane_fusions'] == before
+
+
+def _wait_for_fusions(fusion: SensorFusion, count: int, timeout: float = 5.0) -> dict:
+    deadline = time.time() + timeout
+    stats = fusion.get_fusion_stats()
+    while stats['fusions'] < count and time.time() < deadline:
+        time.sleep(0.005)
+        stats = fusion.get_fusion_stats()
+    return stats
+
+
+def test_deferred_fusion_counters():
+    """'deferred' 模式每个周期只融合一次，结果与每次更新都融合相同"""
+    rng = random.Random(2)
+    deferred = SensorFusion('test', fusion_mode='deferred')
+    immediate = SensorFusion('test', fusion_mode='immediate')
+    ticks = 5
+    for tick in range(ticks):
+        for sensor_type, sensor_id in SENSORS:
+            data = _sensor_data(rng, sensor_type)
+            deferred.update_sensor_data(sensor_type, sensor_id, data)
+            immediate.update_sensor_data(sensor_type, sensor_id, data)
+        assert deferred.get_fusion_stats()['pending_updates'] == len(SENSORS)
+        assert deferred.get_fusion_stats()['fusions'] == tick
+        assert deferred.fuse()
+        assert _without_vehicle_ids(deferred.fused_data['lanes']) == \
+            _without_vehicle_ids(immediate.fused_data['lanes']), tick
+
+    # 没有新数据时不融合；get_fused_data 先融合尚未融合的更新
+    assert not deferred.fuse()
+    deferred.update_sensor_data('magnetic', 'mag_east', {'occupancy_rate': 0.5})
+    deferred.get_fused_data()
+
+    stats = deferred.get_fusion_stats()
+    updates = ticks * len(SENSORS) + 1
+    assert stats['fusion_mode'] == 'deferred'
+    assert stats['updates'] == updates and stats['fusions'] == ticks + 1
+    assert stats['saved_fusions'] == updates - (ticks + 1)
+    assert stats['pending_updates'] == 0 and stats['average_fusion_ms'] > 0
+    assert immediate.get_fusion_stats()['fusions'] == ticks * len(SENSORS)
+    assert immediate.get_fusion_stats()['saved_fusions'] == 0
+
+    # 强制融合不计入省去的融合
+    assert deferred.fuse(force=True)
+    assert deferred.get_fusion_stats()['saved_fusions'] == updates - (ticks + 1)
+
+
+def test_coalesced_fusion_counters():
+    """'coalesced' 模式一批更新由一次定时融合完成，两次融合的间隔不小于 1/max_fusion_rate"""
+    rng = random.Random(3)
+    fusion = SensorFusion('test', fusion_mode='coalesced', max_fusion_rate=20.0)
+    try:
+        # 刚融合过，下一次融合至少等待 1/max_fusion_rate 秒，这期间的更新合并为一次融合
+        fusion.fuse(force=True)
+        last_fusion = fusion._last_fusion
+        for sensor_type, sensor_id in SENSORS:
+            fusion.update_sensor_data(sensor_type, sensor_id, _sensor_data(rng, sensor_type))
+        stats = _wait_for_fusions(fusion, 2)
+        assert stats['fusions'] == 2 and stats['saved_fusions'] == len(SENSORS) - 1
+        assert stats['pending_updates'] == 0
+        assert fusion._last_fusion - last_fusion >= 1.0 / fusion.max_fusion_rate - 0.01
+        last_fusion = fusion._last_fusion
+
+        for sensor_type, sensor_id in SENSORS[:4]:
+            fusion.update_sensor_data(sensor_type, sensor_id, _sensor_data(rng, sensor_type))
+        stats = _wait_for_fusions(fusion, 3)
+        assert stats['fusions'] == 3 and stats['saved_fusions'] == len(SENSORS) - 1 + 3
+        assert fusion._last_fusion - last_fusion >= 1.0 / fusion.max_fusion_rate - 0.01
+
+        # close 取消等待中的定时器，之后不再融合
+        fusion.max_fusion_rate = 1.0
+        fusion.update_sensor_data('magnetic', 'mag_west', {'occupancy_rate': 0.3})
+        fusion.close()
+        time.sleep(0.05)
+        stats = fusion.get_fusion_stats()
+        assert stats['fusions'] == 3 and stats['pending_updates'] == 1
+    finally:
+        fusion.close()
+
+
+def test_unknown_fusion_mode_is_rejected():
+    try:
+        SensorFusion('test', fusion_mode='batched')
+    except ValueError:
+        return
+    raise AssertionError("unknown fusion mode should be rejected")
+
+
+if __name__ == '__main__':
+    test_incremental_fusion_matches_full_fusion()
+    test_only_affected_lanes_are_refused()
+    test_deferred_fusion_counters()
+    test_coalesced_fusion_counters()
+    test_unknown_fusion_mode_is_rejected()
+    print("传感器融合测试通过")
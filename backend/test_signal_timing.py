@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""测试 Webster 配时优化"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from algorithms.signal_timing import WebsterTimingOptimizer
+
+
+def _check_splits(optimizer: WebsterTimingOptimizer, result, mask):
+    """有效绿灯之和为 C - L，相位时长之和为周期，且不低于最短绿灯"""
+    num_phases = mask.sum(axis=1)
+    assert np.array_equal(result['green'].sum(axis=1), result['cycle_length'] - num_phases * optimizer.lost_time)
+    assert np.array_equal(result['splits'].sum(axis=1), result['cycle_length'])
+    assert np.all(result['green'][mask] >= optimizer.min_green)
+    assert np.all(result['green'][~mask] == 0)
+    assert np.all(result['cycle_length'] >= optimizer.min_cycle)
+
+
+def test_hand_calculation():
+    """两相位，流量 600 / 450 辆/小时：Y = 0.583，C0 = (1.5×10 + 5) / (1 - Y) = 48"""
+    optimizer = WebsterTimingOptimizer()
+    result = optimizer.optimize([600, 450])
+    assert result['cycle_length'] == 48
+    assert result['green'].tolist() == [22, 16]
+    assert result['splits'].tolist() == [27, 21]
+
+
+def test_split_sum_random_network():
+    rng = np.random.default_rng(0)
+    flows = rng.uniform(0, 900, size=(500, 4))
+    mask = rng.random((500, 4)) < 0.8
+    mask[:, 0] = True
+    for optimizer in (WebsterTimingOptimizer(), WebsterTimingOptimizer(lost_time=4, min_green=7),
+                      WebsterTimingOptimizer(max_cycle=90)):
+        result = optimizer.optimize(flows, phase_mask=mask)
+        _check_splits(optimizer, result, mask)
+
+
+def test_explicit_lost_time():
+    """显式给出损失时间时，有效绿灯为相位时长减去损失时间，而不是减去黄灯和全红"""
+    optimizer = WebsterTimingOptimizer(yellow=3, all_red=2, lost_time=4)
+    result = optimizer.optimize([[600, 450, 300]])
+    assert np.array_equal(result['splits'] - optimizer.lost_time, result['green'])
+
+
+if __name__ == '__main__':
+    test_hand_calculation()
+    test_split_sum_random_network()
+    test_explicit_lost_time()
+    print("Webster 配时测试通过")
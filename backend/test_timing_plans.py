@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""测试分时段配时方案引擎的编译与专用方案覆盖"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from controllers.timing_plans import TimingPlan, TimingPlanEngine, STATE_FLASH
+from controllers.adaptive_control import RuleBasedTrafficController
+
+# 2024-01-01 00:00 UTC，星期一
+MONDAY = 1704067200
+
+
+def _build_engine() -> TimingPlanEngine:
+    engine = TimingPlanEngine(utc_offset=0)
+    engine.add_plan(TimingPlan('peak', [40, 30]))
+    engine.add_plan(TimingPlan('offpeak', [25, 20]))
+    engine.add_plan(TimingPlan('night', [], flash=True))
+    for i in range(20):
+        engine.set_schedule(f'i{i}', [('weekday', '07:00', 'peak'), ('weekday', '09:00', 'offpeak'),
+                                      ('daily', '23:00', 'night'), ('weekend', '08:00', 'offpeak')])
+    return engine
+
+
+def _edit(engine: TimingPlanEngine):
+    """一组修改：专用方案、替换全局方案、修改已有路口的时段表、撤销专用方案"""
+    engine.override_plan('i3', 'peak', TimingPlan('peak@i3', [50, 35, 25], offset=17))
+    engine.override_plans(['i4', 'i5'], 'offpeak',
+                          [TimingPlan('offpeak@i4', [30, 30], offset=5), TimingPlan('offpeak@i5', [20, 45])])
+    engine.add_plan(TimingPlan('offpeak', [35, 25], offset=9))
+    engine.set_plan('i6', 'peak')
+    engine.override_plan('i5', 'offpeak', None)
+
+
+def test_rule_based_controllers_share_default_plan():
+    """没有时段表的路口共用一个默认方案和一份时段表"""
+    engine = TimingPlanEngine()
+    controllers = [RuleBasedTrafficController(f'rb_{i}', engine) for i in range(200)]
+    stats = engine.get_stats()
+    assert stats['plans'] == 1
+    assert stats['intersections'] == 200
+    assert stats['distinct_schedules'] == 1
+    assert stats['overrides'] == 0
+
+    plan = controllers[7].optimize_timings({0: 600, 1: 450})
+    stats = engine.get_stats()
+    assert stats['plans'] == 1
+    assert stats['overrides'] == 1
+    assert engine.get_plan(RuleBasedTrafficController.DEFAULT_PLAN_NAME, 'rb_7') is plan
+    assert engine.status('rb_7')['plan'] == plan.name
+    assert engine.status('rb_8')['plan'] == RuleBasedTrafficController.DEFAULT_PLAN_NAME
+
+
+def test_incremental_edits_match_full_compile():
+    """编译后逐项增量修改的结果与修改后整体编译的结果一致"""
+    incremental = _build_engine()
+    incremental.evaluate(MONDAY)
+    _edit(incremental)
+
+    full = _build_engine()
+    _edit(full)
+
+    for hours in (0.5, 7.5, 9.25, 23.5, 24 * 5 + 8.5):
+        timestamp = MONDAY + hours * 3600 + 13.4
+        a = incremental.evaluate(timestamp)
+        b = full.evaluate(timestamp)
+        assert a['intersection_ids'] == b['intersection_ids']
+        for key in ('plan_key', 'phase', 'state', 'remaining_time', 'cycle_position'):
+            assert np.allclose(a[key], b[key]), (hours, key)
+        assert [a['plan_names'][p] for p in a['plan']] == [b['plan_names'][p] for p in b['plan']]
+
+
+def test_override_applies_only_to_its_intersection():
+    engine = _build_engine()
+    timestamp = MONDAY + 7.5 * 3600
+    engine.evaluate(timestamp)
+    engine.override_plan('i3', 'peak', TimingPlan('peak@i3', [50, 35, 25], offset=17))
+
+    assert engine.status('i3', timestamp)['plan'] == 'peak@i3'
+    assert engine.status('i2', timestamp)['plan'] == 'peak'
+    # 其他时段不受影响
+    assert engine.status('i3', MONDAY + 10 * 3600)['plan'] == 'offpeak'
+    assert engine.evaluate(MONDAY + 23.5 * 3600)['state'][3] == STATE_FLASH
+
+    engine.override_plan('i3', 'peak', None)
+    assert engine.status('i3', timestamp)['plan'] == 'peak'
+    assert engine.get_stats()['overrides'] == 0
+
+
+if __name__ == '__main__':
+    test_rule_based_controllers_share_default_plan()
+    test_incremental_edits_match_full_compile()
+    test_override_applies_only_to_its_intersection()
+    print("配时方案引擎测试通过")
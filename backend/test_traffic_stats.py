@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""测试交通统计环形缓冲的滑动窗口和与定期重新求和"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from controllers.traffic_stats import RollingTrafficStats
+
+NUM_LANES = 8
+
+
+def _exact_sums(history, window):
+    recent = history[-window:]
+    counts = np.sum([c for c, _ in recent], axis=0) if recent else np.zeros(NUM_LANES)
+    waits = np.sum([w for _, w in recent], axis=0) if recent else np.zeros(NUM_LANES)
+    return counts, waits
+
+
+def test_window_sums_match_recomputation():
+    """环绕多次后，每个窗口的滑动和与按最近记录重新求和的结果一致"""
+    rng = np.random.default_rng(0)
+    stats = RollingTrafficStats(NUM_LANES, capacity=30, windows=(1, 7, 20, 30))
+    history = []
+    for step in range(200):
+        counts = rng.integers(0, 30, NUM_LANES).astype(np.float64)
+        waits = rng.uniform(0, 90, NUM_LANES)
+        stats.add(float(step), step % 4, counts, waits)
+        history.append((counts, waits))
+        assert len(stats) == min(step + 1, 30)
+        for window in stats.windows:
+            expected_counts, expected_waits = _exact_sums(history, window)
+            counts_sum, waits_sum = stats.window_sums(window)
+            assert np.allclose(counts_sum, expected_counts), (step, window)
+            assert np.allclose(waits_sum, expected_waits), (step, window)
+            summary = stats.window_summary(window)
+            assert summary['samples'] == min(window, step + 1)
+            assert np.isclose(summary['average_waiting_time'], expected_waits.sum() / summary['samples'])
+
+
+def test_resync_removes_accumulated_error():
+    """每 resync_interval 次写入重新精确求和，之前累积的误差被清除"""
+    rng = np.random.default_rng(1)
+    stats = RollingTrafficStats(NUM_LANES, capacity=16, windows=(4, 16), resync_interval=10)
+    history = []
+
+    def add():
+        counts = rng.integers(0, 30, NUM_LANES).astype(np.float64)
+        waits = rng.uniform(0, 90, NUM_LANES) * 1e-3
+        stats.add(0.0, 0, counts, waits)
+        history.append((counts, waits))
+
+    for _ in range(12):
+        add()
+    # 模拟滑动和的浮点漂移
+    stats._count_sums += 0.5
+    stats._wait_sums -= 1e-4
+    for _ in range(7):
+        add()
+        assert not np.allclose(stats.window_sums(4)[0], _exact_sums(history, 4)[0])
+    # 第20次写入触发重新求和，结果与直接求和完全相同
+    add()
+    assert stats.total % stats.resync_interval == 0
+    for window in stats.windows:
+        indices = stats._recent_indices(window)
+        counts_sum, waits_sum = stats.window_sums(window)
+        assert np.array_equal(counts_sum, stats.counts[indices].sum(axis=0))
+        assert np.array_equal(waits_sum, stats.waits[indices].sum(axis=0))
+        assert np.allclose(waits_sum, _exact_sums(history, window)[1])
+
+
+def test_clear_and_window_validation():
+    stats = RollingTrafficStats(NUM_LANES, capacity=10, windows=(5,))
+    stats.add(0.0, 1, np.ones(NUM_LANES), np.ones(NUM_LANES))
+    stats.clear()
+    assert len(stats) == 0
+    assert stats.window_summary(5) == {'samples': 0, 'total_vehicles': 0.0, 'average_waiting_time': 0.0}
+    stats.add(1.0, 2, np.full(NUM_LANES, 2.0), np.full(NUM_LANES, 3.0))
+    assert stats.window_summary(5)['total_vehicles'] == 2.0 * NUM_LANES
+
+    for windows in [(), (0,), (11,)]:
+        try:
+            RollingTrafficStats(NUM_LANES, capacity=10, windows=windows)
+        except ValueError:
+            continue
+        raise AssertionError(f"windows {windows} should be rejected")
+
+
+if __name__ == '__main__':
+    test_window_sums_match_recomputation()
+    test_resync_removes_accumulated_error()
+    test_clear_and_window_validation()
+    print("交通统计测试通过")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""离线训练DRL交通信号控制器（基于历史交通数据）"""
+import os
+import sys
+import argparse
+import logging
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from controllers.drl_offline_training import (
+    MAX_SNAPSHOT_GAP, OfflineDRLTrainer, iter_database_snapshots, iter_file_snapshots
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--intersection', required=True, help='路口ID')
+    parser.add_argument('--source', default='db',
+                        help="数据来源：'db' 读取 TrafficData 表，或导出文件路径（.csv/.jsonl）")
+    parser.add_argument('--phase-log',
+                        help='TrafficLight 表导出的相位日志（.csv），用于导出文件中没有记录相位的情况')
+    parser.add_argument('--start', type=datetime.fromisoformat, help='起始时间（仅数据库来源）')
+    parser.add_argument('--end', type=datetime.fromisoformat, help='结束时间（仅数据库来源）')
+    parser.add_argument('--model-path', help='模型输出目录（默认与在线控制器相同）')
+    parser.add_argument('--workers', type=int, default=None, help='经验生成进程数，0为单进程')
+    parser.add_argument('--chunk-size', type=int, default=2048)
+    parser.add_argument('--updates-per-chunk', type=int, default=None)
+    parser.add_argument('--target-update', choices=['hard', 'soft'], default='hard',
+                        help='目标网络更新方式：hard 定期完整复制，soft Polyak软更新')
+    parser.add_argument('--target-update-interval', type=int, default=None,
+                        help='目标网络更新间隔（学习步），默认 hard 为500、soft 为1')
+    parser.add_argument('--tau', type=float, default=0.005, help='软更新系数')
+    parser.add_argument('--replay-capacity', type=int, default=200000)
+    parser.add_argument('--prioritized', action='store_true', help='使用优先经验回放')
+    parser.add_argument('--seed', type=int, default=0, help='经验回放采样的随机种子')
+    parser.add_argument('--max-gap', type=float, default=MAX_SNAPSHOT_GAP,
+                        help='相邻快照的最大时间间隔（秒），超过时视为轨迹结束')
+    args = parser.parse_args()
+
+    if args.source == 'db':
+        snapshots = iter_database_snapshots(args.intersection, start=args.start, end=args.end)
+    else:
+        snapshots = iter_file_snapshots(args.source, intersection_id=args.intersection, phase_log=args.phase_log)
+
+    trainer = OfflineDRLTrainer(
+        args.intersection,
+        model_path=args.model_path,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        updates_per_chunk=args.updates_per_chunk,
+        target_update_interval=args.target_update_interval,
+        target_update_mode=args.target_update,
+        target_tau=args.tau,
+        replay_capacity=args.replay_capacity,
+        prioritized_replay=args.prioritized,
+        seed=args.seed,
+        max_gap=args.max_gap
+    )
+    stats = trainer.train(snapshots)
+
+    print("\n========== 离线训练完成 ==========")
+    for key, value in stats.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()